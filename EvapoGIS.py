@@ -23,6 +23,8 @@ class EvapoGIS:
         )
  
     def unload(self):
+        if getattr(self, 'dlg', None) is not None:
+            self.dlg.limpar_previa()
         for action in self.actions:
             self.iface.removePluginMenu('EvapoGIS', action)
             self.iface.removeToolBarIcon(action)
@@ -51,5 +53,8 @@ class EvapoGIS:
         return action
  
     def run(self):
+        # O diálogo anterior é substituído: a prévia dele não fica órfã
+        if getattr(self, 'dlg', None) is not None:
+            self.dlg.limpar_previa()
         self.dlg = EvapoGISDialog()
         self.dlg.show()
\ No newline at end of file
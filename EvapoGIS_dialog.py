@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 import os
+import shutil
+import tempfile
 from qgis.PyQt import uic
 from qgis.PyQt.QtWidgets import QDialog, QFileDialog, QMessageBox, QInputDialog
 from .processing_functions import run_processing  # Importe a função run_processing
+from .qgis_layers import carregar_produtos, remover_grupo
 
 FORM_CLASS, _ = uic.loadUiType(os.path.join(
     os.path.dirname(__file__), 'EvapoGIS.ui'))
 
+# Grupos da árvore de camadas e produtos da prévia abertos no mapa
+GRUPO_PREVIA = 'EvapoGIS - prévia'
+GRUPO_RESULTADOS = 'EvapoGIS'
+PRODUTOS_PREVIA = ('ETday', 'Ts', 'NDVI', 'Pcold', 'Phot', 'CC_432')
+
 
 class EvapoGISDialog(QDialog, FORM_CLASS):
     def __init__(self, parent=None):
@@ -22,10 +30,16 @@ class EvapoGISDialog(QDialog, FORM_CLASS):
         self.selectRasterReferenciaButton.clicked.connect(self.select_raster_referencia)
 
         self.runButton.clicked.connect(self.run_processing)
+        self.previewButton.clicked.connect(self.run_preview)
+
+        # Pixels âncora da última prévia, oferecidos ao processamento completo
+        self._ancoras_previa = None
+        # Pasta temporária das prévias, uma por diálogo
+        self._pasta_previa = None
 
     # Funções para selecionar arquivos/diretórios
     def select_mtl_file(self):
-        filename, _ = QFileDialog.getOpenFileName(self, "Select MTL File", "", "MTL files (*.txt);;All files (*)")
+        filename, _ = QFileDialog.getOpenFileName(self, "Select MTL File", "", "MTL files (*.txt *.json *.xml);;Landsat bundles (*.tar *.tar.gz *.tgz);;All files (*)")
         self.caminhoMTL.setText(filename)
 
     def select_mde_file(self):
@@ -49,32 +63,91 @@ class EvapoGISDialog(QDialog, FORM_CLASS):
         filename, _ = QFileDialog.getOpenFileName(self, "Select Raster Referencia", "", "TIF files (*.tif);;All files (*)")
         self.rasterReferencia.setText(filename)
 
-    def run_processing(self):
-        # Obter os valores dos campos de entrada
-        caminho_mtl = self.caminhoMTL.text()
-        caminho_mdt = self.caminhoMDE.text()
-        caminho_bandas = self.caminhoBandas.text()
-        shapefile_path = self.shapefilePath.text()
-        output_dir = self.outputDir.text()
-        raster_referencia_path = self.rasterReferencia.text()
+    @staticmethod
+    def _valor_ou_grade(texto):
+        # Vento e ETo aceitam um valor único ou o caminho de um raster (GeoTIFF, NetCDF...)
+        texto = texto.strip()
+        if os.path.isfile(texto):
+            return texto
+        return float(texto)
+
+    def _entradas(self):
+        # Argumentos posicionais do run_processing lidos dos campos, ou None se inválidos
         try:
-            u_2m = float(self.u2m.text())
+            u_2m = self._valor_ou_grade(self.u2m.text())
             EToi = float(self.EToi.text())
-            ETo = float(self.ETo.text())
+            ETo = self._valor_ou_grade(self.ETo.text())
         except ValueError:
             QMessageBox.warning(self, "Entrada Inválida", "Por favor, insira valores numéricos para os campos de entrada.")
+            return None
+        return (self.caminhoMTL.text(), self.caminhoMDE.text(), self.caminhoBandas.text(), self.shapefilePath.text(),
+                self.outputDir.text(), self.rasterReferencia.text(), u_2m, EToi, ETo)
+
+    def _esvaziar_pasta_previa(self):
+        # A prévia anterior sai do mapa antes, para que as camadas não mantenham os arquivos abertos
+        remover_grupo(GRUPO_PREVIA)
+        if self._pasta_previa is None:
+            self._pasta_previa = tempfile.mkdtemp(prefix='evapogis_previa_')
+        else:
+            shutil.rmtree(self._pasta_previa, ignore_errors=True)
+            os.makedirs(self._pasta_previa, exist_ok=True)
+        return self._pasta_previa
+
+    def limpar_previa(self):
+        # Remove as camadas da prévia do projeto e apaga a pasta temporária
+        remover_grupo(GRUPO_PREVIA)
+        if self._pasta_previa is not None:
+            shutil.rmtree(self._pasta_previa, ignore_errors=True)
+            self._pasta_previa = None
+
+    def done(self, resultado):
+        # Ao fechar o diálogo, a prévia (camadas e arquivos temporários) é descartada
+        self.limpar_previa()
+        super(EvapoGISDialog, self).done(resultado)
+
+    def run_preview(self):
+        # Prévia em resolução reduzida, gravada na pasta temporária do diálogo e aberta no mapa
+        entradas = self._entradas()
+        if entradas is None:
+            return
+        pasta_previa = self._esvaziar_pasta_previa()
+        ancoras, limites = {}, {}
+        ok = run_processing(*entradas[:4], pasta_previa, *entradas[5:], self, decimacao=self.fatorPrevia.value(),
+                            ancoras=ancoras, limites_exibicao=limites)
+        if not ok:
+            self.messageLabel.setText("A prévia não foi concluída; veja o log do EvapoGIS.")
+            return
+        self._ancoras_previa = ancoras
+        carregar_produtos(limites, GRUPO_PREVIA, PRODUTOS_PREVIA, sufixo=' (prévia)')
+        self.messageLabel.setText(f"Prévia concluída (redução {self.fatorPrevia.value()}x). "
+                                  f"PCold {ancoras['pcold']}, PHot {ancoras['phot']}.")
+
+    def run_processing(self):
+        # Obter os valores dos campos de entrada
+        entradas = self._entradas()
+        if entradas is None:
             return
 
+        # Reaproveitar os pixels âncora escolhidos na prévia
+        pcold_coords = phot_coords = None
+        if self._ancoras_previa:
+            resposta = QMessageBox.question(
+                self, "Pixels Âncora",
+                f"Usar os pixels âncora da prévia?\nPCold: {self._ancoras_previa['pcold']}\n"
+                f"PHot: {self._ancoras_previa['phot']}")
+            if resposta == QMessageBox.Yes:
+                pcold_coords, phot_coords = self._ancoras_previa['pcold'], self._ancoras_previa['phot']
+
         # Chamar a função de processamento
-        run_processing(
-            caminho_mtl,
-            caminho_mdt,
-            caminho_bandas,
-            shapefile_path,
-            output_dir,
-            raster_referencia_path,
-            u_2m,
-            EToi,
-            ETo,
-            self  # Passar a instância do diálogo para interagir dentro do processamento
+        limites = {} if self.carregarCamadas.isChecked() else None
+        ok = run_processing(
+            *entradas,
+            self,  # Passar a instância do diálogo para interagir dentro do processamento
+            pcold_coords=pcold_coords,
+            phot_coords=phot_coords,
+            limites_exibicao=limites
         )
+
+        # Abrir os principais produtos no mapa, com o estilo dos limites calculados no processamento
+        if ok and limites:
+            carregar_produtos(limites, GRUPO_RESULTADOS)
@@ -0,0 +1,263 @@
+"""
+Agregação temporal da ET (mensal, sazonal...) a partir de uma série de cenas.
+
+A ETof é interpolada entre as datas de aquisição e integrada com a ETo
+diária: ET(período) = soma dos dias de ETo(dia) * ETof(dia). Como toda
+interpolação usada aqui é linear nos valores das cenas, a integral se
+reduz a ET(período) = soma das cenas de c(período, cena) * ETof(cena), com
+coeficientes escalares calculados uma única vez. Os rasters são então
+percorridos bloco a bloco, com um acumulador por período, sem nunca
+carregar a pilha inteira em memória. Pixels sem dado em alguma cena (nuvem
+mascarada pelo QA_PIXEL, por exemplo) são interpolados só entre as cenas
+em que são válidos, com os coeficientes calculados uma vez por combinação
+de cenas válidas.
+
+Uso:
+    python -m EvapoGIS.aggregation cenas.csv eto_diaria.csv saida/ [--periodo mensal|total] [--metodo linear|spline]
+
+cenas.csv tem as colunas data e caminho (ETof.tif ou ETday.tif de cada cena).
+"""
+import argparse
+import csv
+import logging
+import os
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+TAMANHO_BLOCO = 256
+METODOS = ('linear', 'spline', 'constante')
+
+LOGGER = logging.getLogger('evapogis.agregacao')
+
+
+def _spline_natural(x, dias):
+    """
+    Pesos da spline cúbica natural: matriz (dias, nós) aplicada aos valores dos nós.
+    """
+    n = x.size
+    h = np.diff(x)
+    # Sistema tridiagonal das segundas derivadas (extremos naturais: M0 = Mn = 0)
+    A = np.zeros((n, n))
+    B = np.zeros((n, n))
+    A[0, 0] = A[-1, -1] = 1.0
+    identidade = np.eye(n)
+    for i in range(1, n - 1):
+        A[i, i - 1] = h[i - 1]
+        A[i, i] = 2 * (h[i - 1] + h[i])
+        A[i, i + 1] = h[i]
+        B[i] = 6 * ((identidade[i + 1] - identidade[i]) / h[i] - (identidade[i] - identidade[i - 1]) / h[i - 1])
+    M = np.linalg.solve(A, B)
+
+    t = np.clip(dias, x[0], x[-1])
+    i = np.clip(np.searchsorted(x, t, side='right') - 1, 0, n - 2)
+    hi = h[i][:, None]
+    a = (x[i + 1] - t)[:, None]
+    b = (t - x[i])[:, None]
+    return ((M[i] * a ** 3 + M[i + 1] * b ** 3) / (6 * hi)
+            + (identidade[i] - M[i] * hi ** 2 / 6) * a / hi
+            + (identidade[i + 1] - M[i + 1] * hi ** 2 / 6) * b / hi)
+
+
+def interpolation_weights(datas_cenas, dias, metodo='linear'):
+    """
+    Matriz W (dias, cenas) tal que ETof(dia) = W @ ETof(cenas).
+
+    Fora do intervalo das cenas vale o valor da cena mais próxima.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de interpolação desconhecido: {metodo}")
+    x = np.asarray(datas_cenas, dtype='datetime64[D]').astype(np.int64).astype(np.float64)
+    t = np.asarray(dias, dtype='datetime64[D]').astype(np.int64).astype(np.float64)
+    if np.any(np.diff(x) <= 0):
+        raise ValueError("As cenas devem estar em ordem cronológica e sem datas repetidas.")
+    n = x.size
+    if n == 1:
+        return np.ones((t.size, 1))
+    if metodo == 'constante':
+        # Cada dia recebe a ETof da cena mais próxima
+        mais_proxima = np.abs(t[:, None] - x[None, :]).argmin(axis=1)
+        return np.eye(n)[mais_proxima]
+    if metodo == 'spline' and n > 2:
+        return _spline_natural(x, t)
+    return np.stack([np.interp(t, x, coluna) for coluna in np.eye(n)], axis=1)
+
+
+def period_coefficients(datas_cenas, eto_diaria, periodos, metodo='linear'):
+    """
+    Coeficientes C (períodos, cenas) de ET(período) = C @ ETof(cenas).
+
+    `eto_diaria` é um dicionário {np.datetime64 dia: ETo} e `periodos` uma
+    lista de (nome, primeiro dia, último dia), ambos inclusivos.
+    """
+    coeficientes = np.zeros((len(periodos), len(datas_cenas)))
+    for p, (nome, inicio, fim) in enumerate(periodos):
+        dias = np.arange(np.datetime64(inicio, 'D'), np.datetime64(fim, 'D') + 1)
+        faltando = [str(dia) for dia in dias if dia not in eto_diaria]
+        if faltando:
+            raise ValueError(f"Período {nome}: ETo diária ausente em {', '.join(faltando[:5])}"
+                             + (' ...' if len(faltando) > 5 else ''))
+        eto = np.array([eto_diaria[dia] for dia in dias])
+        coeficientes[p] = eto @ interpolation_weights(datas_cenas, dias, metodo)
+    return coeficientes
+
+
+def monthly_periods(inicio, fim):
+    """
+    Lista de períodos mensais (nome AAAA-MM, primeiro dia, último dia) entre as datas.
+    """
+    inicio = np.datetime64(inicio, 'D')
+    fim = np.datetime64(fim, 'D')
+    periodos = []
+    mes = inicio.astype('datetime64[M]')
+    while mes <= fim.astype('datetime64[M]'):
+        primeiro = max(mes.astype('datetime64[D]'), inicio)
+        ultimo = min((mes + 1).astype('datetime64[D]') - 1, fim)
+        periodos.append((str(mes), primeiro, ultimo))
+        mes += 1
+    return periodos
+
+
+class _CoeficientesPorPadrao:
+    """
+    Coeficientes (períodos, cenas) para cada combinação de cenas válidas em um pixel.
+
+    A ETof de um pixel é interpolada só entre as cenas em que ele tem dado;
+    as cenas sem dado recebem coeficiente zero. Cada combinação é calculada
+    uma única vez e reaproveitada entre os blocos.
+    """
+
+    def __init__(self, datas_cenas, eto_diaria, periodos, metodo, escala):
+        self.datas = datas_cenas
+        self.eto = eto_diaria
+        self.periodos = periodos
+        self.metodo = metodo
+        self.escala = escala
+        self._cache = {}
+
+    def __call__(self, validas):
+        chave = validas.tobytes()
+        coeficientes = self._cache.get(chave)
+        if coeficientes is None:
+            indices = np.flatnonzero(validas)
+            coeficientes = np.zeros((len(self.periodos), len(self.datas)))
+            coeficientes[:, indices] = period_coefficients([self.datas[i] for i in indices], self.eto,
+                                                           self.periodos, self.metodo) * self.escala[indices]
+            self._cache[chave] = coeficientes
+        return coeficientes
+
+
+def aggregate_et(caminhos, datas_cenas, eto_diaria, periodos, output_dir, metodo='linear', tipo='ETof'):
+    """
+    Integra a ET de cada período a partir dos rasters das cenas, bloco a bloco.
+
+    `tipo` indica se os rasters são ETof ou ETday; no segundo caso a ETof é
+    obtida dividindo pela ETo do dia da cena (incorporado aos coeficientes).
+    Em cada pixel, a ETof é interpolada entre as cenas em que ele é válido
+    (não NaN); só os pixels sem nenhuma cena válida ficam com NaN.
+    Retorna {nome do período: caminho do raster ET_<período>.tif}.
+    """
+    datas_cenas = [np.datetime64(data, 'D') for data in datas_cenas]
+    # Valida a ETo de todos os dias dos períodos antes de abrir os rasters
+    period_coefficients(datas_cenas, eto_diaria, periodos, metodo)
+    if tipo == 'ETday':
+        faltando = [str(data) for data in datas_cenas if data not in eto_diaria]
+        if faltando:
+            raise ValueError(f"ETo diária ausente nas datas das cenas: {', '.join(faltando)} "
+                             "(necessária para converter ETday em ETof).")
+        escala = 1.0 / np.array([eto_diaria[data] for data in datas_cenas])
+    elif tipo == 'ETof':
+        escala = np.ones(len(datas_cenas))
+    else:
+        raise ValueError(f"Tipo de raster desconhecido: {tipo}")
+    coeficientes = _CoeficientesPorPadrao(datas_cenas, eto_diaria, periodos, metodo, escala)
+
+    os.makedirs(output_dir, exist_ok=True)
+    fontes = [rasterio.open(caminho) for caminho in caminhos]
+    destinos = []
+    try:
+        referencia = fontes[0]
+        for fonte in fontes[1:]:
+            if fonte.shape != referencia.shape or fonte.transform != referencia.transform:
+                raise ValueError(f"{fonte.name} não está na mesma grade de {referencia.name}.")
+        perfil = referencia.profile.copy()
+        perfil.update({'driver': 'GTiff', 'count': 1, 'dtype': 'float32', 'nodata': np.nan})
+        saidas = {}
+        for nome, _, _ in periodos:
+            saidas[nome] = os.path.join(output_dir, f'ET_{nome}.tif')
+            destinos.append(rasterio.open(saidas[nome], 'w', **perfil))
+
+        altura, largura = referencia.shape
+        n = len(fontes)
+        for linha in range(0, altura, TAMANHO_BLOCO):
+            window = Window(0, linha, largura, min(TAMANHO_BLOCO, altura - linha))
+            # Pilha (cena, pixel) do bloco e a combinação de cenas válidas de cada pixel
+            bloco = np.stack([fonte.read(1, window=window, masked=True).astype(np.float32).filled(np.nan).reshape(-1)
+                              for fonte in fontes])
+            validos = np.isfinite(bloco)
+            padroes, grupo = np.unique(np.packbits(validos, axis=0).T, axis=0, return_inverse=True)
+            grupo = grupo.reshape(-1)
+            ordem = np.argsort(grupo, kind='stable')
+            limites = np.searchsorted(grupo[ordem], np.arange(len(padroes) + 1))
+
+            acumulador = np.full((len(periodos), bloco.shape[1]), np.nan)
+            for g, padrao in enumerate(padroes):
+                validas = np.unpackbits(padrao, count=n).astype(bool)
+                if not validas.any():
+                    continue
+                pixels = ordem[limites[g]:limites[g + 1]]
+                acumulador[:, pixels] = coeficientes(validas)[:, validas] @ bloco[np.ix_(validas, pixels)]
+            for p, destino in enumerate(destinos):
+                destino.write(acumulador[p].reshape(window.height, largura).astype(np.float32), 1, window=window)
+            feito = linha + window.height
+            LOGGER.info(f"Agregação: {feito}/{altura} linhas",
+                        extra={'evento': 'progresso', 'campos': {'descricao': 'agregacao', 'feito': feito, 'total': altura}})
+    finally:
+        for dataset in fontes + destinos:
+            dataset.close()
+    return saidas
+
+
+def main(argv=None):
+    from .log import configurar_log
+    from .weather import load_series
+
+    parser = argparse.ArgumentParser(description="Agregação temporal da ET a partir de uma série de cenas.")
+    parser.add_argument('cenas', help='CSV com as colunas data e caminho, uma cena por linha')
+    parser.add_argument('eto', help='CSV da ETo diária (colunas data e ETo)')
+    parser.add_argument('saida', help='diretório de saída')
+    parser.add_argument('--periodo', choices=('mensal', 'total'), default='mensal')
+    parser.add_argument('--metodo', choices=METODOS, default='linear')
+    parser.add_argument('--tipo', choices=('ETof', 'ETday'), default='ETof')
+    parser.add_argument('--inicio', help='primeiro dia (padrão: data da primeira cena)')
+    parser.add_argument('--fim', help='último dia (padrão: data da última cena)')
+    args = parser.parse_args(argv)
+    configurar_log()
+
+    with open(args.cenas, 'r', encoding='utf-8', newline='') as arquivo:
+        cenas = sorted(csv.DictReader(arquivo), key=lambda linha: linha['data'])
+    base = os.path.dirname(os.path.abspath(args.cenas))
+    datas = [np.datetime64(linha['data'], 'D') for linha in cenas]
+    caminhos = [os.path.join(base, linha['caminho']) for linha in cenas]
+
+    serie = load_series(args.eto)
+    eto_diaria = {}
+    for tempo, valor in zip(serie.tempos.astype('datetime64[s]').astype('datetime64[D]'), serie.colunas['ETo']):
+        if not np.isnan(valor):
+            eto_diaria[tempo] = float(valor)
+
+    inicio = np.datetime64(args.inicio or datas[0], 'D')
+    fim = np.datetime64(args.fim or datas[-1], 'D')
+    if args.periodo == 'mensal':
+        periodos = monthly_periods(inicio, fim)
+    else:
+        periodos = [(f'{inicio}_{fim}', inicio, fim)]
+
+    saidas = aggregate_et(caminhos, datas, eto_diaria, periodos, args.saida, metodo=args.metodo, tipo=args.tipo)
+    for nome, caminho in saidas.items():
+        LOGGER.info(f"ET {nome}: {caminho}")
+
+
+if __name__ == '__main__':
+    main()
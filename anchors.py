@@ -0,0 +1,98 @@
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import rowcol
+from rasterio.warp import transform as transformar_coordenadas
+
+# Camadas da superfície usadas na calibração dos pixels âncora
+CAMADAS_CALIBRACAO = ('Ts', 'Tsw', 'NDVI', 'SAVI', 'LAI', 'aS', 'Rn', 'G', 'Z0map', 'u_ast', 'rah', 'mdt')
+
+
+def _como_lote(coordenadas):
+    """
+    (xs, ys) de uma coordenada (x, y) ou de uma sequência delas.
+    """
+    pontos = np.asarray(coordenadas, dtype='float64').reshape(-1, 2)
+    return pontos[:, 0], pontos[:, 1]
+
+
+def para_crs(xs, ys, crs_origem, crs_destino):
+    """
+    Converte arrays de coordenadas entre SRCs de uma só vez; sem `crs_origem`, já estão no destino.
+
+    Em SRCs geográficos, x é a longitude e y a latitude.
+    """
+    if crs_origem is None or crs_destino is None or CRS.from_user_input(crs_origem) == CRS.from_user_input(crs_destino):
+        return xs, ys
+    xs, ys = transformar_coordenadas(crs_origem, crs_destino, xs, ys)
+    return np.asarray(xs), np.asarray(ys)
+
+
+class AnchorSampler:
+    """
+    Valores das camadas em memória (arrays 1-D de um PixelStore) em lotes de coordenadas.
+
+    As coordenadas de todos os pontos são convertidas para a grade de uma
+    só vez e cada camada é lida por indexação, sem montar a grade; é o que
+    o run_processing usa para os pixels frio e quente.
+    """
+
+    def __init__(self, store, transform, crs, camadas):
+        self.store = store
+        self.transform = transform
+        self.crs = crs
+        self.camadas = camadas
+
+    def localizar(self, coordenadas, crs=None):
+        """
+        Posições no array 1-D (-1 fora da AOI ou em pixel mascarado) e as coordenadas no SRC da grade.
+        """
+        xs, ys = para_crs(*_como_lote(coordenadas), crs, self.crs)
+        linhas, colunas = rowcol(self.transform, xs, ys)
+        posicoes = self.store.positions(linhas, colunas)
+        return posicoes, np.column_stack((xs, ys))
+
+    def valores(self, posicoes, nomes=None):
+        """
+        {camada: valores nas posições}, com NaN nas posições -1; sem `nomes`, todas as camadas.
+        """
+        posicoes = np.asarray(posicoes)
+        validas = posicoes >= 0
+        indices = np.where(validas, posicoes, 0)
+        amostras = {}
+        for nome in nomes or self.camadas:
+            valores = np.asarray(self.camadas[nome])
+            valores = valores[indices] if valores.ndim else np.full(indices.shape, valores)
+            if not validas.all():
+                valores = valores.astype(np.result_type(valores.dtype, np.float32))
+                valores[~validas] = np.nan
+            amostras[nome] = valores
+        return amostras
+
+    def amostrar(self, coordenadas, crs=None, nomes=None):
+        """
+        Valores de todas as camadas (ou das `nomes`) em cada coordenada, em uma única chamada.
+        """
+        posicoes, _ = self.localizar(coordenadas, crs)
+        return self.valores(posicoes, nomes)
+
+
+def amostrar_rasters(caminhos, coordenadas, crs=None):
+    """
+    Valores de produtos gravados ({nome: caminho}) em cada coordenada, sem ler os rasters inteiros.
+
+    Cada raster é lido só nos blocos dos pontos (dataset.sample), com as
+    coordenadas convertidas para o seu SRC; pontos fora do raster ou em
+    nodata ficam com NaN.
+    """
+    xs, ys = _como_lote(coordenadas)
+    amostras = {}
+    for nome, caminho in caminhos.items():
+        with rasterio.open(caminho) as src:
+            xs_src, ys_src = para_crs(xs, ys, crs, src.crs)
+            valores = np.ma.concatenate(list(src.sample(zip(xs_src, ys_src), indexes=1, masked=True)))
+            linhas, colunas = (np.asarray(indice) for indice in rowcol(src.transform, xs_src, ys_src))
+            fora = (linhas < 0) | (linhas >= src.height) | (colunas < 0) | (colunas >= src.width)
+            valores = np.ma.masked_array(valores, mask=np.ma.getmaskarray(valores) | fora)
+            amostras[nome] = valores.astype(np.result_type(src.dtypes[0], np.float32)).filled(np.nan)
+    return amostras
@@ -0,0 +1,82 @@
+import math
+
+import geopandas as gpd
+from rasterio.features import geometry_mask
+from rasterio.mask import raster_geometry_mask
+from rasterio.transform import Affine
+
+
+def read_geometries(shapefile_path):
+    """
+    Lê as geometrias do shapefile da área de interesse como GeoJSON.
+    """
+    shapefile = gpd.read_file(shapefile_path)
+    return [feature["geometry"] for feature in shapefile.__geo_interface__['features']]
+
+
+def grade_decimada(transform, altura, largura, decimacao):
+    """
+    Grade reduzida pelo fator `decimacao`: (transform, altura, largura).
+
+    É a grade das leituras com out_shape, em que cada pixel cobre cerca de
+    `decimacao` x `decimacao` pixels da grade original; com fator 1, a própria grade.
+    """
+    if decimacao <= 1:
+        return transform, altura, largura
+    nova_altura, nova_largura = math.ceil(altura / decimacao), math.ceil(largura / decimacao)
+    return transform * Affine.scale(largura / nova_largura, altura / nova_altura), nova_altura, nova_largura
+
+
+class AOI:
+    """
+    Área de interesse com cache das máscaras rasterizadas por grade.
+
+    Todas as bandas de uma cena (e as cenas de um mesmo path/row) compartilham
+    a mesma grade, então a rasterização das geometrias é feita uma única vez
+    em vez de uma vez por banda, como acontecia com rasterio.mask.mask.
+    """
+
+    def __init__(self, geometrias):
+        self.geometrias = geometrias
+        self._mascaras = {}
+
+    @classmethod
+    def from_shapefile(cls, shapefile_path):
+        return cls(read_geometries(shapefile_path))
+
+    @property
+    def vazia(self):
+        return not self.geometrias
+
+    def _mascara(self, src, decimacao=1):
+        chave = (src.crs.to_string() if src.crs else None, tuple(src.transform), src.width, src.height, decimacao)
+        mascara = self._mascaras.get(chave)
+        if mascara is None:
+            if decimacao > 1:
+                # Mesma janela da grade original, rasterizada na grade reduzida
+                shape_mask, transform, window = self._mascara(src)
+                transform, altura, largura = grade_decimada(transform, *shape_mask.shape, decimacao)
+                mascara = (geometry_mask(self.geometrias, (altura, largura), transform), transform, window)
+            else:
+                mascara = raster_geometry_mask(src, self.geometrias, crop=True)
+            self._mascaras[chave] = mascara
+        return mascara
+
+    def inside(self, src, decimacao=1):
+        """
+        Máscara booleana dos pixels dentro das geometrias, na grade recortada por crop.
+        """
+        return ~self._mascara(src, decimacao)[0]
+
+    def crop(self, src, decimacao=1):
+        """
+        Recorta o dataset pela AOI; equivale a rasterio.mask.mask(src, geometrias, crop=True).
+
+        Com `decimacao` > 1, a janela é lida já reduzida (out_shape, vizinho
+        mais próximo), o que permite ao GDAL usar as overviews do arquivo.
+        """
+        shape_mask, transform, window = self._mascara(src, decimacao)
+        out_image = src.read(window=window, out_shape=(src.count,) + shape_mask.shape, masked=True)
+        out_image.mask = out_image.mask | shape_mask
+        nodata = src.nodata if src.nodata is not None else 0
+        return out_image.filled(nodata), transform
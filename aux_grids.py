@@ -0,0 +1,168 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+
+from .gdal_env import abrir, memorizar, sessao_ativa
+
+TAMANHO_BLOCO = 256
+
+
+def iter_windows(height, width, tamanho=TAMANHO_BLOCO):
+    """
+    Percorre a grade de processamento em blocos de `tamanho` linhas.
+
+    Blocos de linhas inteiras mantêm os recortes dos arrays da cena contíguos.
+    """
+    for linha in range(0, height, tamanho):
+        yield Window(0, linha, width, min(tamanho, height - linha))
+
+
+def _chave_grade(caminho, banda, meta):
+    transform = tuple(round(v, 9) for v in tuple(meta['transform'])[:6])
+    crs = meta['crs'].to_string() if meta['crs'] else ''
+    return (os.path.abspath(caminho) if os.path.exists(caminho) else caminho, banda,
+            os.path.getmtime(caminho) if os.path.exists(caminho) else 0,
+            transform, crs, meta['width'], meta['height'])
+
+
+class AuxGrid:
+    """
+    Grade auxiliar (ETo, vento...) reamostrada para a grade de processamento.
+
+    A reamostragem é feita uma única vez, bloco a bloco, para um GeoTIFF em
+    cache. Dentro de uma RasterSession o arquivo fica na pasta temporária
+    da sessão e é reaproveitado pelas cenas seguintes na mesma grade até a
+    sessão terminar; sem sessão, fica em uma pasta própria, apagada por
+    close(). A leitura também é por janela, de modo que só um bloco fica
+    em memória.
+    """
+
+    def __init__(self, caminho, meta, banda=1, resampling=Resampling.bilinear, escala=1.0):
+        self.caminho = caminho
+        self.meta = meta
+        self.escala = escala
+        chave = _chave_grade(caminho, banda, meta) + (resampling,)
+        sessao = sessao_ativa()
+        self._pasta = None if sessao is not None else tempfile.mkdtemp(prefix='evapogis_aux_')
+        pasta = self._pasta or sessao.pasta_temporaria()
+        nome = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:16]
+        self.caminho_cache = memorizar(('grade_auxiliar', chave), lambda: self._reamostrar(
+            caminho, banda, resampling, os.path.join(pasta, f'{nome}.tif')))
+        # Na RasterSession o handle é do pool e fica aberto para as próximas cenas
+        self._abertura = abrir(self.caminho_cache)
+        self._dataset = self._abertura.__enter__()
+
+    def _reamostrar(self, caminho, banda, resampling, destino):
+        perfil = {
+            'driver': 'GTiff',
+            'count': 1,
+            'dtype': 'float32',
+            'nodata': np.nan,
+            'width': self.meta['width'],
+            'height': self.meta['height'],
+            'transform': self.meta['transform'],
+            'crs': self.meta['crs'],
+            'tiled': True,
+            'blockxsize': TAMANHO_BLOCO,
+            'blockysize': TAMANHO_BLOCO,
+        }
+        temporario = destino + '.tmp'
+        with rasterio.open(caminho) as src:
+            with WarpedVRT(src, crs=self.meta['crs'], transform=self.meta['transform'],
+                           width=self.meta['width'], height=self.meta['height'],
+                           resampling=resampling, src_nodata=src.nodata, nodata=np.nan,
+                           dtype='float32') as vrt:
+                with rasterio.open(temporario, 'w', **perfil) as dst:
+                    for window in iter_windows(self.meta['height'], self.meta['width']):
+                        dst.write(vrt.read(banda, window=window), 1, window=window)
+        os.replace(temporario, destino)
+        return destino
+
+    def read(self, window):
+        bloco = self._dataset.read(1, window=window)
+        if self.escala != 1.0:
+            bloco *= self.escala
+        return bloco
+
+    def close(self):
+        self._abertura.__exit__(None, None, None)
+        if self._pasta is not None:
+            shutil.rmtree(self._pasta, ignore_errors=True)
+            self._pasta = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ConstantGrid:
+    """
+    Valor escalar com a mesma interface de leitura por janela de AuxGrid.
+    """
+
+    def __init__(self, valor):
+        self.valor = float(valor)
+
+    def read(self, window):
+        return self.valor
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def is_grid_input(valor):
+    """
+    Indica se a entrada meteorológica é um raster em vez de um escalar.
+    """
+    return isinstance(valor, (str, os.PathLike))
+
+
+def open_input(valor, meta, **opcoes):
+    """
+    Abre a entrada como grade reamostrada (caminho) ou constante (escalar).
+    """
+    if is_grid_input(valor):
+        return AuxGrid(os.fspath(valor), meta, **opcoes)
+    return ConstantGrid(valor * opcoes.get('escala', 1.0))
+
+
+def apply_by_blocks(grade, funcao, *arrays, store=None):
+    """
+    Calcula funcao(bloco da grade, blocos dos arrays) janela a janela.
+
+    Só um bloco da grade auxiliar é lido por vez; o resultado tem a forma dos
+    arrays da cena e o mesmo dtype do cálculo feito sobre o array inteiro.
+    Com `store` (PixelStore), os arrays são os valores 1-D dos pixels
+    válidos: cada janela de linhas inteiras corresponde a um trecho
+    contíguo deles e da grade só são usados os pixels válidos.
+    """
+    altura, largura = arrays[0].shape if store is None else store.shape
+    saida = None
+    for window in iter_windows(altura, largura):
+        fatia = window.toslices()
+        bloco_grade = grade.read(window)
+        if store is not None:
+            linhas = fatia[0]
+            sub, fatia = store.rows(linhas.start, linhas.stop)
+            if isinstance(bloco_grade, np.ndarray):
+                bloco_grade = sub.compact(bloco_grade)
+        bloco = funcao(bloco_grade, *(array[fatia] for array in arrays))
+        if saida is None:
+            saida = np.empty(arrays[0].shape, dtype=np.result_type(bloco))
+        saida[fatia] = bloco
+    return saida
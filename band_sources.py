@@ -0,0 +1,144 @@
+import logging
+import os
+import posixpath
+import re
+import tarfile
+
+from .gdal_env import memorizar
+from .mtl_parser import is_tar_path
+from .scene_metadata import BANDA_TERMAL, BANDAS_REFLETIVAS
+
+# Bandas efetivamente usadas pelo SEBAL; as demais (pancromática, cirrus,
+# segunda termal) não são lidas do disco nem do pacote.
+BANDAS_NECESSARIAS = BANDAS_REFLETIVAS + (BANDA_TERMAL,)
+
+EXTENSOES_RASTER = ('.tif', '.tiff')
+PADRAO_BANDA = re.compile(r'_B(\d+)')
+PADRAO_QA = re.compile(r'_QA_PIXEL', re.IGNORECASE)
+
+LOGGER = logging.getLogger('evapogis.bandas')
+
+
+def _eh_raster(nome):
+    nome = nome.lower()
+    if nome.endswith('.gz'):
+        nome = nome[:-3]
+    return nome.endswith(EXTENSOES_RASTER)
+
+
+def _caminho_vsi(caminho):
+    """
+    Caminho legível pelo GDAL para um raster local, compactado com gzip ou não.
+    """
+    if caminho.lower().endswith('.gz') and not caminho.startswith('/vsi'):
+        return '/vsigzip/' + caminho
+    return caminho
+
+
+def _importar_gdal():
+    """
+    Módulo osgeo.gdal, disponível dentro do QGIS; None quando não está instalado.
+    """
+    try:
+        from osgeo import gdal
+    except ImportError:
+        return None
+    return gdal
+
+
+def _listar_tar(caminho_tar):
+    """
+    Lista os rasters do pacote .tar/.tar.gz como caminhos /vsitar/.
+
+    Com o GDAL do QGIS, a listagem vem do próprio /vsitar/ (gdal.ReadDir),
+    como em _listar_vsi: o pacote .tar.gz é descompactado uma única vez e
+    o índice dos membros fica com o GDAL para a leitura das bandas. Sem o
+    osgeo, só os cabeçalhos são lidos com o tarfile. Nada é extraído para
+    o disco.
+    """
+    caminho_tar = os.path.abspath(caminho_tar)
+    gdal = _importar_gdal()
+    if gdal is not None:
+        nomes = gdal.ReadDirRecursive(f'/vsitar/{caminho_tar}')
+        if nomes is None:
+            raise OSError(f"Pacote de bandas ilegível: {caminho_tar}")
+        nomes = [nome for nome in nomes if not nome.endswith('/') and _eh_raster(nome)]
+    else:
+        with tarfile.open(caminho_tar, 'r:*') as tar:
+            nomes = [posixpath.normpath(membro.name) for membro in tar if membro.isfile() and _eh_raster(membro.name)]
+    return [(posixpath.basename(nome), f'/vsitar/{caminho_tar}/{nome}') for nome in nomes]
+
+
+def _listar_vsi(caminho_vsi):
+    """
+    Lista um diretório virtual do GDAL (/vsitar/, /vsizip/, /vsis3/...).
+    """
+    gdal = _importar_gdal()
+    if gdal is None:
+        raise OSError("Listar caminhos /vsi requer as bibliotecas GDAL do QGIS (osgeo.gdal).")
+    nomes = gdal.ReadDir(caminho_vsi)
+    if nomes is None:
+        raise OSError(f"Caminho virtual não encontrado: {caminho_vsi}")
+    base = caminho_vsi.rstrip('/')
+    return [(nome, _caminho_vsi(f'{base}/{nome}')) for nome in nomes if _eh_raster(nome)]
+
+
+def list_rasters(caminho_bandas):
+    """
+    Lista os rasters de uma cena como pares (nome do arquivo, caminho legível pelo GDAL).
+
+    Aceita um diretório local, um pacote .tar/.tar.gz da Coleção 2, um
+    caminho /vsi do GDAL ou um único arquivo .TIF/.TIF.gz. Dentro de uma
+    RasterSession a listagem é feita uma vez por caminho: as bandas e o
+    QA_PIXEL não percorrem de novo o pacote .tar.gz.
+    """
+    return list(memorizar(('list_rasters', caminho_bandas), lambda: _listar(caminho_bandas)))
+
+
+def _listar(caminho_bandas):
+    if caminho_bandas.startswith('/vsi'):
+        return _listar_vsi(caminho_bandas)
+    if not os.path.exists(caminho_bandas):
+        raise OSError(f"Caminho das bandas não encontrado: {caminho_bandas}")
+    if os.path.isdir(caminho_bandas):
+        return [
+            (nome, _caminho_vsi(os.path.join(caminho_bandas, nome)))
+            for nome in sorted(os.listdir(caminho_bandas))
+            if _eh_raster(nome)
+        ]
+    if is_tar_path(caminho_bandas):
+        return _listar_tar(caminho_bandas)
+    if _eh_raster(caminho_bandas):
+        return [(os.path.basename(caminho_bandas), _caminho_vsi(caminho_bandas))]
+    raise OSError(f"Formato de entrada de bandas não suportado: {caminho_bandas}")
+
+
+def discover_bands(caminho_bandas, bandas=BANDAS_NECESSARIAS):
+    """
+    Localiza as bandas Landsat pedidas e retorna {número da banda: caminho}.
+
+    Só as bandas em `bandas` são retornadas, para que as demais nunca sejam
+    lidas do pacote.
+    """
+    encontradas = {}
+    for nome, caminho in list_rasters(caminho_bandas):
+        match = PADRAO_BANDA.search(nome)
+        if match is None:
+            if PADRAO_QA.search(nome):
+                continue
+            LOGGER.warning(f"Nenhum número de banda encontrado em {nome}. Pulando este arquivo.")
+            continue
+        numero = int(match.group(1))
+        if numero in bandas:
+            encontradas[numero] = caminho
+    return encontradas
+
+
+def discover_qa(caminho_bandas):
+    """
+    Localiza a banda QA_PIXEL da cena; retorna None quando ela não está presente.
+    """
+    for nome, caminho in list_rasters(caminho_bandas):
+        if PADRAO_QA.search(nome):
+            return caminho
+    return None
@@ -0,0 +1,436 @@
+"""
+Processamento em lote de séries de cenas Landsat sobre a mesma AOI.
+
+Uso (a partir do diretório de plugins do QGIS, no Python do QGIS):
+    python -m EvapoGIS.batch manifesto.csv --mdt mdt.tif --shapefile aoi.shp \
+        --raster-referencia ref.tif --saida resultados/ [--workers 4]
+
+O manifesto (CSV ou JSON) tem uma linha por cena com as colunas
+cena, mtl, bandas, u2m, EToi, ETo, pcold, phot. pcold/phot aceitam
+"easting,northing" ou "auto" (padrão) para seleção automática das âncoras.
+Colunas u2m/EToi/ETo vazias são preenchidas a partir dos CSVs das estações
+(--estacao-horaria/--estacao-diaria) usando a data e hora de aquisição do MTL.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import util
+
+from .aoi import AOI
+from .energy_balance import MODELOS
+from .gdal_env import RasterSession, abrir
+from .log import configurar_log
+from .mtl_parser import is_tar_path
+from .overviews import REAMOSTRAGEM_PADRAO
+from .processing_functions import read_mtl, recortar_e_aliar_mdt, run_processing
+from .weather import WeatherProvider
+from .zonal import PRODUTOS_ZONAIS, ZonalStats
+
+# Estimativa de memória de pico do run_processing: cerca de 50 arrays
+# float64 com os pixels válidos vivos ao mesmo tempo, mais as bandas
+# recortadas (uint16) e as grades montadas na gravação.
+BYTES_POR_PIXEL = 400
+BYTES_POR_PIXEL_GRADE = 32
+FRACAO_MEMORIA = 0.7
+
+COLUNAS_STATUS = ('cena', 'status', 'duracao_s', 'mensagem', 'saida')
+
+LOGGER = logging.getLogger('evapogis.lote')
+PARAMETROS_METEOROLOGICOS = ('u2m', 'EToi', 'ETo')
+
+# Estado compartilhado por todas as cenas processadas em um mesmo worker
+_AOI = None
+_MDT_ALINHADO = None
+_ZONAL = None
+_SESSAO_GDAL = None
+
+
+def parse_coordenadas(valor):
+    """
+    Converte "easting,northing" (ou lista) em tupla; vazio ou "auto" vira 'auto'.
+    """
+    if valor is None:
+        return 'auto'
+    if isinstance(valor, (list, tuple)):
+        return tuple(float(v) for v in valor)
+    valor = str(valor).strip()
+    if not valor or valor.lower() == 'auto':
+        return 'auto'
+    return tuple(float(v) for v in valor.replace(';', ',').split(','))
+
+
+def carregar_manifesto(caminho_manifesto):
+    """
+    Lê o manifesto CSV ou JSON e retorna (cenas, parâmetros comuns).
+
+    No JSON, o documento pode ser uma lista de cenas ou um objeto com a
+    chave "cenas" e os parâmetros comuns (mdt, shapefile, raster_referencia,
+    saida, estacao_horaria, estacao_diaria, fuso_horario).
+    """
+    if caminho_manifesto.lower().endswith('.json'):
+        with open(caminho_manifesto, 'r', encoding='utf-8') as arquivo:
+            documento = json.load(arquivo)
+        if isinstance(documento, list):
+            cenas, comuns = documento, {}
+        else:
+            comuns = dict(documento)
+            cenas = comuns.pop('cenas')
+    else:
+        with open(caminho_manifesto, 'r', encoding='utf-8', newline='') as arquivo:
+            cenas, comuns = list(csv.DictReader(arquivo)), {}
+
+    base = os.path.dirname(os.path.abspath(caminho_manifesto))
+    jobs = []
+    for indice, linha in enumerate(cenas):
+        bandas = linha['bandas']
+        if not bandas.startswith('/vsi'):
+            bandas = os.path.join(base, bandas)
+        mtl = linha.get('mtl') or ''
+        if mtl:
+            mtl = os.path.join(base, mtl)
+        jobs.append({
+            'cena': linha.get('cena') or f'cena_{indice:04d}',
+            'mtl': mtl,
+            'bandas': bandas,
+            'u2m': linha.get('u2m'),
+            'EToi': linha.get('EToi'),
+            'ETo': linha.get('ETo'),
+            'pcold': parse_coordenadas(linha.get('pcold')),
+            'phot': parse_coordenadas(linha.get('phot')),
+        })
+    return jobs, comuns
+
+
+def memoria_disponivel():
+    """
+    Memória física disponível em bytes (psutil, /proc/meminfo ou sysconf).
+    """
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo') as arquivo:
+            for linha in arquivo:
+                if linha.startswith('MemAvailable:'):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def estimar_memoria_por_cena(raster_referencia_path, aoi=None):
+    """
+    Memória de pico estimada de uma cena, a partir da grade de processamento.
+
+    Com a `aoi`, só os pixels dentro das geometrias contam como pixels
+    processados; o restante do retângulo recortado não é mantido em memória.
+    """
+    with abrir(raster_referencia_path) as ref:
+        grade = ref.width * ref.height
+        validos = int(aoi.inside(ref).sum()) if aoi is not None else grade
+    return validos * BYTES_POR_PIXEL + grade * BYTES_POR_PIXEL_GRADE
+
+
+def calcular_workers(memoria_por_cena, max_workers=None):
+    """
+    Número de processos limitado pelos núcleos e pela memória disponível.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    disponivel = memoria_disponivel()
+    if disponivel is not None and memoria_por_cena > 0:
+        workers = min(workers, int(disponivel * FRACAO_MEMORIA // memoria_por_cena))
+    return max(1, workers)
+
+
+def resolver_meteorologia(jobs, meteorologia):
+    """
+    Preenche u2m/EToi/ETo ausentes no manifesto a partir das séries das estações.
+
+    Cada MTL é lido uma vez; as séries já estão indexadas no WeatherProvider.
+    Uma cena sem MTL ou sem dados das estações não interrompe as demais:
+    retorna a lista (job, mensagem) das cenas que não puderam ser resolvidas.
+    """
+    falhas = []
+    for job in jobs:
+        faltando = [nome for nome in PARAMETROS_METEOROLOGICOS if job.get(nome) in (None, '')]
+        if not faltando:
+            continue
+        try:
+            caminho_mtl = job['mtl'] or (job['bandas'] if is_tar_path(job['bandas']) else '')
+            mtl_data = read_mtl(caminho_mtl)
+            if not mtl_data:
+                raise ValueError("MTL necessário para buscar os dados meteorológicos.")
+            parametros = meteorologia.scene_parameters(mtl_data)
+        except (KeyError, ValueError) as e:
+            falhas.append((job, f"{type(e).__name__}: {e}"))
+            continue
+        for nome in faltando:
+            job[nome] = parametros[nome]
+    return falhas
+
+
+def _inicializar_worker(geometrias, mdt_alinhado, feicoes=None, config_log=None):
+    """
+    Carrega, uma vez por processo, a AOI, o MDT alinhado e as feições das
+    estatísticas zonais compartilhados entre cenas, e configura o log com os
+    mesmos parâmetros do processo principal.
+
+    O worker abre uma RasterSession que dura até o fim do processo: o
+    ambiente do GDAL e os handles de entradas comuns às cenas (raster de
+    referência, grades meteorológicas) são reaproveitados entre cenas. Ela é
+    fechada na saída do processo, o que apaga as grades reamostradas.
+    """
+    global _AOI, _MDT_ALINHADO, _ZONAL, _SESSAO_GDAL
+    if config_log is not None:
+        configurar_log(*config_log, forcar=True)
+    _SESSAO_GDAL = RasterSession().__enter__()
+    util.Finalize(None, _SESSAO_GDAL.__exit__, args=(None, None, None), exitpriority=0)
+    _AOI = AOI(geometrias)
+    _MDT_ALINHADO = mdt_alinhado
+    _ZONAL = ZonalStats(feicoes) if feicoes is not None else None
+
+
+def _valor_ou_grade(valor, nome):
+    """
+    Vento e ETo do manifesto: número ou caminho de um raster.
+
+    Um valor que não é número nem raster existente vira ValueError, para
+    que a cena tenha status de erro com a coluna inválida na mensagem.
+    """
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        pass
+    if isinstance(valor, str) and (valor.startswith('/vsi') or os.path.isfile(valor)):
+        return valor
+    raise ValueError(f"{nome} inválido no manifesto: {valor!r} (use um número ou o caminho de um raster).")
+
+
+def _processar_cena(job, comuns):
+    """
+    Executa o equivalente ao run_processing para uma cena e retorna o status.
+    """
+    saida = os.path.join(comuns['saida'], job['cena'])
+    inicio = time.perf_counter()
+    status = {'cena': job['cena'], 'saida': saida, 'mensagem': ''}
+    try:
+        os.makedirs(saida, exist_ok=True)
+        ok = run_processing(
+            job['mtl'],
+            comuns['mdt'],
+            job['bandas'],
+            comuns['shapefile'],
+            saida,
+            comuns['raster_referencia'],
+            _valor_ou_grade(job['u2m'], 'u2m'),
+            float(job['EToi']),
+            _valor_ou_grade(job['ETo'], 'ETo'),
+            None,
+            pcold_coords=job['pcold'],
+            phot_coords=job['phot'],
+            aoi=_AOI,
+            mdt_alinhado=_MDT_ALINHADO,
+            estatisticas_zonais=comuns.get('estatisticas_zonais'),
+            zonal=_ZONAL,
+            modelos=comuns.get('modelos') or ('SEBAL',),
+            correcao_terreno=comuns.get('correcao_terreno', False),
+            perfil=comuns.get('perfil', False),
+            escala_rgb=comuns.get('escala_rgb'),
+            overviews=comuns.get('overviews'),
+            reamostragem_overviews=comuns.get('reamostragem_overviews', REAMOSTRAGEM_PADRAO),
+            crs_ancoras=comuns.get('crs_ancoras'),
+        )
+        status['status'] = 'ok' if ok else 'falha'
+    except Exception as e:
+        status['status'] = 'erro'
+        status['mensagem'] = f'{type(e).__name__}: {e}'
+    status['duracao_s'] = f'{time.perf_counter() - inicio:.2f}'
+    return status
+
+
+def run_batch(jobs, caminho_mdt, shapefile_path, raster_referencia_path, output_dir, max_workers=None, status_path=None,
+              meteorologia=None, estatisticas_zonais=None, modelos=None, correcao_terreno=False,
+              perfil=False, config_log=None, escala_rgb=None, overviews=None,
+              reamostragem_overviews=REAMOSTRAGEM_PADRAO, crs_ancoras=None):
+    """
+    Processa as cenas do manifesto em um pool de processos.
+
+    `meteorologia` (WeatherProvider) completa os dados meteorológicos que
+    faltarem no manifesto. `estatisticas_zonais` lista os produtos resumidos
+    por feição do shapefile em cada cena e `modelos` os modelos de balanço
+    de energia executados sobre cada cena (ver run_processing). Com
+    `correcao_terreno`, a declividade e o aspecto do MDT são calculados uma
+    vez por processo e reaproveitados entre as cenas. Com `perfil`, cada
+    cena grava o relatório das etapas (perfil.json e perfil_trace.json).
+    `escala_rgb` ('uint8' ou 'uint16') grava a CC_432 estirada, como prévia.
+    `overviews` (True ou a lista dos níveis) gera as overviews dos produtos
+    de cada cena com a reamostragem `reamostragem_overviews`.
+    `crs_ancoras` é o SRC das coordenadas pcold/phot do manifesto (padrão:
+    o da grade de processamento).
+    `config_log` (nível, arquivo) repete nos workers a configuração do log.
+
+    A AOI é lida e o MDT é recortado/alinhado uma única vez e compartilhados
+    com os workers; cada worker mantém o cache de máscaras entre as cenas.
+    A tabela de status é gravada à medida que as cenas terminam.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if status_path is None:
+        status_path = os.path.join(output_dir, 'status_lote.csv')
+
+    # Cenas sem dados meteorológicos ficam com status de erro e não vão para o pool
+    falhas_meteorologia = resolver_meteorologia(jobs, meteorologia) if meteorologia is not None else []
+    sem_meteorologia = {id(job) for job, _ in falhas_meteorologia}
+    pendentes = [job for job in jobs if id(job) not in sem_meteorologia]
+
+    aoi = AOI.from_shapefile(shapefile_path)
+    mdt_output_path = os.path.join(output_dir, 'MDT_Sebal_recorte.tif')
+    # Sessão encerrada antes do pool, para que os workers não herdem os handles abertos
+    with RasterSession():
+        mdt_alinhado = recortar_e_aliar_mdt(caminho_mdt, shapefile_path, mdt_output_path, raster_referencia_path, aoi)
+        memoria_por_cena = estimar_memoria_por_cena(raster_referencia_path, aoi)
+    if mdt_alinhado[0] is None:
+        raise RuntimeError("Falha ao processar MDT.")
+
+    comuns = {
+        'mdt': caminho_mdt,
+        'shapefile': shapefile_path,
+        'raster_referencia': raster_referencia_path,
+        'saida': output_dir,
+        'estatisticas_zonais': estatisticas_zonais,
+        'modelos': modelos,
+        'correcao_terreno': correcao_terreno,
+        'perfil': perfil,
+        'escala_rgb': escala_rgb,
+        'overviews': overviews,
+        'reamostragem_overviews': reamostragem_overviews,
+        'crs_ancoras': crs_ancoras,
+    }
+    feicoes = ZonalStats.from_shapefile(shapefile_path).feicoes if estatisticas_zonais else None
+    workers = min(len(pendentes) or 1, calcular_workers(memoria_por_cena, max_workers))
+    LOGGER.info(f"Processando {len(pendentes)} cenas com {workers} processos.")
+
+    resultados = []
+    with open(status_path, 'w', newline='', encoding='utf-8') as arquivo_status:
+        escritor = csv.DictWriter(arquivo_status, fieldnames=COLUNAS_STATUS)
+        escritor.writeheader()
+
+        def registrar(status):
+            escritor.writerow(status)
+            arquivo_status.flush()
+            resultados.append(status)
+            LOGGER.info(f"[{len(resultados)}/{len(jobs)}] {status['cena']}: {status['status']} {status['mensagem']}",
+                        extra={'evento': 'cena', 'campos': {'cena': status['cena'], 'status': status['status'],
+                                                              'erro': status['mensagem'], 'duracao_s': status['duracao_s'],
+                                                              'feito': len(resultados), 'total': len(jobs)}})
+
+        for job, mensagem in falhas_meteorologia:
+            registrar({'cena': job['cena'], 'status': 'erro', 'duracao_s': '0.00', 'mensagem': mensagem,
+                       'saida': os.path.join(output_dir, job['cena'])})
+        if pendentes:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                     initargs=(aoi.geometrias, mdt_alinhado, feicoes, config_log)) as executor:
+                futuros = [executor.submit(_processar_cena, job, comuns) for job in pendentes]
+                for futuro in as_completed(futuros):
+                    registrar(futuro.result())
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Processamento SEBAL em lote a partir de um manifesto de cenas.")
+    parser.add_argument('manifesto', help='manifesto CSV ou JSON com uma cena por linha')
+    parser.add_argument('--mdt', help='MDT da AOI')
+    parser.add_argument('--shapefile', help='shapefile da AOI')
+    parser.add_argument('--raster-referencia', help='raster que define a grade de processamento')
+    parser.add_argument('--saida', help='diretório de saída (uma subpasta por cena)')
+    parser.add_argument('--workers', type=int, default=None, help='limite de processos (padrão: núcleos e memória)')
+    parser.add_argument('--estacao-horaria', help='CSV da estação com registros horários (u2m, EToi)')
+    parser.add_argument('--estacao-diaria', help='CSV da estação com a ETo diária (padrão: o horário)')
+    parser.add_argument('--fuso-horario', type=float, default=None, help='fuso dos CSVs em horas em relação ao UTC')
+    parser.add_argument('--estatisticas-zonais', default=None,
+                        help='produtos resumidos por feição do shapefile, separados por vírgula (ex.: ETday,Rn,NDVI)')
+    parser.add_argument('--modelos', default=None,
+                        help='modelos de balanço de energia, separados por vírgula (SEBAL, METRIC, SSEBop; padrão: SEBAL)')
+    parser.add_argument('--terreno', action='store_true',
+                        help='corrige a Rsi pela declividade e pelo aspecto do MDT')
+    parser.add_argument('--perfil', action='store_true',
+                        help='grava o tempo, a CPU, a memória e a E/S de cada etapa em perfil.json e perfil_trace.json')
+    parser.add_argument('--rgb', default=None, choices=('uint8', 'uint16'),
+                        help='grava a CC_432 estirada entre os percentis 2 e 98 (padrão: reflectâncias em float64)')
+    parser.add_argument('--overviews', nargs='?', const='auto', default=None,
+                        help='gera as overviews dos produtos: níveis separados por vírgula (ex.: 2,4,8,16) '
+                             'ou, sem valor, níveis automáticos')
+    parser.add_argument('--reamostragem-overviews', default=REAMOSTRAGEM_PADRAO,
+                        choices=('average', 'nearest', 'bilinear', 'cubic', 'mode'),
+                        help='reamostragem das overviews (padrão: average)')
+    parser.add_argument('--crs-ancoras', default=None,
+                        help='SRC das coordenadas pcold/phot do manifesto (ex.: EPSG:4326 para longitude,latitude; '
+                             'padrão: o da grade de processamento)')
+    parser.add_argument('--log-nivel', default='INFO', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                        help='nível das mensagens do EvapoGIS (as bibliotecas ficam em WARNING)')
+    parser.add_argument('--log-arquivo', default=None, help='grava também os eventos como JSON, um por linha')
+    args = parser.parse_args(argv)
+    configurar_log(args.log_nivel, args.log_arquivo)
+
+    jobs, comuns = carregar_manifesto(args.manifesto)
+    parametros = {
+        'mdt': args.mdt or comuns.get('mdt'),
+        'shapefile': args.shapefile or comuns.get('shapefile'),
+        'raster_referencia': args.raster_referencia or comuns.get('raster_referencia'),
+        'saida': args.saida or comuns.get('saida'),
+    }
+    faltando = [nome for nome, valor in parametros.items() if not valor]
+    if faltando:
+        parser.error("parâmetros obrigatórios ausentes: " + ", ".join(faltando))
+
+    meteorologia = None
+    estacao_horaria = args.estacao_horaria or comuns.get('estacao_horaria')
+    if estacao_horaria:
+        fuso = args.fuso_horario if args.fuso_horario is not None else comuns.get('fuso_horario', 0)
+        meteorologia = WeatherProvider(estacao_horaria, args.estacao_diaria or comuns.get('estacao_diaria'), fuso_horario=fuso)
+
+    produtos_zonais = args.estatisticas_zonais or comuns.get('estatisticas_zonais')
+    if isinstance(produtos_zonais, str):
+        produtos_zonais = [nome.strip() for nome in produtos_zonais.split(',') if nome.strip()]
+    desconhecidos = [nome for nome in produtos_zonais or () if nome not in PRODUTOS_ZONAIS]
+    if desconhecidos:
+        parser.error("produtos desconhecidos para as estatísticas zonais: " + ", ".join(desconhecidos))
+
+    modelos = args.modelos or comuns.get('modelos')
+    if isinstance(modelos, str):
+        modelos = [nome.strip() for nome in modelos.split(',') if nome.strip()]
+    desconhecidos = [nome for nome in modelos or () if nome not in MODELOS]
+    if desconhecidos:
+        parser.error("modelos desconhecidos: " + ", ".join(desconhecidos))
+
+    overviews = args.overviews or comuns.get('overviews')
+    if overviews == 'auto':
+        overviews = True
+    elif isinstance(overviews, str):
+        try:
+            overviews = [int(nivel) for nivel in overviews.split(',') if nivel.strip()]
+        except ValueError:
+            parser.error("níveis de overview inválidos: " + overviews)
+
+    resultados = run_batch(jobs, parametros['mdt'], parametros['shapefile'], parametros['raster_referencia'],
+                           parametros['saida'], max_workers=args.workers, meteorologia=meteorologia,
+                           estatisticas_zonais=produtos_zonais, modelos=modelos,
+                           correcao_terreno=args.terreno or bool(comuns.get('correcao_terreno')),
+                           perfil=args.perfil, config_log=(args.log_nivel, args.log_arquivo),
+                           escala_rgb=args.rgb or comuns.get('escala_rgb'), overviews=overviews,
+                           reamostragem_overviews=args.reamostragem_overviews,
+                           crs_ancoras=args.crs_ancoras or comuns.get('crs_ancoras'))
+    falhas = sum(1 for status in resultados if status['status'] != 'ok')
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
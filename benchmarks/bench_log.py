@@ -0,0 +1,115 @@
+"""
+Benchmark do custo do log: logger raiz em DEBUG (como no app.log) contra o logger evapogis.
+
+Uso:
+    python benchmarks/bench_log.py [--rasters 200] [--mensagens 20000]
+
+Abre e lê pequenos GeoTIFFs com o rasterio, como o run_processing faz para
+cada banda e produto, e emite mensagens de progresso. No cenário "antes" o
+logger raiz está em DEBUG gravando em arquivo e as mensagens são print; no
+"depois" o log é configurado por log.configurar_log. Não depende do QGIS.
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log import BIBLIOTECAS, configurar_log  # noqa: E402
+
+
+def gerar_rasters(pasta, quantidade):
+    perfil = {'driver': 'GTiff', 'height': 64, 'width': 64, 'count': 1, 'dtype': 'float32',
+              'crs': 'EPSG:32723', 'transform': from_origin(500000, 9000000, 30, 30)}
+    caminhos = []
+    for indice in range(quantidade):
+        caminho = os.path.join(pasta, f'produto{indice:04d}.tif')
+        with rasterio.open(caminho, 'w', **perfil) as dst:
+            dst.write(np.full((64, 64), indice, dtype='float32'), 1)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def ler_rasters(caminhos):
+    inicio = time.perf_counter()
+    for caminho in caminhos:
+        with rasterio.open(caminho) as src:
+            src.read(1)
+    return time.perf_counter() - inicio
+
+
+def linhas(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return sum(1 for _ in arquivo)
+
+
+def limpar_log():
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+        handler.close()
+    raiz.setLevel(logging.WARNING)
+    for nome in BIBLIOTECAS:
+        logging.getLogger(nome).setLevel(logging.NOTSET)
+
+
+def antes(caminhos, mensagens, caminho_log):
+    limpar_log()
+    logging.basicConfig(filename=caminho_log, level=logging.DEBUG,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    tempo_rasters = ler_rasters(caminhos)
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        for indice in range(mensagens):
+            print(f"Bloco {indice}/{mensagens} processado")
+    tempo_mensagens = time.perf_counter() - inicio
+    logging.shutdown()
+    return tempo_rasters, tempo_mensagens, linhas(caminho_log)
+
+
+def depois(caminhos, mensagens, caminho_log):
+    limpar_log()
+    # O logger raiz continua em DEBUG: o limite das bibliotecas é o que evita o custo
+    logging.basicConfig(filename=caminho_log, level=logging.DEBUG,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        logger = configurar_log(forcar=True)
+        tempo_rasters = ler_rasters(caminhos)
+        inicio = time.perf_counter()
+        for indice in range(mensagens):
+            logger.info(f"Bloco {indice}/{mensagens} processado",
+                        extra={'evento': 'progresso', 'campos': {'descricao': 'bench', 'feito': indice, 'total': mensagens}})
+        tempo_mensagens = time.perf_counter() - inicio
+    logging.shutdown()
+    return tempo_rasters, tempo_mensagens, linhas(caminho_log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rasters', type=int, default=200, help='número de GeoTIFFs abertos')
+    parser.add_argument('--mensagens', type=int, default=20000, help='número de mensagens de progresso')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminhos = gerar_rasters(tmp, args.rasters)
+        ler_rasters(caminhos)  # aquece o cache de páginas e o GDAL
+        resultados = [
+            ('antes (raiz DEBUG + print)',) + antes(caminhos, args.mensagens, os.path.join(tmp, 'antes.log')),
+            ('depois (evapogis)',) + depois(caminhos, args.mensagens, os.path.join(tmp, 'depois.log')),
+        ]
+
+    print(f"{'cenário':<28}{'abertura (ms)':>15}{'mensagens (s)':>15}{'linhas de log':>15}")
+    for nome, tempo_rasters, tempo_mensagens, quantidade in resultados:
+        print(f'{nome:<28}{1000 * tempo_rasters / args.rasters:>15.3f}{tempo_mensagens:>15.3f}{quantidade:>15}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark do leitor de MTL (txt/json/xml e .tar) contra o antigo read_mtl.
+
+Uso:
+    python benchmarks/bench_mtl.py [--arquivos 2000]
+
+Não depende do QGIS: apenas o módulo mtl_parser é importado.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mtl_parser import flatten_mtl, load_mtl, parse_mtl_text  # noqa: E402
+
+
+def gerar_grupos_mtl():
+    """
+    Gera grupos com o tamanho e a estrutura típicos de um MTL da Coleção 2.
+    """
+    grupos = {
+        'PRODUCT_CONTENTS': {'LANDSAT_PRODUCT_ID': 'LC08_L1TP_215065_20230810_20230818_02_T1'},
+        'IMAGE_ATTRIBUTES': {
+            'DATE_ACQUIRED': '2023-08-10',
+            'SCENE_CENTER_TIME': '12:41:12.0000000Z',
+            'SUN_AZIMUTH': '62.14785127',
+            'SUN_ELEVATION': '54.89137218',
+            'EARTH_SUN_DISTANCE': '1.0136542',
+        },
+        'LEVEL1_MIN_MAX_RADIANCE': {},
+        'LEVEL1_MIN_MAX_REFLECTANCE': {},
+        'LEVEL1_RADIOMETRIC_RESCALING': {},
+        'LEVEL1_THERMAL_CONSTANTS': {},
+        'LEVEL1_PROJECTION_PARAMETERS': {},
+    }
+    for banda in range(1, 12):
+        grupos['PRODUCT_CONTENTS'][f'FILE_NAME_BAND_{banda}'] = f'LC08_B{banda}.TIF'
+        grupos['LEVEL1_MIN_MAX_RADIANCE'][f'RADIANCE_MAXIMUM_BAND_{banda}'] = f'{700 - 50 * banda:.5f}'
+        grupos['LEVEL1_MIN_MAX_RADIANCE'][f'RADIANCE_MINIMUM_BAND_{banda}'] = '-57.80000'
+        grupos['LEVEL1_RADIOMETRIC_RESCALING'][f'RADIANCE_MULT_BAND_{banda}'] = '1.2500E-02'
+        grupos['LEVEL1_RADIOMETRIC_RESCALING'][f'RADIANCE_ADD_BAND_{banda}'] = '-62.51000'
+        if banda <= 9:
+            grupos['LEVEL1_MIN_MAX_REFLECTANCE'][f'REFLECTANCE_MAXIMUM_BAND_{banda}'] = '1.210700'
+            grupos['LEVEL1_MIN_MAX_REFLECTANCE'][f'REFLECTANCE_MINIMUM_BAND_{banda}'] = '-0.099980'
+            grupos['LEVEL1_RADIOMETRIC_RESCALING'][f'REFLECTANCE_MULT_BAND_{banda}'] = '2.0000E-05'
+            grupos['LEVEL1_RADIOMETRIC_RESCALING'][f'REFLECTANCE_ADD_BAND_{banda}'] = '-0.100000'
+    for banda in (10, 11):
+        grupos['LEVEL1_THERMAL_CONSTANTS'][f'K1_CONSTANT_BAND_{banda}'] = '774.8853'
+        grupos['LEVEL1_THERMAL_CONSTANTS'][f'K2_CONSTANT_BAND_{banda}'] = '1321.0789'
+    for indice in range(40):
+        grupos['LEVEL1_PROJECTION_PARAMETERS'][f'PARAMETRO_{indice}'] = f'{indice * 1.5:.3f}'
+    return {'LANDSAT_METADATA_FILE': grupos}
+
+
+def para_texto(grupos, nivel=0):
+    linhas = []
+    recuo = '  ' * nivel
+    for chave, valor in grupos.items():
+        if isinstance(valor, dict):
+            linhas.append(f'{recuo}GROUP = {chave}')
+            linhas.extend(para_texto(valor, nivel + 1))
+            linhas.append(f'{recuo}END_GROUP = {chave}')
+        else:
+            linhas.append(f'{recuo}{chave} = "{valor}"' if not valor[:1].isdigit() and valor[:1] != '-' else f'{recuo}{chave} = {valor}')
+    if nivel == 0:
+        linhas.append('END')
+    return linhas
+
+
+def para_xml(grupos):
+    def construir(pai, grupo):
+        for chave, valor in grupo.items():
+            elemento = ET.SubElement(pai, chave)
+            if isinstance(valor, dict):
+                construir(elemento, valor)
+            else:
+                elemento.text = valor
+
+    (nome, conteudo), = grupos.items()
+    raiz = ET.Element(nome)
+    construir(raiz, conteudo)
+    return ET.tostring(raiz, encoding='unicode')
+
+
+def read_mtl_legado(caminho_mtl):
+    """
+    Reprodução do read_mtl original (split em '=' e achatamento dos grupos).
+    """
+    mtl_data = {}
+    with open(caminho_mtl, 'r') as file:
+        for line in file:
+            parts = line.strip().split('=')
+            if len(parts) == 2:
+                key, value = parts
+                mtl_data[key.strip()] = value.strip().strip('"')
+    return mtl_data
+
+
+def cronometrar(funcao, caminhos):
+    inicio = time.perf_counter()
+    for caminho in caminhos:
+        funcao(caminho)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--arquivos', type=int, default=2000, help='número de MTLs por formato')
+    args = parser.parse_args()
+
+    grupos = gerar_grupos_mtl()
+    conteudos = {
+        'txt': '\n'.join(para_texto(grupos)) + '\n',
+        'json': json.dumps(grupos, indent=4),
+        'xml': para_xml(grupos),
+    }
+    assert flatten_mtl(parse_mtl_text(conteudos['txt'])) == flatten_mtl(grupos)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminhos = {}
+        for formato, conteudo in conteudos.items():
+            caminhos[formato] = []
+            for indice in range(args.arquivos):
+                caminho = os.path.join(tmp, f'CENA{indice:05d}_MTL.{formato}')
+                with open(caminho, 'w') as arquivo:
+                    arquivo.write(conteudo)
+                caminhos[formato].append(caminho)
+
+        # Pacotes .tar com o MTL e uma banda fictícia de 1 MB antes dele
+        caminhos['tar'] = []
+        dados_mtl = conteudos['txt'].encode('utf-8')
+        banda = b'\0' * (1 << 20)
+        for indice in range(min(args.arquivos, 200)):
+            caminho = os.path.join(tmp, f'CENA{indice:05d}.tar')
+            with tarfile.open(caminho, 'w') as tar:
+                for nome, dados in ((f'CENA{indice:05d}_B1.TIF', banda), (f'CENA{indice:05d}_MTL.txt', dados_mtl)):
+                    membro = tarfile.TarInfo(nome)
+                    membro.size = len(dados)
+                    tar.addfile(membro, io.BytesIO(dados))
+            caminhos['tar'].append(caminho)
+
+        resultados = [('legado (txt)', cronometrar(read_mtl_legado, caminhos['txt']), len(caminhos['txt']))]
+        for formato in ('txt', 'json', 'xml', 'tar'):
+            tempo = cronometrar(lambda caminho: flatten_mtl(load_mtl(caminho)), caminhos[formato])
+            resultados.append((f'mtl_parser ({formato})', tempo, len(caminhos[formato])))
+
+    print(f"{'leitor':<22}{'arquivos':>10}{'total (s)':>12}{'por MTL (ms)':>15}")
+    for nome, tempo, quantidade in resultados:
+        print(f'{nome:<22}{quantidade:>10}{tempo:>12.3f}{1000 * tempo / quantidade:>15.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Benchmark das etapas do SEBAL e do processamento completo sobre cenas sintéticas.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--tamanhos 1k,4k] [--repeticoes 3]
+                                        [--baseline benchmarks/baselines/pipeline.json]
+                                        [--salvar-baseline] [--tolerancia 1.5]
+
+Para cada tamanho, gera uma cena com cena_sintetica.gerar_cena e mede:
+- as etapas isoladas (índices, albedo, Ts, Rn, G, iteração de H do SEBAL e do
+  METRIC, ETday) sobre arrays 1-D com tantos valores quanto os pixels da
+  cena, o melhor tempo de `--repeticoes`;
+- o run_processing completo, com as etapas do Profiler (ingestão,
+  índices, temperatura, saldo de radiação, modelo, ETday...), também o
+  melhor tempo de `--repeticoes` execuções.
+
+Com `--salvar-baseline` os tempos são gravados no arquivo de baseline;
+sem ele, são comparados ao baseline e o comando termina com código 1 se
+alguma etapa ficar mais lenta que `--tolerancia` vezes o tempo de
+referência (diferenças abaixo de 10 ms são ignoradas). Os tempos só são
+comparáveis na mesma máquina: o baseline registra o processador e as
+versões usadas. Roda offline e não depende do QGIS nem do PyQt.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import types
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cena_sintetica import TAMANHOS, gerar_cena  # noqa: E402
+
+BASELINE_PADRAO = os.path.join(RAIZ, 'benchmarks', 'baselines', 'pipeline.json')
+PACOTE = 'evapogis_bench'
+# Diferença mínima para considerar uma etapa mais lenta (ruído do relógio)
+LIMIAR_S = 0.01
+
+
+def importar_plugin(modulo):
+    """
+    Importa um módulo do plugin sem executar o __init__ do pacote, que carrega os recursos do PyQt.
+    """
+    if PACOTE not in sys.modules:
+        pacote = types.ModuleType(PACOTE)
+        pacote.__path__ = [RAIZ]
+        sys.modules[PACOTE] = pacote
+    return importlib.import_module(f'{PACOTE}.{modulo}')
+
+
+def maquina():
+    return {
+        'processador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+
+
+def melhor_tempo(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def superficie_sintetica(pixels, semente=0):
+    """
+    Arrays 1-D dos pixels válidos com as faixas de valores de uma cena irrigada.
+    """
+    rng = np.random.default_rng(semente)
+    veg = rng.uniform(0, 1, pixels)
+    return {
+        'nir': (0.2 + 0.3 * veg).astype('float32'),
+        'red': (0.15 - 0.1 * veg).astype('float32'),
+        'temperatura_brilho': (300 - 10 * veg).astype('float32'),
+        'Rsi': np.full(pixels, 850, dtype='float32'),
+        'aS': 0.25 - 0.1 * veg,
+        'u_ast': rng.uniform(0.2, 0.5, pixels).astype('float32'),
+        'mdt': (300 + 200 * veg).astype('float32'),
+    }
+
+
+def medir_etapas(pixels, repeticoes):
+    """
+    Tempo das etapas do balanço de energia sobre `pixels` valores, na ordem do run_processing.
+    """
+    eb = importar_plugin('energy_balance')
+    kernels = importar_plugin('sebal_kernels')
+    dados = superficie_sintetica(pixels)
+    tempos = {}
+
+    def indices():
+        NDVI, SAVI = eb.indices_vegetacao(dados['nir'], dados['red'])
+        return (NDVI, SAVI) + kernels.lai_emissividades(SAVI, NDVI)
+
+    tempos['indices'] = melhor_tempo(indices, repeticoes)
+    NDVI, SAVI, LAI, eNBf, e0f = indices()
+
+    reflectancias = np.stack([dados['red'] * fator for fator in (0.6, 0.6, 0.7, 1.0, 2.0, 1.5, 1.2)]).astype('float64')
+    pesos = np.full(len(reflectancias), 1 / len(reflectancias))
+    tempos['albedo'] = melhor_tempo(lambda: eb.albedo_toa(reflectancias, pesos), repeticoes)
+
+    tempos['temperatura'] = melhor_tempo(
+        lambda: eb.temperatura_superficie(dados['temperatura_brilho'], eNBf), repeticoes)
+    Ts = eb.temperatura_superficie(dados['temperatura_brilho'], eNBf)
+    frio = int(kernels.selecionar_pixel_frio(Ts, NDVI)[0])
+    quente = int(kernels.selecionar_pixel_quente(Ts, SAVI)[0])
+
+    def saldo():
+        RLo = eb.radiacao_onda_longa_emitida(e0f, Ts)
+        RLi = eb.radiacao_onda_longa_incidente(0.75, np.float32(Ts[frio]))
+        return eb.saldo_radiacao(dados['aS'], dados['Rsi'], RLi, RLo, e0f)
+
+    tempos['saldo_radiacao'] = melhor_tempo(saldo, repeticoes)
+    Rn = saldo()
+    tempos['fluxo_calor_solo'] = melhor_tempo(lambda: eb.fluxo_calor_solo(Ts, dados['aS'], NDVI, Rn), repeticoes)
+    G = eb.fluxo_calor_solo(Ts, dados['aS'], NDVI, Rn)
+
+    Z0map = eb.rugosidade(SAVI.astype('float32'))
+    superficie = {'NDVI': NDVI, 'SAVI': SAVI, 'LAI': LAI, 'Ts': Ts, 'aS': dados['aS'], 'Rn': Rn, 'G': G,
+                  'Z0map': Z0map, 'u_ast': dados['u_ast'], 'rah': eb.resistencia_aerodinamica(dados['u_ast']),
+                  'mdt': dados['mdt']}
+    with np.errstate(all='ignore'):
+        for nome in ('SEBAL', 'METRIC'):
+            modelo = eb.MODELOS[nome]()
+            tempos[f'iteracao_H_{nome}'] = melhor_tempo(
+                lambda: modelo.calcular(superficie, frio, quente, 0.6), repeticoes)
+        ETof = eb.Sebal().calcular(superficie, frio, quente, 0.6)['ETof']
+    tempos['etday'] = melhor_tempo(lambda: ETof * 5.2, repeticoes)
+    return tempos
+
+
+def medir_pipeline(cena, pasta_saida):
+    """
+    Executa o run_processing completo e retorna o tempo de cada etapa de primeiro nível e o total.
+    """
+    processamento = importar_plugin('processing_functions')
+    profiling = importar_plugin('profiling')
+    perfil = profiling.Profiler()
+    inicio = time.perf_counter()
+    with np.errstate(all='ignore'):
+        ok = processamento.run_processing(
+            cena['mtl'], cena['mdt'], cena['bandas'], cena['aoi'], pasta_saida, cena['referencia'],
+            2.1, 0.6, 5.2, pcold_coords='auto', phot_coords='auto', perfil=perfil)
+    total = time.perf_counter() - inicio
+    if not ok:
+        raise RuntimeError(f'run_processing falhou para a cena {cena["mtl"]}')
+    tempos = {}
+    pixels = None
+    for registro in perfil.relatorio()['etapas']:
+        if registro['profundidade'] == 0:
+            tempos[registro['etapa']] = registro['tempo_s']
+        elif registro['etapa'] == 'etday':
+            tempos['etday'] = tempos.get('etday', 0) + registro['tempo_s']
+        if registro['etapa'] == 'ingestao':
+            pixels = registro['pixels']
+    tempos['total'] = total
+    return tempos, pixels
+
+
+def comparar(resultados, baseline, tolerancia):
+    """
+    Lista as etapas mais lentas que `tolerancia` vezes o baseline.
+    """
+    regressoes = []
+    for tamanho, grupos in resultados.items():
+        for grupo, tempos in grupos.items():
+            if not isinstance(tempos, dict):
+                continue
+            referencia = baseline.get(tamanho, {}).get(grupo, {})
+            for etapa, tempo in tempos.items():
+                anterior = referencia.get(etapa)
+                if anterior is not None and tempo > anterior * tolerancia and tempo - anterior > LIMIAR_S:
+                    regressoes.append((tamanho, grupo, etapa, anterior, tempo))
+    return regressoes
+
+
+def imprimir(resultados, baseline):
+    print(f"{'tamanho':<10}{'grupo':<10}{'etapa':<24}{'tempo (s)':>12}{'baseline (s)':>14}{'razão':>8}")
+    for tamanho, grupos in resultados.items():
+        for grupo in ('etapas', 'pipeline'):
+            referencia = baseline.get(tamanho, {}).get(grupo, {})
+            for etapa, tempo in grupos[grupo].items():
+                anterior = referencia.get(etapa)
+                colunas = f'{anterior:>14.4f}{tempo / anterior:>8.2f}' if anterior else f"{'':>14}{'':>8}"
+                print(f'{tamanho:<10}{grupo:<10}{etapa:<24}{tempo:>12.4f}{colunas}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tamanhos', default='1k', help='tamanhos separados por vírgula: ' + ', '.join(TAMANHOS) + ' ou pixels por lado')
+    parser.add_argument('--repeticoes', type=int, default=3, help='repetições de cada medição (vale o melhor tempo)')
+    parser.add_argument('--baseline', default=BASELINE_PADRAO, help='arquivo JSON de baseline')
+    parser.add_argument('--salvar-baseline', action='store_true', help='grava os tempos medidos como baseline')
+    parser.add_argument('--tolerancia', type=float, default=1.5, help='razão máxima tempo/baseline aceita')
+    parser.add_argument('--sem-pipeline', action='store_true', help='mede só as etapas isoladas')
+    args = parser.parse_args(argv)
+
+    # O log do plugin no console atrapalharia a tabela
+    importar_plugin('log').configurar_log(nivel='WARNING')
+
+    resultados = {}
+    for nome in args.tamanhos.split(','):
+        tamanho = TAMANHOS.get(nome) or int(nome)
+        with tempfile.TemporaryDirectory() as tmp:
+            cena = gerar_cena(os.path.join(tmp, 'cena'), tamanho)
+            grupos = {}
+            if not args.sem_pipeline:
+                # Melhor tempo de cada etapa entre as repetições (a primeira inclui as importações)
+                grupos['pipeline'] = {}
+                for repeticao in range(args.repeticoes):
+                    saida = os.path.join(tmp, f'saida{repeticao}')
+                    os.makedirs(saida)
+                    tempos, grupos['pixels'] = medir_pipeline(cena, saida)
+                    for etapa, tempo in tempos.items():
+                        grupos['pipeline'][etapa] = min(tempo, grupos['pipeline'].get(etapa, tempo))
+            grupos['etapas'] = medir_etapas(tamanho * tamanho, args.repeticoes)
+            grupos.setdefault('pipeline', {})
+        resultados[nome] = grupos
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        baseline = dados.get('resultados', {})
+        if dados.get('maquina') != maquina():
+            print(f"Aviso: baseline medido em outra máquina ({dados.get('maquina')}); as razões são indicativas.")
+    imprimir(resultados, baseline)
+
+    if args.salvar_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        for tamanho, grupos in resultados.items():
+            baseline.setdefault(tamanho, {}).update({grupo: tempos for grupo, tempos in grupos.items() if tempos})
+        with open(args.baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump({'maquina': maquina(), 'resultados': baseline}, arquivo, indent=2, ensure_ascii=False)
+        print(f'Baseline gravado em {args.baseline}.')
+        return 0
+
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    for tamanho, grupo, etapa, anterior, tempo in regressoes:
+        print(f'REGRESSÃO {tamanho}/{grupo}/{etapa}: {anterior:.4f} s -> {tempo:.4f} s')
+    return 1 if regressoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Cenas Landsat 8 sintéticas para os benchmarks e testes: MTL, bandas, QA_PIXEL, MDT e AOI.
+
+Uso:
+    python benchmarks/cena_sintetica.py PASTA [--tamanho 1000] [--semente 0]
+
+As bandas são GeoTIFFs uint16 em blocos de 256 com DEFLATE, como os COGs
+da Coleção 2. A superfície tem um gradiente de vegetação com áreas
+irrigadas (frias) e solo exposto (quente), de modo que os pixels âncora
+automáticos e o balanço de energia tenham valores realistas. Depende só
+de numpy, rasterio e geopandas.
+"""
+import argparse
+import os
+
+import numpy as np
+import rasterio
+from rasterio.mask import raster_geometry_mask
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+PREFIXO = 'LC08_L1TP_215065_20230810_20230818_02_T1'
+CRS = 'EPSG:32724'
+ORIGEM = (500000.0, 9000000.0)
+PIXEL = 30.0
+
+# Tamanhos de cena (pixels por lado); 'completa' tem a ordem de grandeza de uma cena Landsat
+TAMANHOS = {'1k': 1000, '4k': 4000, 'completa': 7800}
+
+SOL_ELEVACAO = 55.0
+SOL_AZIMUTE = 110.0
+REFLECTANCIA_MULT = 2.0e-5
+REFLECTANCIA_ADD = -0.1
+RADIANCIA_MULT_TERMICA = 3.342e-4
+RADIANCIA_ADD_TERMICA = 0.1
+K1 = 774.8853
+K2 = 1321.0789
+
+# QA_PIXEL: céu claro e nuvem com alta confiança
+QA_CLARO = 21824
+QA_NUVEM = 22280
+
+LINHAS_BLOCO = 512
+
+
+def texto_mtl():
+    """
+    MTL no formato texto da Coleção 2, com os grupos lidos pelo plugin.
+    """
+    linhas = [
+        'GROUP = LANDSAT_METADATA_FILE',
+        '  GROUP = PRODUCT_CONTENTS',
+        f'    LANDSAT_PRODUCT_ID = "{PREFIXO}"',
+        '    DATE_ACQUIRED = 2023-08-10',
+        '    SCENE_CENTER_TIME = "12:41:12.0000000Z"',
+        '  END_GROUP = PRODUCT_CONTENTS',
+        '  GROUP = IMAGE_ATTRIBUTES',
+        f'    SUN_ELEVATION = {SOL_ELEVACAO}',
+        f'    SUN_AZIMUTH = {SOL_AZIMUTE}',
+        '    EARTH_SUN_DISTANCE = 0.9900000',
+        '  END_GROUP = IMAGE_ATTRIBUTES',
+        '  GROUP = LEVEL1_MIN_MAX_RADIANCE',
+    ]
+    linhas += [f'    RADIANCE_MAXIMUM_BAND_{banda} = {700 - 60 * banda:.3f}' for banda in range(1, 8)]
+    linhas += ['  END_GROUP = LEVEL1_MIN_MAX_RADIANCE', '  GROUP = LEVEL1_MIN_MAX_REFLECTANCE']
+    linhas += [f'    REFLECTANCE_MAXIMUM_BAND_{banda} = 1.210700' for banda in range(1, 8)]
+    linhas += [
+        '  END_GROUP = LEVEL1_MIN_MAX_REFLECTANCE',
+        '  GROUP = LEVEL1_RADIOMETRIC_RESCALING',
+        f'    RADIANCE_MULT_BAND_10 = {RADIANCIA_MULT_TERMICA:.4E}',
+        f'    RADIANCE_ADD_BAND_10 = {RADIANCIA_ADD_TERMICA:.5f}',
+    ]
+    for banda in range(1, 8):
+        linhas.append(f'    REFLECTANCE_MULT_BAND_{banda} = {REFLECTANCIA_MULT:.4E}')
+        linhas.append(f'    REFLECTANCE_ADD_BAND_{banda} = {REFLECTANCIA_ADD:.6f}')
+    linhas += [
+        '  END_GROUP = LEVEL1_RADIOMETRIC_RESCALING',
+        '  GROUP = LEVEL1_THERMAL_CONSTANTS',
+        f'    K1_CONSTANT_BAND_10 = {K1}',
+        f'    K2_CONSTANT_BAND_10 = {K2}',
+        '  END_GROUP = LEVEL1_THERMAL_CONSTANTS',
+        'END_GROUP = LANDSAT_METADATA_FILE',
+        'END',
+    ]
+    return '\n'.join(linhas) + '\n'
+
+
+def _vegetacao(linhas, tamanho, rng):
+    """
+    Fração de vegetação (0 a 1) de um bloco de linhas da cena.
+    """
+    y = (np.arange(*linhas) / tamanho)[:, None]
+    x = (np.arange(tamanho) / tamanho)[None, :]
+    veg = 0.5 + 0.5 * np.sin(6 * x) * np.cos(5 * y) + rng.normal(0, 0.05, (linhas[1] - linhas[0], tamanho))
+    return np.clip(veg, 0, 1)
+
+
+def _reflectancias(veg):
+    return {
+        1: 0.1 + 0 * veg,
+        2: 0.09 + 0 * veg,
+        3: 0.08 + 0.02 * veg,
+        4: 0.15 - 0.1 * veg,
+        5: 0.2 + 0.3 * veg,
+        6: 0.25 - 0.1 * veg,
+        7: 0.2 - 0.1 * veg,
+    }
+
+
+def gerar_cena(pasta, tamanho=1000, semente=0, nuvem=True):
+    """
+    Gera uma cena sintética de `tamanho` x `tamanho` pixels em `pasta`.
+
+    Retorna os caminhos de entrada do run_processing: mtl, bandas (pasta),
+    mdt, aoi (shapefile) e referencia (grade de processamento, o retângulo
+    da AOI). Com `nuvem`, um quadrado dentro da AOI é marcado como nuvem no
+    QA_PIXEL.
+    """
+    import geopandas as gpd
+    from shapely.geometry import Polygon
+
+    os.makedirs(pasta, exist_ok=True)
+    pasta_bandas = os.path.join(pasta, 'bandas')
+    os.makedirs(pasta_bandas, exist_ok=True)
+    caminho_mtl = os.path.join(pasta, f'{PREFIXO}_MTL.txt')
+    with open(caminho_mtl, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(texto_mtl())
+
+    transform = from_origin(*ORIGEM, PIXEL, PIXEL)
+    perfil = {'driver': 'GTiff', 'width': tamanho, 'height': tamanho, 'count': 1, 'crs': CRS,
+              'transform': transform, 'dtype': 'uint16', 'nodata': 0, 'tiled': True,
+              'blockxsize': 256, 'blockysize': 256, 'compress': 'deflate', 'predictor': 2}
+    seno_sol = np.sin(np.deg2rad(SOL_ELEVACAO))
+    nomes = {banda: os.path.join(pasta_bandas, f'{PREFIXO}_B{banda}.TIF') for banda in (1, 2, 3, 4, 5, 6, 7, 10)}
+    nomes['qa'] = os.path.join(pasta_bandas, f'{PREFIXO}_QA_PIXEL.TIF')
+    caminho_mdt = os.path.join(pasta, 'mdt.tif')
+    destinos = {chave: rasterio.open(caminho, 'w', **perfil) for chave, caminho in nomes.items()}
+    destinos['mdt'] = rasterio.open(caminho_mdt, 'w', **dict(perfil, dtype='float32', nodata=None, predictor=3))
+    rng = np.random.default_rng(semente)
+    try:
+        for inicio in range(0, tamanho, LINHAS_BLOCO):
+            fim = min(inicio + LINHAS_BLOCO, tamanho)
+            janela = Window(0, inicio, tamanho, fim - inicio)
+            veg = _vegetacao((inicio, fim), tamanho, rng)
+            for banda, reflectancia in _reflectancias(veg).items():
+                dn = (reflectancia * seno_sol - REFLECTANCIA_ADD) / REFLECTANCIA_MULT
+                destinos[banda].write(np.clip(dn, 1, 65535).astype('uint16'), 1, window=janela)
+            Ts = 305 - 12 * veg
+            radiancia = K1 / (np.exp(K2 / Ts) - 1)
+            dn = (radiancia - RADIANCIA_ADD_TERMICA) / RADIANCIA_MULT_TERMICA
+            destinos[10].write(np.clip(dn, 1, 65535).astype('uint16'), 1, window=janela)
+
+            qa = np.full(veg.shape, QA_CLARO, dtype='uint16')
+            if nuvem:
+                linhas = np.arange(inicio, fim)[:, None] / tamanho
+                colunas = np.arange(tamanho)[None, :] / tamanho
+                qa[(abs(linhas - 0.35) < 0.05) & (abs(colunas - 0.35) < 0.05)] = QA_NUVEM
+            destinos['qa'].write(qa, 1, window=janela)
+
+            y = (np.arange(inicio, fim) / tamanho)[:, None]
+            x = (np.arange(tamanho) / tamanho)[None, :]
+            destinos['mdt'].write((300 + 200 * x + 50 * y).astype('float32'), 1, window=janela)
+    finally:
+        for destino in destinos.values():
+            destino.close()
+
+    # AOI: pentágono no interior da cena; a grade de referência é o seu retângulo envolvente
+    lado = tamanho * PIXEL
+    x0, y0 = ORIGEM
+    poligono = Polygon([(x0 + 0.1 * lado, y0 - 0.1 * lado), (x0 + 0.9 * lado, y0 - 0.15 * lado),
+                        (x0 + 0.7 * lado, y0 - 0.5 * lado), (x0 + 0.85 * lado, y0 - 0.9 * lado),
+                        (x0 + 0.15 * lado, y0 - 0.85 * lado)])
+    caminho_aoi = os.path.join(pasta, 'aoi.shp')
+    gpd.GeoDataFrame({'id': [1]}, geometry=[poligono], crs=CRS).to_file(caminho_aoi)
+
+    # Mesmo recorte que o AOI.crop faz nas bandas
+    with rasterio.open(nomes[4]) as src:
+        _, transform_recorte, janela = raster_geometry_mask(src, [poligono.__geo_interface__], crop=True)
+    caminho_referencia = os.path.join(pasta, 'referencia.tif')
+    perfil_referencia = dict(perfil, width=janela.width, height=janela.height, transform=transform_recorte,
+                             dtype='uint8', nodata=None, predictor=1)
+    with rasterio.open(caminho_referencia, 'w', **perfil_referencia):
+        pass
+
+    return {'mtl': caminho_mtl, 'bandas': pasta_bandas, 'mdt': caminho_mdt, 'aoi': caminho_aoi,
+            'referencia': caminho_referencia}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pasta', help='pasta de saída da cena')
+    parser.add_argument('--tamanho', default='1000', help='pixels por lado ou um de ' + ', '.join(TAMANHOS))
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+    tamanho = TAMANHOS.get(args.tamanho) or int(args.tamanho)
+    for nome, caminho in gerar_cena(args.pasta, tamanho, args.semente).items():
+        print(f'{nome}: {caminho}')
+
+
+if __name__ == '__main__':
+    main()
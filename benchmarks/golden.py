@@ -0,0 +1,247 @@
+"""
+Regressão numérica dos produtos contra saídas de referência (golden) em cenas sintéticas.
+
+Uso:
+    python benchmarks/golden.py [--modos SEBAL,multimodelo] [--pasta test/golden]
+    python benchmarks/golden.py --atualizar
+
+Cada modo é uma execução do run_processing (modelo, correção de terreno,
+vários modelos de uma vez...) sobre a mesma cena sintética pequena, com
+os pixels frio e quente em coordenadas fixas. Os modos de referência
+gravam, com --atualizar, os rasters dos produtos (<modo>.npz) e as suas
+estatísticas (golden.json); os demais modos, como as versões otimizadas
+do processamento, são comparados a um modo de referência. A comparação
+é pixel a pixel, com a tolerância de cada produto (rtol, atol), e exige
+nodata nas mesmas posições; as estatísticas usam as mesmas tolerâncias.
+Roda offline e não depende do QGIS nem do PyQt.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import rasterio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import RAIZ, importar_plugin  # noqa: E402
+from cena_sintetica import ORIGEM, PIXEL, gerar_cena  # noqa: E402
+
+PASTA_PADRAO = os.path.join(RAIZ, 'test', 'golden')
+TAMANHO = 64
+SEMENTE = 7
+
+# Pixels âncora como fração da cena (coluna, linha): vegetação densa e solo exposto
+ANCORA_FRIA = (0.26, 0.2)
+ANCORA_QUENTE = (0.78, 0.3)
+
+# Produtos fora da comparação: bandas recortadas e composição RGB
+IGNORADOS = ('band', 'CC_')
+
+# Tolerâncias (rtol, atol) por produto; 'padrao' vale para os demais
+TOLERANCIAS = {
+    'padrao': (1e-6, 1e-6),
+    # Comprimento de Monin-Obukhov: H próximo de zero amplifica diferenças de arredondamento
+    'L': (1e-4, 1e-3),
+    'L200m': (1e-4, 1e-4),
+    'L2m': (1e-4, 1e-4),
+    'L01m': (1e-4, 1e-4),
+}
+
+# Modos: argumentos do run_processing e, para cada subpasta da saída
+# ('' é a própria pasta), o modo de referência comparado
+MODOS = {
+    'SEBAL': {'kwargs': {'modelos': ('SEBAL',)}},
+    'METRIC': {'kwargs': {'modelos': ('METRIC',)}},
+    'SSEBop': {'kwargs': {'modelos': ('SSEBop',)}},
+    'SEBAL_terreno': {'kwargs': {'modelos': ('SEBAL',), 'correcao_terreno': True}},
+    # Prévia: bandas, MDT e QA_PIXEL lidos reduzidos 4 vezes, com as mesmas âncoras
+    'SEBAL_previa': {'kwargs': {'modelos': ('SEBAL',), 'decimacao': 4}},
+    'multimodelo': {
+        'kwargs': {'modelos': ('SEBAL', 'METRIC', 'SSEBop')},
+        'referencias': {'SEBAL': 'SEBAL', 'METRIC': 'METRIC', 'SSEBop': 'SSEBop'},
+    },
+}
+
+
+def referencias(modo):
+    """
+    {subpasta da saída: modo de referência}; um modo sem `referencias` é a própria referência.
+    """
+    return MODOS[modo].get('referencias', {'': modo})
+
+
+def modos_referencia():
+    return [modo for modo in MODOS if 'referencias' not in MODOS[modo]]
+
+
+def tolerancia(produto, modo=None):
+    especificas = MODOS.get(modo, {}).get('tolerancias', {})
+    return especificas.get(produto) or TOLERANCIAS.get(produto) or especificas.get('padrao') or TOLERANCIAS['padrao']
+
+
+def coordenadas(fracao, tamanho=TAMANHO):
+    """
+    Coordenadas (easting, northing) do centro do pixel na fração (coluna, linha) da cena.
+    """
+    coluna, linha = (int(valor * tamanho) for valor in fracao)
+    return (ORIGEM[0] + (coluna + 0.5) * PIXEL, ORIGEM[1] - (linha + 0.5) * PIXEL)
+
+
+def executar(modo, cena, pasta_saida):
+    """
+    Executa o run_processing do modo sobre a cena com os pixels âncora fixos.
+    """
+    processamento = importar_plugin('processing_functions')
+    os.makedirs(pasta_saida, exist_ok=True)
+    with np.errstate(all='ignore'):
+        ok = processamento.run_processing(
+            cena['mtl'], cena['mdt'], cena['bandas'], cena['aoi'], pasta_saida, cena['referencia'],
+            2.1, 0.6, 5.2, pcold_coords=coordenadas(ANCORA_FRIA), phot_coords=coordenadas(ANCORA_QUENTE),
+            **MODOS[modo]['kwargs'])
+    if not ok:
+        raise RuntimeError(f'O modo {modo} não gerou todos os produtos.')
+
+
+def ler_produtos(pasta_saida, subpasta=''):
+    """
+    Produtos gravados (nome: array); os da subpasta de um modelo substituem os da pasta comum.
+    """
+    produtos = {}
+    for pasta in dict.fromkeys([pasta_saida, os.path.join(pasta_saida, subpasta)]):
+        for caminho in sorted(glob.glob(os.path.join(pasta, '*.tif'))):
+            nome = os.path.splitext(os.path.basename(caminho))[0]
+            if nome.startswith(IGNORADOS):
+                continue
+            with rasterio.open(caminho) as src:
+                produtos[nome] = src.read(1)
+    return produtos
+
+
+def estatisticas(valores):
+    validos = valores[~np.isnan(valores)].astype('float64')
+    if validos.size == 0:
+        return {'validos': 0}
+    p5, p50, p95 = np.percentile(validos, (5, 50, 95))
+    return {'validos': int(validos.size), 'media': float(validos.mean()), 'desvio': float(validos.std()),
+            'minimo': float(validos.min()), 'maximo': float(validos.max()),
+            'p5': float(p5), 'p50': float(p50), 'p95': float(p95)}
+
+
+def comparar_produto(nome, valores, golden, modo=None):
+    """
+    Divergências de um produto em relação ao golden (lista vazia quando equivalente).
+    """
+    if valores.shape != golden.shape:
+        return [f'{nome}: forma {valores.shape} em vez de {golden.shape}']
+    rtol, atol = tolerancia(nome, modo)
+    nan_valores, nan_golden = np.isnan(valores), np.isnan(golden)
+    divergencias = []
+    if (nan_valores != nan_golden).any():
+        divergencias.append(f'{nome}: nodata em {int((nan_valores != nan_golden).sum())} pixels diferentes')
+    ambos = ~nan_valores & ~nan_golden
+    diferenca = np.abs(valores[ambos].astype('float64') - golden[ambos].astype('float64'))
+    fora = diferenca > atol + rtol * np.abs(golden[ambos].astype('float64'))
+    if fora.any():
+        divergencias.append(f'{nome}: {int(fora.sum())} pixels fora da tolerância (rtol={rtol}, atol={atol}), '
+                            f'diferença máxima {diferenca.max():.3g}')
+    return divergencias
+
+
+def comparar_estatisticas(nome, atuais, golden, modo=None):
+    rtol, atol = tolerancia(nome, modo)
+    divergencias = []
+    for campo, esperado in golden.items():
+        obtido = atuais.get(campo)
+        if obtido is None or abs(obtido - esperado) > atol + rtol * abs(esperado):
+            divergencias.append(f'{nome}: estatística {campo} = {obtido} em vez de {esperado}')
+    return divergencias
+
+
+def gerar_cena_golden(pasta):
+    return gerar_cena(pasta, TAMANHO, SEMENTE)
+
+
+def atualizar(pasta_golden=PASTA_PADRAO, modos=None):
+    """
+    Executa os modos de referência e grava os rasters e as estatísticas golden.
+    """
+    os.makedirs(pasta_golden, exist_ok=True)
+    caminho_json = os.path.join(pasta_golden, 'golden.json')
+    dados = {'cena': {'tamanho': TAMANHO, 'semente': SEMENTE},
+             'ancoras': {'fria': coordenadas(ANCORA_FRIA), 'quente': coordenadas(ANCORA_QUENTE)},
+             'estatisticas': {}}
+    if os.path.exists(caminho_json):
+        with open(caminho_json, encoding='utf-8') as arquivo:
+            dados['estatisticas'] = json.load(arquivo).get('estatisticas', {})
+    with tempfile.TemporaryDirectory() as tmp:
+        cena = gerar_cena_golden(os.path.join(tmp, 'cena'))
+        for modo in modos or modos_referencia():
+            saida = os.path.join(tmp, modo)
+            executar(modo, cena, saida)
+            produtos = ler_produtos(saida)
+            np.savez_compressed(os.path.join(pasta_golden, f'{modo}.npz'), **produtos)
+            dados['estatisticas'][modo] = {nome: estatisticas(valores) for nome, valores in produtos.items()}
+    with open(caminho_json, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, indent=1, ensure_ascii=False, sort_keys=True)
+    return caminho_json
+
+
+def verificar(modo, pasta_golden=PASTA_PADRAO, cena=None):
+    """
+    Executa o modo e retorna as divergências em relação aos modos de referência.
+    """
+    with open(os.path.join(pasta_golden, 'golden.json'), encoding='utf-8') as arquivo:
+        todas_estatisticas = json.load(arquivo)['estatisticas']
+    with tempfile.TemporaryDirectory() as tmp:
+        if cena is None:
+            cena = gerar_cena_golden(os.path.join(tmp, 'cena'))
+        saida = os.path.join(tmp, modo)
+        executar(modo, cena, saida)
+        divergencias = []
+        for subpasta, referencia in referencias(modo).items():
+            produtos = ler_produtos(saida, subpasta)
+            with np.load(os.path.join(pasta_golden, f'{referencia}.npz')) as golden:
+                for nome in golden.files:
+                    if nome not in produtos:
+                        divergencias.append(f'{referencia}/{nome}: produto não gerado')
+                        continue
+                    divergencias += [f'{referencia}/{texto}' for texto in
+                                     comparar_produto(nome, produtos[nome], golden[nome], modo)]
+            for nome, esperadas in todas_estatisticas[referencia].items():
+                if nome in produtos:
+                    divergencias += [f'{referencia}/{texto}' for texto in
+                                     comparar_estatisticas(nome, estatisticas(produtos[nome]), esperadas, modo)]
+    return divergencias
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modos', help='modos separados por vírgula: ' + ', '.join(MODOS))
+    parser.add_argument('--pasta', default=PASTA_PADRAO, help='pasta dos arquivos golden')
+    parser.add_argument('--atualizar', action='store_true', help='regrava os golden dos modos de referência')
+    args = parser.parse_args(argv)
+    importar_plugin('log').configurar_log(nivel='WARNING')
+    modos = args.modos.split(',') if args.modos else None
+
+    if args.atualizar:
+        print(f'Golden gravados em {atualizar(args.pasta, modos)}.')
+        return 0
+
+    falhas = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        cena = gerar_cena_golden(os.path.join(tmp, 'cena'))
+        for modo in modos or MODOS:
+            divergencias = verificar(modo, args.pasta, cena)
+            print(f"{modo}: {'ok' if not divergencias else f'{len(divergencias)} divergências'}")
+            for texto in divergencias:
+                print(f'  {texto}')
+            falhas += bool(divergencias)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import numpy as np
+import rasterio
+
+# Linhas da grade montadas por vez na gravação da composição
+LINHAS_BLOCO = 256
+
+# Pixels amostrados por banda para os percentis do estiramento
+AMOSTRA_HISTOGRAMA = 100000
+
+# Valor máximo de cada escala inteira; o zero fica reservado para nodata
+ESCALAS = {'uint8': 255, 'uint16': 65535}
+
+
+def percentis_amostrados(valores, percentis=(2, 98), amostra=AMOSTRA_HISTOGRAMA):
+    """
+    Percentis dos valores 1-D calculados sobre uma amostra regular de até `amostra` pixels.
+    """
+    passo = max(1, valores.size // amostra)
+    baixo, alto = np.nanpercentile(valores[::passo], percentis)
+    return float(baixo), float(alto)
+
+
+def estirar(valores, baixo, alto, dtype):
+    """
+    Estiramento linear de [baixo, alto] para 1..máximo do `dtype` inteiro, com saturação.
+    """
+    maximo = ESCALAS[dtype]
+    escala = (maximo - 1) / (alto - baixo) if alto > baixo else 0.0
+    escalado = (valores - baixo) * escala
+    np.clip(escalado, 0, maximo - 1, out=escalado)
+    escalado += 1.5  # desloca para 1..máximo e arredonda na conversão
+    return escalado.astype(dtype)
+
+
+def write_composite(caminho, bandas, store, meta, escala=None, percentis=(2, 98), amostra=AMOSTRA_HISTOGRAMA):
+    """
+    Grava uma composição multibanda (a CC_432, por exemplo) a partir dos arrays 1-D dos pixels válidos.
+
+    A grade é montada e gravada por blocos de LINHAS_BLOCO linhas, com
+    todas as bandas em uma única escrita por janela, sem empilhar a cena
+    inteira. Sem `escala`, os valores são gravados no dtype das bandas com
+    nodata NaN; com 'uint8' ou 'uint16', cada banda é estirada entre os
+    `percentis` de uma amostra de até `amostra` pixels, com nodata 0, para
+    prévias pequenas e rápidas de abrir. Retorna os limites do estiramento
+    por banda (None sem `escala`).
+    """
+    bandas = [np.asarray(banda) for banda in bandas]
+    if escala is None:
+        dtype, nodata, limites = np.result_type(*bandas), np.nan, None
+    elif escala in ESCALAS:
+        dtype, nodata = escala, 0
+        limites = [percentis_amostrados(banda, percentis, amostra) for banda in bandas]
+    else:
+        raise ValueError(f"Escala da composição desconhecida: {escala} (use uint8 ou uint16).")
+
+    altura, largura = store.shape
+    perfil = dict(meta, driver='GTiff', count=len(bandas), dtype=dtype, nodata=nodata,
+                  width=largura, height=altura)
+    if escala is not None and len(bandas) == 3:
+        perfil['photometric'] = 'RGB'
+    with rasterio.open(caminho, 'w', **perfil) as dst:
+        for inicio in range(0, altura, LINHAS_BLOCO):
+            fim = min(inicio + LINHAS_BLOCO, altura)
+            sub, fatia = store.rows(inicio, fim)
+            mascara = sub.mask()
+            bloco = np.full((len(bandas), fim - inicio, largura), nodata, dtype=dtype)
+            for indice, banda in enumerate(bandas):
+                valores = banda[fatia]
+                if limites is not None:
+                    valores = estirar(valores, *limites[indice], dtype)
+                bloco[indice][mascara] = valores
+            dst.write(bloco, window=((inicio, fim), (0, largura)))
+    return limites
@@ -0,0 +1,284 @@
+import logging
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Constantes físicas do balanço de energia
+RHO_CP = 1.25 * 1004  # densidade do ar (kg/m³) x calor específico (J/kg/K)
+SIGMA = 5.67e-8  # constante de Stefan-Boltzmann (W/m²/K⁴)
+K_VON_KARMAN = 0.41
+GRAVIDADE = 9.81
+CALOR_LATENTE = 2.45 * 1e6  # J/kg
+GRADIENTE_TERMICO = 0.0065  # K/m, correção de Ts para o datum no METRIC
+
+LOGGER = logging.getLogger('evapogis.modelos')
+
+
+# Primitivas compartilhadas pelos modelos. Todas operam sobre os arrays 1-D
+# dos pixels válidos (ou escalares) e mantêm a ordem das operações da
+# formulação original, para que os produtos não mudem entre os modelos.
+
+def indices_vegetacao(nir, red, Lsavi=0.5):
+    """
+    NDVI e SAVI a partir das reflectâncias do infravermelho próximo e do vermelho.
+    """
+    NDVI = np.clip((nir - red) / (nir + red + 1e-10), -1, 1)
+    SAVI = np.clip(((nir - red) / (nir + red + Lsavi)) * (1 + Lsavi), -1, 1)
+    return NDVI, SAVI
+
+
+def temperatura_superficie(temperatura_brilho, eNBf):
+    """
+    Temperatura de superfície corrigida pela emissividade de banda estreita.
+    """
+    return temperatura_brilho / (1 + ((10.8 * temperatura_brilho / 14380) * np.log(eNBf)))
+
+
+def albedo_toa(reflectancias, pesos):
+    """
+    Albedo no topo da atmosfera: soma das reflectâncias ponderadas pelos pesos ESUN.
+
+    `reflectancias` é a pilha (banda, ...) das bandas 1 a 7; a soma é um
+    único produto pelo vetor de pesos, sem um array temporário por banda, e
+    mantém o dtype da pilha.
+    """
+    reflectancias = np.asarray(reflectancias)
+    return np.tensordot(np.asarray(pesos, dtype=reflectancias.dtype), reflectancias, axes=1)
+
+
+def transmissividade(mdt):
+    """
+    Transmissividade atmosférica de céu claro em função da altitude.
+    """
+    return 0.75 + 0.00002 * mdt
+
+
+def albedo_superficie(aTOA, Tsw):
+    return (aTOA - 0.03) / (Tsw ** 2)
+
+
+def radiacao_onda_curta(cos_zenite, d2, Tsw):
+    """
+    Radiação de onda curta incidente (Rsi).
+
+    `cos_zenite` é o cosseno do zênite solar (terreno plano) ou, por pixel,
+    o cosseno do ângulo de incidência sobre o terreno.
+    """
+    return 1367 * cos_zenite * (1 / d2) * Tsw
+
+
+def radiacao_onda_longa_emitida(e0f, Ts):
+    return e0f * SIGMA * (Ts ** 4)
+
+
+def radiacao_onda_longa_incidente(Tsw, Ts_frio):
+    """
+    Radiação de onda longa incidente (RLi), a partir da Ts do pixel frio.
+    """
+    return 0.85 * ((-np.log(Tsw)) ** 0.09) * SIGMA * Ts_frio ** 4
+
+
+def saldo_radiacao(aS, Rsi, RLi, RLo, e0f):
+    return (1 - aS) * Rsi + RLi - RLo - (1 - e0f) * RLi
+
+
+def fluxo_calor_solo(Ts, aS, NDVI, Rn):
+    """
+    Fluxo de calor no solo (G) pela razão G/Rn de Bastiaanssen.
+    """
+    G_Rn = np.where(NDVI < 0, 0.5, ((Ts - 273.15) / aS) * (0.0038 * aS + 0.0074 * aS ** 2) * (1 - 0.98 * NDVI ** 4))
+    return G_Rn * Rn
+
+
+def rugosidade(SAVI):
+    """
+    Comprimento de rugosidade para o transporte de momentum (Z0map).
+    """
+    return np.exp(-5.809 + 5.62 * SAVI)
+
+
+def velocidade_friccao(u_200m, z0m):
+    """
+    Velocidade de fricção (u*) em condição neutra a partir do vento a 200 m.
+    """
+    return K_VON_KARMAN * u_200m / np.log(200 / z0m)
+
+
+def resistencia_aerodinamica(u_ast, z1=0.1, z2=2):
+    """
+    Resistência aerodinâmica ao transporte de calor (rah) em condição neutra.
+    """
+    return np.log(z2 / z1) / (u_ast * K_VON_KARMAN)
+
+
+def fluxo_calor_sensivel(dT, rah):
+    return (RHO_CP * dT) / rah
+
+
+def comprimento_monin_obukhov(Ts, u_ast, H):
+    return -(RHO_CP * Ts * u_ast ** 3) / (K_VON_KARMAN * GRAVIDADE * H)
+
+
+def psi_calor(L, z):
+    """
+    Correção de estabilidade para o transporte de calor à altura `z`.
+    """
+    return np.where(L < 0, 2 * np.log((1 + np.sqrt(1 - 16 * (z / L))) / 2),
+                    np.where(L > 0, -5 * (z / L), 0))
+
+
+def psi_momento(L, z):
+    """
+    Correção de estabilidade para o transporte de momentum à altura `z`.
+    """
+    x = (1 - 16 * (z / np.minimum(L, -1e-10))) ** 0.25
+    instavel = 2 * np.log((1 + x) / 2) + np.log((1 + x ** 2) / 2) - 2 * np.arctan(x) + 0.5 * np.pi
+    return np.where(L < 0, instavel, np.where(L > 0, -5 * (z / L), 0))
+
+
+def evapotranspiracao_instantanea(LET):
+    """
+    ETi (mm/h) a partir do fluxo de calor latente, sem valores negativos.
+    """
+    ETi = 3600 * (LET / CALOR_LATENTE)
+    return np.where(ETi < 0, 0, ETi)
+
+
+class ModeloBalanco(ABC):
+    """
+    Motor de um modelo de balanço de energia.
+
+    Recebe a superfície já calculada uma única vez para a cena (dicionário
+    de arrays 1-D com NDVI, SAVI, Ts, aS, Rn, G, Z0map, u_ast, rah e mdt) e
+    as posições dos pixels âncora, e retorna os produtos do modelo, em ordem
+    de gravação, terminando pela ETof.
+    """
+
+    nome = None
+
+    @abstractmethod
+    def calcular(self, superficie, frio, quente, EToi):
+        """
+        Produtos do modelo ({nome: array 1-D}) para os pixels âncora `frio` e `quente`.
+        """
+
+
+class Sebal(ModeloBalanco):
+    """
+    SEBAL: dT linear em Ts, calibrado com H = 0 no pixel frio e LE = 0 no quente.
+    """
+
+    nome = 'SEBAL'
+
+    def calcular(self, superficie, frio, quente, EToi):
+        Ts, Rn, G, rah = superficie['Ts'], superficie['Rn'], superficie['G'], superficie['rah']
+        # Ts dos pixels âncora na precisão dos rasters gravados (float32)
+        Ts_frio = np.float32(Ts[frio])
+        Ts_quente = np.float32(Ts[quente])
+
+        a = ((Rn[quente] - G[quente]) * rah[quente]) / ((Ts_quente - Ts_frio) * 1.25 * 1004)
+        b = -a * Ts_frio
+        LOGGER.info(f'a: {a} b: {b}', extra={'evento': 'calibracao', 'campos': {'modelo': self.nome, 'a': a, 'b': b}})
+        dT = a * Ts + b
+        H = fluxo_calor_sensivel(dT, rah)
+
+        L = comprimento_monin_obukhov(Ts, superficie['u_ast'], H)
+        produtos = {'dT': dT, 'H': H, 'L': L}
+        for nome, z in (('L200m', 200), ('L2m', 2), ('L01m', 0.1)):
+            produtos[nome] = psi_calor(L, z)
+
+        LET = Rn - G - H
+        ETi = evapotranspiracao_instantanea(LET)
+        produtos.update({'LET': LET, 'ETi': ETi, 'ETof': ETi / EToi})
+        return produtos
+
+
+class Metric(ModeloBalanco):
+    """
+    METRIC: dT linear na Ts corrigida para o datum pelo gradiente térmico,
+    com ET = `fator_frio` x ETr no pixel frio e ET = 0 no quente, e correção
+    iterativa de estabilidade em u* e rah.
+    """
+
+    nome = 'METRIC'
+
+    def __init__(self, fator_frio=1.05, gradiente=GRADIENTE_TERMICO, iteracoes=15, tolerancia=1e-3):
+        self.fator_frio = fator_frio
+        self.gradiente = gradiente
+        self.iteracoes = iteracoes
+        self.tolerancia = tolerancia
+
+    def calcular(self, superficie, frio, quente, EToi):
+        Ts, Rn, G = superficie['Ts'], superficie['Rn'], superficie['G']
+        Ts_datum = Ts + self.gradiente * superficie['mdt']
+        ln_z0 = np.log(200 / superficie['Z0map'])
+        # k * u200m: u* neutro vezes ln(200 / z0m), sem reler a grade de vento
+        ku_200m = superficie['u_ast'] * ln_z0
+        ln_rah = np.log(2 / 0.1)
+
+        H_frio = Rn[frio] - G[frio] - self.fator_frio * EToi * CALOR_LATENTE / 3600
+        H_quente = Rn[quente] - G[quente]
+        u_ast, rah = superficie['u_ast'], superficie['rah']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in range(self.iteracoes):
+                dT_frio = H_frio * rah[frio] / RHO_CP
+                dT_quente = H_quente * rah[quente] / RHO_CP
+                a = (dT_quente - dT_frio) / (Ts_datum[quente] - Ts_datum[frio])
+                b = dT_quente - a * Ts_datum[quente]
+                dT = a * Ts_datum + b
+                H = fluxo_calor_sensivel(dT, rah)
+
+                L = comprimento_monin_obukhov(Ts, u_ast, H)
+                u_ast = ku_200m / (ln_z0 - psi_momento(L, 200))
+                rah_anterior = rah[quente]
+                rah = (ln_rah - psi_calor(L, 2) + psi_calor(L, 0.1)) / (u_ast * K_VON_KARMAN)
+                if abs(rah[quente] - rah_anterior) < self.tolerancia * rah_anterior:
+                    break
+        LOGGER.info(f"METRIC: a = {a}, b = {b} após {i + 1} iterações de estabilidade.",
+                    extra={'evento': 'calibracao', 'campos': {'modelo': self.nome, 'a': a, 'b': b, 'iteracoes': i + 1}})
+
+        LET = Rn - G - H
+        ETi = evapotranspiracao_instantanea(LET)
+        return {'dT': dT, 'H': H, 'L': L, 'rah_corrigido': rah, 'LET': LET, 'ETi': ETi, 'ETof': ETi / EToi}
+
+
+class SSEBop(ModeloBalanco):
+    """
+    SSEBop: fração de ET pela posição de Ts entre a temperatura fria (Tc) e a
+    quente (Tc + dT), sem calcular H.
+
+    Tc é a Ts do pixel frio multiplicada por `fator_c`. Sem o Rn diário de
+    céu claro para o dT pré-definido, o dT vem da diferença entre as Ts dos
+    pixels quente e frio.
+    """
+
+    nome = 'SSEBop'
+
+    def __init__(self, fator_c=1.0, ETf_max=1.05):
+        self.fator_c = fator_c
+        self.ETf_max = ETf_max
+
+    def calcular(self, superficie, frio, quente, EToi):
+        Ts = superficie['Ts']
+        Tc = self.fator_c * Ts[frio]
+        dT = Ts[quente] - Tc
+        if dT <= 0:
+            raise ValueError("O pixel quente precisa ser mais quente que o pixel frio.")
+        ETf = np.clip((Tc + dT - Ts) / dT, 0, self.ETf_max)
+        LOGGER.info(f"SSEBop: Tc = {Tc} K, dT = {dT} K", extra={'evento': 'calibracao', 'campos': {'modelo': self.nome, 'Tc': Tc, 'dT': dT}})
+        return {'ETi': ETf * EToi, 'ETof': ETf}
+
+
+MODELOS = {modelo.nome: modelo for modelo in (Sebal, Metric, SSEBop)}
+
+
+def criar_modelos(nomes):
+    """
+    Instancia os motores dos modelos pedidos, na ordem dada.
+    """
+    modelos = []
+    for nome in nomes:
+        if nome not in MODELOS:
+            raise ValueError(f"Modelo de balanço de energia desconhecido: {nome}")
+        modelos.append(MODELOS[nome]())
+    return modelos
@@ -0,0 +1,209 @@
+import functools
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import rasterio
+
+# Opções do GDAL para uma execução: cache de blocos maior que o padrão (5%
+# da RAM em versões antigas), decodificação em várias threads, sem listar o
+# diretório a cada abertura (as cenas têm dezenas de arquivos ao lado de
+# cada banda) e cache de leitura para os caminhos /vsi (tar, gzip, s3).
+OPCOES_GDAL = {
+    'GDAL_CACHEMAX': 512,
+    'GDAL_NUM_THREADS': 'ALL_CPUS',
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+    'VSI_CACHE': True,
+    'VSI_CACHE_SIZE': 64 * 1024 * 1024,
+}
+
+# Datasets mantidos abertos pela sessão; os mais antigos são fechados primeiro
+MAX_DATASETS = 32
+
+# Threads das tarefas após a gravação (overviews), em paralelo ao processamento
+THREADS_SEGUNDO_PLANO = 1
+
+_SESSAO = None
+
+
+class RasterSession:
+    """
+    Um rasterio.Env com as OPCOES_GDAL e um pool de datasets de leitura.
+
+    Enquanto a sessão está ativa, abrir(caminho) devolve sempre o mesmo
+    handle para o mesmo arquivo, sem repetir a abertura, a identificação do
+    driver e a leitura do cabeçalho; listagens de diretórios e pacotes
+    também são memorizadas. Os handles são fechados ao sair da sessão.
+    Tarefas sobre arquivos já gravados (overviews dos produtos) rodam em
+    segundo plano, enquanto o processamento segue, e são aguardadas por
+    aguardar() ou ao sair da sessão. Arquivos temporários da sessão (grades
+    auxiliares reamostradas) ficam em pasta_temporaria(), apagada ao fim.
+    """
+
+    def __init__(self, max_datasets=MAX_DATASETS, **opcoes):
+        self.opcoes = dict(OPCOES_GDAL, **opcoes)
+        self.max_datasets = max_datasets
+        self._datasets = OrderedDict()
+        self._memo = {}
+        self._env = None
+        self._anterior = None
+        self._segundo_plano = None
+        self._pendentes = []
+        self._pasta = None
+        self.aberturas = 0
+        self.reaproveitamentos = 0
+
+    def __enter__(self):
+        global _SESSAO
+        self._env = rasterio.Env(**self.opcoes)
+        self._env.__enter__()
+        self._anterior = _SESSAO
+        _SESSAO = self
+        return self
+
+    def __exit__(self, *args):
+        global _SESSAO
+        try:
+            self.close()
+        finally:
+            _SESSAO = self._anterior
+            self._env.__exit__(*args)
+
+    def dataset(self, caminho):
+        """
+        Handle de leitura do pool para `caminho`, aberto na primeira vez.
+        """
+        chave = os.fspath(caminho)
+        dataset = self._datasets.get(chave)
+        if dataset is not None and not dataset.closed:
+            self._datasets.move_to_end(chave)
+            self.reaproveitamentos += 1
+            return dataset
+        dataset = rasterio.open(chave)
+        self.aberturas += 1
+        self._datasets[chave] = dataset
+        while len(self._datasets) > self.max_datasets:
+            _, antigo = self._datasets.popitem(last=False)
+            antigo.close()
+        return dataset
+
+    def esquecer(self, caminho):
+        """
+        Fecha o handle de `caminho`, por exemplo antes de regravar o arquivo.
+        """
+        dataset = self._datasets.pop(os.fspath(caminho), None)
+        if dataset is not None:
+            dataset.close()
+
+    def memo(self, chave, funcao):
+        """
+        Resultado de funcao() memorizado durante a sessão (listagens de diretórios e pacotes).
+        """
+        if chave not in self._memo:
+            self._memo[chave] = funcao()
+        return self._memo[chave]
+
+    def pasta_temporaria(self):
+        """
+        Pasta dos arquivos temporários da sessão, criada no primeiro uso e apagada por close().
+        """
+        if self._pasta is None:
+            self._pasta = tempfile.mkdtemp(prefix='evapogis_')
+        return self._pasta
+
+    def _executar(self, funcao, args, kwargs):
+        # As opções do rasterio.Env valem por thread
+        with rasterio.Env(**self.opcoes):
+            return funcao(*args, **kwargs)
+
+    def em_segundo_plano(self, funcao, *args, **kwargs):
+        """
+        Agenda funcao(*args, **kwargs) nas threads de segundo plano da sessão e retorna o Future.
+        """
+        if self._segundo_plano is None:
+            self._segundo_plano = ThreadPoolExecutor(max_workers=THREADS_SEGUNDO_PLANO,
+                                                     thread_name_prefix='evapogis-segundo-plano')
+        futuro = self._segundo_plano.submit(self._executar, funcao, args, kwargs)
+        self._pendentes.append(futuro)
+        return futuro
+
+    def aguardar(self):
+        """
+        Espera as tarefas em segundo plano agendadas até aqui; retorna as exceções levantadas.
+        """
+        pendentes, self._pendentes = self._pendentes, []
+        return [futuro.exception() for futuro in pendentes if futuro.exception() is not None]
+
+    def close(self):
+        self.aguardar()
+        if self._segundo_plano is not None:
+            self._segundo_plano.shutdown()
+            self._segundo_plano = None
+        while self._datasets:
+            _, dataset = self._datasets.popitem()
+            dataset.close()
+        self._memo.clear()
+        if self._pasta is not None:
+            shutil.rmtree(self._pasta, ignore_errors=True)
+            self._pasta = None
+
+
+def sessao_ativa():
+    return _SESSAO
+
+
+@contextmanager
+def abrir(caminho):
+    """
+    Abre um raster para leitura: do pool da sessão ativa ou, sem sessão, com rasterio.open.
+
+    Com a sessão, o handle continua aberto ao sair do bloco.
+    """
+    if _SESSAO is None:
+        with rasterio.open(caminho) as dataset:
+            yield dataset
+    else:
+        yield _SESSAO.dataset(caminho)
+
+
+def memorizar(chave, funcao):
+    """
+    funcao() memorizada na sessão ativa; sem sessão, sempre recalculada.
+    """
+    if _SESSAO is None:
+        return funcao()
+    return _SESSAO.memo(chave, funcao)
+
+
+def em_segundo_plano(funcao, *args, **kwargs):
+    """
+    Executa funcao em segundo plano na sessão ativa; sem sessão, imediatamente.
+    """
+    if _SESSAO is None:
+        funcao(*args, **kwargs)
+        return None
+    return _SESSAO.em_segundo_plano(funcao, *args, **kwargs)
+
+
+def aguardar_segundo_plano():
+    """
+    Espera as tarefas em segundo plano da sessão ativa; retorna as exceções levantadas.
+    """
+    return [] if _SESSAO is None else _SESSAO.aguardar()
+
+
+def com_sessao(funcao):
+    """
+    Executa a função dentro de uma RasterSession, a menos que já haja uma ativa
+    (como a do worker do processamento em lote, compartilhada entre cenas).
+    """
+    @functools.wraps(funcao)
+    def executar(*args, **kwargs):
+        if _SESSAO is not None:
+            return funcao(*args, **kwargs)
+        with RasterSession():
+            return funcao(*args, **kwargs)
+    return executar
@@ -0,0 +1,68 @@
+import logging
+
+LOGGER = logging.getLogger('evapogis.camadas')
+
+# Rampa de cores (nome no estilo padrão do QGIS, invertida) por produto
+RAMPAS = {
+    'ETday': ('RdYlBu', False),
+    'ETof': ('RdYlBu', False),
+    'ETi': ('RdYlBu', False),
+    'LET': ('RdYlBu', False),
+    'NDVI': ('RdYlGn', False),
+    'SAVI': ('RdYlGn', False),
+    'LAI': ('RdYlGn', False),
+    'Ts': ('Spectral', True),
+    'Rn': ('Spectral', True),
+    'G': ('Spectral', True),
+    'H': ('Spectral', True),
+}
+RAMPA_PADRAO = ('Viridis', False)
+
+# Limites de exibição de uma banda sem valores finitos (toda em nodata)
+LIMITES_SEM_DADOS = (0.0, 1.0)
+
+# Meia largura do intervalo de exibição de um produto constante
+MEIA_LARGURA_CONSTANTE = 0.5
+
+
+def rampa_produto(produto):
+    """
+    (rampa, invertida) do produto, ou RAMPA_PADRAO para os produtos sem rampa própria.
+    """
+    return RAMPAS.get(produto, RAMPA_PADRAO)
+
+
+def limites_banda(limites, produto=''):
+    """
+    (mínimo, máximo) de exibição de uma banda a partir dos limites calculados no processamento.
+
+    Sem limites (banda sem valores finitos), usa LIMITES_SEM_DADOS e avisa
+    no log; um produto constante ganha um intervalo em torno do valor, já
+    que a rampa precisa de mínimo < máximo.
+    """
+    if limites is None:
+        LOGGER.warning(f"{produto}: sem valores válidos para os limites de exibição; usando {LIMITES_SEM_DADOS}.")
+        return LIMITES_SEM_DADOS
+    minimo, maximo = float(limites[0]), float(limites[1])
+    if minimo >= maximo:
+        centro = (minimo + maximo) / 2
+        return centro - MEIA_LARGURA_CONSTANTE, centro + MEIA_LARGURA_CONSTANTE
+    return minimo, maximo
+
+
+def estilo_produto(produto, limites, bandas=1):
+    """
+    Renderizador a montar para o produto, decidido sem o QGIS e sem ler o raster.
+
+    Retorna ('rgb', [(mínimo, máximo)] das bandas 1, 2 e 3) para rasters
+    com 3 bandas ou mais, com os `limites` por banda (lista) ou os mesmos
+    para todas, e ('pseudocor', (mínimo, máximo, rampa, invertida)) para
+    os demais. Todo produto sai com limites explícitos: o renderizador
+    padrão do QGIS calcularia as estatísticas do raster inteiro.
+    """
+    if bandas >= 3:
+        por_banda = limites if isinstance(limites, list) else [limites] * 3
+        return 'rgb', [limites_banda(banda, produto) for banda in por_banda[:3]]
+    if isinstance(limites, list):
+        limites = limites[0]
+    return 'pseudocor', limites_banda(limites, produto) + rampa_produto(produto)
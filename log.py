@@ -0,0 +1,114 @@
+import json
+import logging
+import sys
+import time
+
+NOME_LOGGER = 'evapogis'
+
+# Bibliotecas cujo log DEBUG (rasterio.env, por exemplo) registra cada
+# abertura de dataset; por padrão ficam limitadas a WARNING
+BIBLIOTECAS = ('rasterio', 'fiona', 'pyogrio', 'shapely', 'matplotlib', 'urllib3', 'PIL')
+NIVEL_BIBLIOTECAS = logging.WARNING
+
+LOGGER = logging.getLogger(NOME_LOGGER)
+
+_configurado = False
+
+
+def evento(nome, **campos):
+    """
+    Campos estruturados de um registro: logger.info(msg, extra=evento('etapa', etapa='ndvi')).
+
+    Os módulos do plugin registram em loggers evapogis.<módulo>; os que não
+    importam este módulo passam o mesmo dicionário em `extra`.
+    """
+    return {'evento': nome, 'campos': campos}
+
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Uma linha JSON por registro, com o evento e os campos estruturados.
+    """
+
+    def format(self, record):
+        registro = {
+            'tempo': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+        }
+        if getattr(record, 'evento', None):
+            registro['evento'] = record.evento
+            for campo, valor in record.campos.items():
+                registro.setdefault(campo, valor)
+        if record.exc_info:
+            registro['excecao'] = self.formatException(record.exc_info)
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class FiltroProgresso(logging.Filter):
+    """
+    Deixa passar no máximo um registro de progresso (evento 'progresso') a
+    cada `intervalo` segundos por descrição, além do registro final.
+
+    Os laços podem registrar o progresso a cada bloco sem inundar o console;
+    os demais registros passam sem alteração.
+    """
+
+    def __init__(self, intervalo=2.0):
+        super().__init__()
+        self.intervalo = intervalo
+        self._ultimos = {}
+
+    def filter(self, record):
+        if getattr(record, 'evento', None) != 'progresso':
+            return True
+        campos = record.campos
+        if campos.get('feito', 0) >= campos.get('total', 0):
+            self._ultimos.pop(campos.get('descricao'), None)
+            return True
+        agora = time.monotonic()
+        ultimo = self._ultimos.get(campos.get('descricao'))
+        if ultimo is not None and agora - ultimo < self.intervalo:
+            return False
+        self._ultimos[campos.get('descricao')] = agora
+        return True
+
+
+def configurar_log(nivel=logging.INFO, arquivo=None, nivel_bibliotecas=NIVEL_BIBLIOTECAS, intervalo_progresso=2.0,
+                   forcar=False):
+    """
+    Configura o logger `evapogis`: mensagens no console (como os antigos
+    print) e, opcionalmente, JSON por linha em `arquivo`.
+
+    As bibliotecas de BIBLIOTECAS sem nível próprio são limitadas a
+    `nivel_bibliotecas`, para que um logger raiz em DEBUG (o do QGIS ou um
+    basicConfig) não formate cada entrada e saída do rasterio.Env. O
+    progresso é limitado a um registro a cada `intervalo_progresso`
+    segundos. Sem `forcar`, só a primeira chamada tem efeito.
+    """
+    global _configurado
+    if _configurado and not forcar:
+        return LOGGER
+    for handler in list(LOGGER.handlers):
+        LOGGER.removeHandler(handler)
+        handler.close()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    console.addFilter(FiltroProgresso(intervalo_progresso))
+    LOGGER.addHandler(console)
+    if arquivo:
+        registro = logging.FileHandler(arquivo, encoding='utf-8')
+        registro.setFormatter(FormatadorJSON())
+        registro.addFilter(FiltroProgresso(intervalo_progresso))
+        LOGGER.addHandler(registro)
+    LOGGER.setLevel(nivel)
+    LOGGER.propagate = False
+
+    for nome in BIBLIOTECAS:
+        biblioteca = logging.getLogger(nome)
+        if forcar or biblioteca.level == logging.NOTSET:
+            biblioteca.setLevel(nivel_bibliotecas)
+    _configurado = True
+    return LOGGER
@@ -0,0 +1,218 @@
+import json
+import os
+import tarfile
+import xml.etree.ElementTree as ET
+
+# Chaves do MTL sem as quais o processamento SEBAL não pode ser executado
+CHAVES_OBRIGATORIAS = (
+    'SUN_ELEVATION',
+    'EARTH_SUN_DISTANCE',
+    'RADIANCE_MULT_BAND_10',
+    'RADIANCE_ADD_BAND_10',
+    'K1_CONSTANT_BAND_10',
+    'K2_CONSTANT_BAND_10',
+) + tuple(
+    f'{prefixo}_BAND_{banda}'
+    for banda in range(1, 8)
+    for prefixo in ('REFLECTANCE_MULT', 'REFLECTANCE_ADD', 'RADIANCE_MAXIMUM', 'REFLECTANCE_MAXIMUM')
+)
+
+EXTENSOES_MTL = ('_MTL.txt', '_MTL.json', '_MTL.xml')
+EXTENSOES_TAR = ('.tar', '.tar.gz', '.tgz')
+
+
+class MTLError(Exception):
+    """
+    Erro de leitura, formato ou conteúdo de um arquivo MTL.
+    """
+
+
+def parse_mtl_text(texto):
+    """
+    Interpreta um MTL no formato texto (ODL), preservando os grupos.
+
+    Retorna um dicionário aninhado {grupo: {chave: valor, subgrupo: {...}}}.
+    """
+    raiz = {}
+    pilha = [raiz]
+    atual = raiz
+    for linha in texto.splitlines():
+        chave, sep, valor = linha.partition('=')
+        if not sep:
+            if linha.strip() == 'END':
+                break
+            continue
+        chave = chave.strip()
+        valor = valor.strip()
+        if chave == 'GROUP':
+            atual[valor] = atual = {}
+            pilha.append(atual)
+        elif chave == 'END_GROUP':
+            if len(pilha) == 1:
+                raise MTLError(f"END_GROUP sem GROUP correspondente: {valor}")
+            pilha.pop()
+            atual = pilha[-1]
+        elif valor[:1] == '"':
+            atual[chave] = valor.strip('"')
+        else:
+            atual[chave] = valor
+    if len(pilha) != 1:
+        raise MTLError("Arquivo MTL truncado: há grupos sem END_GROUP.")
+    return raiz
+
+
+def parse_mtl_json(texto):
+    """
+    Interpreta um MTL.json da Coleção 2, convertendo as folhas para texto.
+    """
+    try:
+        dados = json.loads(texto)
+    except ValueError as e:
+        raise MTLError(f"MTL JSON inválido: {e}")
+    if not isinstance(dados, dict):
+        raise MTLError("MTL JSON inválido: o documento deve ser um objeto.")
+
+    def converter(no):
+        return {
+            chave: converter(valor) if isinstance(valor, dict) else str(valor)
+            for chave, valor in no.items()
+        }
+
+    return converter(dados)
+
+
+def parse_mtl_xml(texto):
+    """
+    Interpreta um MTL.xml da Coleção 2; elementos com filhos viram grupos.
+    """
+    try:
+        raiz = ET.fromstring(texto)
+    except ET.ParseError as e:
+        raise MTLError(f"MTL XML inválido: {e}")
+
+    def converter(elemento):
+        grupo = {}
+        for filho in elemento:
+            if len(filho):
+                grupo[filho.tag] = converter(filho)
+            else:
+                grupo[filho.tag] = (filho.text or '').strip()
+        return grupo
+
+    return {raiz.tag: converter(raiz)}
+
+
+def _formato(nome, texto):
+    """
+    Identifica o formato do MTL pela extensão ou, na falta dela, pelo conteúdo.
+    """
+    nome = nome.lower()
+    if nome.endswith('.json'):
+        return 'json'
+    if nome.endswith('.xml'):
+        return 'xml'
+    if nome.endswith('.txt'):
+        return 'txt'
+    inicio = texto.lstrip()[:1]
+    if inicio == '{':
+        return 'json'
+    if inicio == '<':
+        return 'xml'
+    return 'txt'
+
+
+def parse_mtl_string(texto, nome=''):
+    """
+    Interpreta o conteúdo de um MTL em qualquer um dos três formatos.
+    """
+    formato = _formato(nome, texto)
+    if formato == 'json':
+        return parse_mtl_json(texto)
+    if formato == 'xml':
+        return parse_mtl_xml(texto)
+    return parse_mtl_text(texto)
+
+
+def is_tar_path(caminho):
+    """
+    Indica se o caminho aponta para um pacote .tar/.tar.gz da cena.
+    """
+    return caminho.lower().endswith(EXTENSOES_TAR)
+
+
+def _ler_mtl_do_tar(caminho_tar):
+    """
+    Lê o MTL diretamente do pacote .tar, sem extrair o restante da cena.
+
+    Dá preferência ao MTL.txt, depois ao JSON e por fim ao XML.
+    """
+    try:
+        with tarfile.open(caminho_tar, 'r:*') as tar:
+            membros = {}
+            for membro in tar:
+                for extensao in EXTENSOES_MTL:
+                    if membro.isfile() and membro.name.endswith(extensao):
+                        membros[extensao] = membro
+                if EXTENSOES_MTL[0] in membros:
+                    break
+            for extensao in EXTENSOES_MTL:
+                if extensao in membros:
+                    membro = membros[extensao]
+                    texto = tar.extractfile(membro).read().decode('utf-8')
+                    return texto, membro.name
+    except (OSError, tarfile.TarError) as e:
+        raise MTLError(f"Erro ao ler o pacote {caminho_tar}: {e}")
+    raise MTLError(f"Nenhum arquivo MTL encontrado no pacote {caminho_tar}.")
+
+
+def load_mtl(caminho):
+    """
+    Lê um MTL (.txt, .json, .xml ou de dentro de um .tar) e retorna os grupos.
+    """
+    if is_tar_path(caminho):
+        texto, nome = _ler_mtl_do_tar(caminho)
+    else:
+        try:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                texto = arquivo.read()
+        except (OSError, UnicodeDecodeError) as e:
+            raise MTLError(f"Erro ao ler o arquivo MTL {caminho}: {e}")
+        nome = os.path.basename(caminho)
+    return parse_mtl_string(texto, nome)
+
+
+def flatten_mtl(grupos):
+    """
+    Achata os grupos em um dicionário {chave: valor}, como o antigo read_mtl.
+
+    Chaves repetidas em grupos diferentes mantêm a última ocorrência.
+    """
+    plano = {}
+
+    def percorrer(grupo):
+        for chave, valor in grupo.items():
+            if isinstance(valor, dict):
+                percorrer(valor)
+            else:
+                plano[chave] = valor
+
+    percorrer(grupos)
+    return plano
+
+
+def validate_mtl(mtl_data, obrigatorias=CHAVES_OBRIGATORIAS):
+    """
+    Verifica se todas as chaves obrigatórias estão presentes e são numéricas.
+    """
+    faltando = [chave for chave in obrigatorias if chave not in mtl_data]
+    if faltando:
+        raise MTLError("Chaves obrigatórias ausentes no MTL: " + ", ".join(faltando))
+    invalidas = []
+    for chave in obrigatorias:
+        try:
+            float(mtl_data[chave])
+        except ValueError:
+            invalidas.append(chave)
+    if invalidas:
+        raise MTLError("Valores não numéricos no MTL: " + ", ".join(invalidas))
+    return mtl_data
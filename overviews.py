@@ -0,0 +1,43 @@
+import logging
+
+import rasterio
+from rasterio.enums import Resampling
+
+LOGGER = logging.getLogger('evapogis.overviews')
+
+# Lado, em pixels, abaixo do qual não se gera mais um nível de overview
+LADO_MINIMO = 256
+
+# Reamostragem padrão: a média ignora o nodata (NaN) dos produtos
+REAMOSTRAGEM_PADRAO = 'average'
+
+
+def niveis_automaticos(altura, largura, lado_minimo=LADO_MINIMO):
+    """
+    Fatores 2, 4, 8... até o maior lado da overview ficar abaixo de `lado_minimo`, como o gdaladdo.
+    """
+    niveis = []
+    fator = 2
+    while max(altura, largura) / (fator // 2) > lado_minimo:
+        niveis.append(fator)
+        fator *= 2
+    return niveis
+
+
+def build_overviews(caminho, niveis=None, reamostragem=REAMOSTRAGEM_PADRAO):
+    """
+    Gera as overviews internas do GeoTIFF já gravado em `caminho`.
+
+    `niveis` são os fatores de redução (None para niveis_automaticos) e
+    `reamostragem` o nome de um rasterio.enums.Resampling. Retorna os
+    níveis gerados; um raster pequeno demais não recebe overviews.
+    """
+    reamostragem = Resampling[reamostragem]
+    with rasterio.open(caminho, 'r+') as dst:
+        if niveis is None:
+            niveis = niveis_automaticos(dst.height, dst.width)
+        if niveis:
+            dst.build_overviews(list(niveis), reamostragem)
+            dst.update_tags(ns='rio_overview', resampling=reamostragem.name)
+    LOGGER.debug(f"Overviews {list(niveis)} geradas para {caminho}.")
+    return list(niveis)
@@ -0,0 +1,137 @@
+import numpy as np
+
+
+class PixelStore:
+    """
+    Pixels válidos de uma grade guardados como trechos contínuos por linha.
+
+    Cada trecho (linha, coluna inicial, coluna final) é uma sequência de
+    pixels válidos; os valores de um produto ficam em um array 1-D na ordem
+    das linhas. Para AOIs finas e irregulares, que ocupam pouco do retângulo
+    recortado, o índice custa alguns inteiros por linha em vez de um por
+    pixel, e a grade inteira só é montada na gravação. compact e expand
+    usam a máscara booleana da grade (um byte por pixel), montada uma
+    única vez e compartilhada, sem cópia, pelos sub-stores de rows().
+    """
+
+    def __init__(self, shape, linhas, inicios, fins):
+        self.shape = tuple(shape)
+        self.linhas = np.asarray(linhas, dtype=np.int64)
+        self.inicios = np.asarray(inicios, dtype=np.int64)
+        self.fins = np.asarray(fins, dtype=np.int64)
+        self.deslocamentos = np.concatenate(([0], np.cumsum(self.fins - self.inicios)))
+        self._chaves = self.linhas * self.shape[1] + self.inicios
+        self._mascara = None
+
+    @classmethod
+    def from_mask(cls, mascara):
+        """
+        Constrói os trechos a partir de uma máscara booleana da grade.
+        """
+        mascara = np.asarray(mascara, dtype=bool)
+        altura, largura = mascara.shape
+        borda = np.zeros((altura, largura + 2), dtype=np.int8)
+        borda[:, 1:-1] = mascara
+        transicoes = np.diff(borda, axis=1)
+        # np.nonzero percorre em ordem de linha, então inícios e fins ficam pareados
+        linhas, inicios = np.nonzero(transicoes == 1)
+        _, fins = np.nonzero(transicoes == -1)
+        return cls(mascara.shape, linhas, inicios, fins)
+
+    @property
+    def n(self):
+        return int(self.deslocamentos[-1])
+
+    @property
+    def fracao(self):
+        """
+        Fração da grade ocupada pelos pixels válidos.
+        """
+        return self.n / (self.shape[0] * self.shape[1])
+
+    def indices(self):
+        """
+        Índices planos (linha * largura + coluna) dos pixels válidos.
+
+        Gerados sob demanda a partir dos trechos; não ficam guardados.
+        Para ler e gravar valores, compact e expand usam a máscara.
+        """
+        comprimentos = self.fins - self.inicios
+        return np.repeat(self._chaves - self.deslocamentos[:-1], comprimentos) + np.arange(self.n)
+
+    def mask(self):
+        """
+        Máscara booleana (somente leitura) dos pixels válidos na grade.
+
+        Montada na primeira chamada, marcando o início (+1) e o fim (-1) de
+        cada trecho e acumulando, e guardada no store.
+        """
+        if self._mascara is None:
+            marcas = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int8)
+            np.add.at(marcas, self._chaves, 1)
+            np.add.at(marcas, self.linhas * self.shape[1] + self.fins, -1)
+            mascara = np.cumsum(marcas[:-1], dtype=np.int8).view(bool).reshape(self.shape)
+            mascara.flags.writeable = False
+            self._mascara = mascara
+        return self._mascara
+
+    def compact(self, grade):
+        """
+        Valores da grade (2-D) nos pixels válidos, como array 1-D.
+        """
+        return np.asarray(grade).reshape(self.shape)[self.mask()]
+
+    def expand(self, valores, preenchimento=np.nan, dtype=None):
+        """
+        Monta a grade a partir dos valores dos pixels válidos; os demais recebem `preenchimento`.
+        """
+        valores = np.asarray(valores)
+        grade = np.full(self.shape, preenchimento, dtype=dtype or valores.dtype)
+        grade[self.mask()] = valores
+        return grade
+
+    def position(self, row, col):
+        """
+        Posição do pixel (row, col) no array 1-D; None fora da grade ou se inválido.
+        """
+        if not (0 <= row < self.shape[0] and 0 <= col < self.shape[1]):
+            return None
+        trecho = int(np.searchsorted(self._chaves, row * self.shape[1] + col, side='right')) - 1
+        if trecho < 0 or self.linhas[trecho] != row or col >= self.fins[trecho]:
+            return None
+        return int(self.deslocamentos[trecho] + col - self.inicios[trecho])
+
+    def positions(self, rows, cols):
+        """
+        Posições de vários pixels (arrays de linhas e colunas) no array 1-D; -1 fora da grade ou se inválido.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if self.linhas.size == 0:
+            return np.full(rows.shape, -1, dtype=np.int64)
+        dentro = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        trechos = np.searchsorted(self._chaves, rows * self.shape[1] + cols, side='right') - 1
+        validos = dentro & (trechos >= 0)
+        trechos = np.where(validos, trechos, 0)
+        validos &= (self.linhas[trechos] == rows) & (cols < self.fins[trechos])
+        return np.where(validos, self.deslocamentos[trechos] + cols - self.inicios[trechos], -1)
+
+    def pixel(self, posicao):
+        """
+        (row, col) na grade do pixel na posição `posicao` do array 1-D.
+        """
+        trecho = int(np.searchsorted(self.deslocamentos, posicao, side='right')) - 1
+        return int(self.linhas[trecho]), int(self.inicios[trecho] + posicao - self.deslocamentos[trecho])
+
+    def rows(self, inicio, fim):
+        """
+        Sub-store das linhas [inicio, fim) e o trecho correspondente do array 1-D.
+
+        Como os valores estão em ordem de linha, um bloco de linhas inteiras
+        é sempre uma fatia contígua dos arrays compactados.
+        """
+        a, b = np.searchsorted(self.linhas, (inicio, fim))
+        sub = PixelStore((fim - inicio, self.shape[1]), self.linhas[a:b] - inicio, self.inicios[a:b], self.fins[a:b])
+        if self._mascara is not None:
+            sub._mascara = self._mascara[inicio:fim]
+        return sub, slice(int(self.deslocamentos[a]), int(self.deslocamentos[b]))
@@ -1,52 +1,73 @@
+import functools
+import logging
 import os
-import sys
-import re
+import tarfile
 import numpy as np
 import rasterio
 from rasterio.enums import Resampling
 from rasterio.warp import reproject
-from rasterio.mask import mask
-import geopandas as gpd
+from rasterio.transform import xy
 import math
-from PyQt5.QtWidgets import QMessageBox, QInputDialog
+from .sebal_kernels import lai_emissividades, selecionar_pixel_frio, selecionar_pixel_quente
+from .energy_balance import (albedo_superficie, albedo_toa, criar_modelos, fluxo_calor_solo, indices_vegetacao,
+                             radiacao_onda_curta, radiacao_onda_longa_emitida, radiacao_onda_longa_incidente,
+                             resistencia_aerodinamica, rugosidade, saldo_radiacao, temperatura_superficie,
+                             transmissividade, velocidade_friccao)
+from .scene_metadata import BANDA_TERMAL, BANDAS_REFLETIVAS, SceneMetadata
+from .mtl_parser import MTLError, flatten_mtl, is_tar_path, load_mtl, validate_mtl
+from .band_sources import discover_bands, discover_qa
+from .anchors import CAMADAS_CALIBRACAO, AnchorSampler
+from .aoi import AOI, grade_decimada
+from .aux_grids import ConstantGrid, apply_by_blocks, is_grid_input, open_input
+from .zonal import PRODUTOS_PADRAO, ZonalStats, write_zonal_stats
+from .qa import qa_invalid_mask
+from .pixel_store import PixelStore
+from .composite import ESCALAS, percentis_amostrados, write_composite
+from .terrain import terreno_para_mdt
+from .profiling import Profiler
+from .log import configurar_log, evento
+from .gdal_env import abrir, aguardar_segundo_plano, com_sessao, em_segundo_plano
+from .overviews import REAMOSTRAGEM_PADRAO, build_overviews
+
+LOGGER = logging.getLogger('evapogis.processamento')
 
 def read_mtl(caminho_mtl):
     """
-    Lê o arquivo MTL e extrai os metadados necessários.
+    Lê o arquivo MTL (.txt, .json, .xml ou dentro do pacote .tar) e extrai os metadados necessários.
+
+    Retorna um dicionário vazio em caso de erro, sem encerrar o QGIS.
     """
-    mtl_data = {}
     try:
-        with open(caminho_mtl, 'r') as file:
-            for line in file:
-                parts = line.strip().split('=')
-                if len(parts) == 2:
-                    key, value = parts
-                    mtl_data[key.strip()] = value.strip().strip('"')
-    except IOError:
-        print("Erro ao ler o arquivo MTL. Verifique o caminho fornecido.")
-        sys.exit(1)
+        mtl_data = flatten_mtl(load_mtl(caminho_mtl))
+        validate_mtl(mtl_data)
+    except MTLError as e:
+        LOGGER.error(f"Erro ao ler o arquivo MTL. Verifique o caminho fornecido. {e}")
+        return {}
     return mtl_data
 
-def recortar_e_aliar_mdt(caminho_mdt, shapefile_path, output_path, caminho_raster_referencia):
+def recortar_e_aliar_mdt(caminho_mdt, shapefile_path, output_path, caminho_raster_referencia, aoi=None, decimacao=1):
     """
     Recorta e alinha o MDT (Modelo Digital de Terreno) de acordo com o shapefile fornecido.
+
+    `aoi` permite reaproveitar geometrias e máscaras já carregadas.
+    Com `decimacao` > 1, o MDT é lido reduzido e alinhado à grade do raster
+    de referência reduzida pelo mesmo fator (modo prévia).
     """
     try:
-        with rasterio.open(caminho_raster_referencia) as ref_raster:
-            ref_transform = ref_raster.transform
+        with abrir(caminho_raster_referencia) as ref_raster:
+            ref_transform, ref_height, ref_width = grade_decimada(ref_raster.transform, ref_raster.height,
+                                                                  ref_raster.width, decimacao)
             ref_crs = ref_raster.crs
-            ref_width = ref_raster.width
-            ref_height = ref_raster.height
 
-        with rasterio.open(caminho_mdt) as src:
-            shapefile = gpd.read_file(shapefile_path)
-            if shapefile.empty:
-                print("Erro: Shapefile vazio ou não intersecta o MDT.")
+        with abrir(caminho_mdt) as src:
+            if aoi is None:
+                aoi = AOI.from_shapefile(shapefile_path)
+            if aoi.vazia:
+                LOGGER.error("Erro: Shapefile vazio ou não intersecta o MDT.")
                 return None, None
-            geometrias = [feature["geometry"] for feature in shapefile.__geo_interface__['features']]
-            out_image, out_transform = mask(src, geometrias, crop=True)
+            out_image, out_transform = aoi.crop(src, decimacao)
             if out_image.size == 0:
-                print("Erro: A máscara resultou em uma imagem vazia.")
+                LOGGER.error("Erro: A máscara resultou em uma imagem vazia.")
                 return None, None
             out_meta = src.meta.copy()
             out_meta.update({
@@ -71,37 +92,45 @@ def recortar_e_aliar_mdt(caminho_mdt, shapefile_path, output_path, caminho_raste
                 dst.write(reamostrado_image, 1)
             return reamostrado_image, out_meta
     except Exception as e:
-        print(f"Erro ao recortar e alinhar MDT: {e}")
+        LOGGER.error(f"Erro ao recortar e alinhar MDT: {e}")
         return None, None
 
-def process_images(caminho_bandas, shapefile_path, output_dir, mtl_data):
+def process_images(caminho_bandas, shapefile_path, output_dir, cena, aoi=None, mascaras=(), decimacao=1):
     """
     Processa as imagens das bandas, aplicando o recorte e calculando a reflectância TOA (Top of Atmosphere).
+
+    `caminho_bandas` pode ser um diretório, um pacote .tar/.tar.gz ou um caminho /vsi;
+    apenas as bandas necessárias são lidas, sem extração para o disco.
+    `cena` é o SceneMetadata com os coeficientes já pré-calculados e `aoi`
+    permite reaproveitar as geometrias e máscaras entre bandas e cenas.
+    São válidos os pixels dentro da AOI, sem preenchimento (nodata) em
+    nenhuma banda e verdadeiros em todas as `mascaras` adicionais (MDT,
+    QA_PIXEL). Só esses pixels são convertidos e mantidos em memória.
+    As reflectâncias das bandas 1 a 7 ficam em uma única pilha (banda,
+    pixel), em bandas['reflectancias']; bandas['band<n>'] são vistas das
+    suas linhas, sem cópia.
+    Com `decimacao` > 1, as bandas são lidas já reduzidas por esse fator
+    (leituras com out_shape, que aproveitam as overviews dos arquivos).
+    Retorna (bandas como arrays 1-D dos pixels válidos, PixelStore, out_meta).
     """
     bandas = {}
-    meta_data = None
-    if not os.path.exists(caminho_bandas):
-        print("Diretório das bandas não encontrado.")
+    valido = None
+    try:
+        arquivos = discover_bands(caminho_bandas)
+    except (OSError, tarfile.TarError) as e:
+        LOGGER.error(f"Diretório das bandas não encontrado ou ilegível: {e}")
         return None, None, None
 
-    arquivos = [os.path.join(caminho_bandas, arquivo) for arquivo in os.listdir(caminho_bandas) if arquivo.endswith(('.TIF', '.tif'))]
     out_meta = None  # Inicialização de out_meta
+    if aoi is None:
+        aoi = AOI.from_shapefile(shapefile_path)
 
-    for arquivo in arquivos:
-        nome_banda = os.path.basename(arquivo)
-        match = re.search(r'_B(\d+)', nome_banda)
-        if match:
-            band_number = int(match.group(1))
-        else:
-            print(f"Nenhum número de banda encontrado em {nome_banda}. Pulando este arquivo.")
-            continue
-
-        nome_saida = f'band{band_number}.tif'
+    # Números digitais recortados; a máscara só é conhecida após ler todas as bandas
+    lidas = {}
+    for band_number, arquivo in sorted(arquivos.items()):
         try:
-            with rasterio.open(arquivo) as src:
-                shapefile = gpd.read_file(shapefile_path)
-                geometrias = [feature["geometry"] for feature in shapefile.__geo_interface__['features']]
-                out_image, out_transform = mask(src, geometrias, crop=True)
+            with abrir(arquivo) as src:
+                out_image, out_transform = aoi.crop(src, decimacao)
                 out_meta = src.meta.copy()
                 out_meta.update({
                     "driver": "GTiff",
@@ -113,863 +142,555 @@ def process_images(caminho_bandas, shapefile_path, output_dir, mtl_data):
                 if out_image.ndim == 4:
                     out_image = out_image.reshape((1, *out_image.shape[-2:]))
 
-                if band_number == 10:
-                    processed_data = out_image[0]
-                else:
-                    # Calcula a reflectância TOA
-                    reflectance_mult_key = f'REFLECTANCE_MULT_BAND_{band_number}'
-                    reflectance_add_key = f'REFLECTANCE_ADD_BAND_{band_number}'
-                    sun_elevation = float(mtl_data['SUN_ELEVATION'])
-                    if reflectance_mult_key in mtl_data and reflectance_add_key in mtl_data:
-                        reflectance_mult = float(mtl_data[reflectance_mult_key])
-                        reflectance_add = float(mtl_data[reflectance_add_key])
-                        toa_reflectance = (reflectance_mult * out_image[0] + reflectance_add) / np.sin(np.deg2rad(sun_elevation))
-                        processed_data = toa_reflectance
-                    else:
-                        print(f"Chaves de metadados faltando para a banda {band_number}.")
-                        continue
-
-                output_path = os.path.join(output_dir, nome_saida)
-                with rasterio.open(output_path, 'w', **out_meta) as dst:
-                    dst.write(processed_data, 1)
-                bandas[nome_saida.replace('.tif', '')] = processed_data
+                if valido is None:
+                    valido = aoi.inside(src, decimacao)
+                valido &= out_image[0] != (src.nodata if src.nodata is not None else 0)
+                lidas[band_number] = out_image[0]
 
         except Exception as e:
-            print(f"Erro ao processar a banda {band_number}: {e}. Pulando.")
+            LOGGER.warning(f"Erro ao processar a banda {band_number}: {e}. Pulando.")
             continue
 
-    return bandas, meta_data, out_meta
-
-def run_processing(caminho_mtl, caminho_mdt, caminho_bandas, shapefile_path, output_dir, raster_referencia_path, u_2m, EToi, ETo, gui_dialog):
-    """
-    Função principal que executa todo o processamento dos dados para calcular a evapotranspiração.
-    """
-    # Leia os dados do MTL
-    mtl_data = read_mtl(caminho_mtl)
-
-    if not mtl_data:
-        print("Falha ao carregar dados MTL, terminando o programa.")
-        return
-
-    # Recortar e alinhar o MDT
-    mdt_output_path = os.path.join(output_dir, 'MDT_Sebal_recorte.tif')
-    mdt_recortado, mdt_meta = recortar_e_aliar_mdt(caminho_mdt, shapefile_path, mdt_output_path, raster_referencia_path)
-
-    if mdt_recortado is None:
-        print("Falha ao processar MDT.")
-        return
-
-    print("Processamento do MDT concluído com sucesso.")
-
-    # Processar as imagens de bandas
-    bandas, meta_data, out_meta = process_images(caminho_bandas, shapefile_path, output_dir, mtl_data)
-
-    if not bandas:
-        print("Nenhuma banda processada.")
-        return
-
-    # Acessar bandas específicas
-    nir_band = bandas.get('band5')  # Banda NIR
-    red_band = bandas.get('band4')  # Banda Vermelha
-    green_band = bandas.get('band3') # Banda Verde
-    blue_band = bandas.get('band2')  # Banda Azul
-    band1 = bandas.get('band1')
-    band2 = bandas.get('band2')
-    band3 = bandas.get('band3')
-    band4 = bandas.get('band4')
-    band5 = bandas.get('band5')
-    band6 = bandas.get('band6')
-    band7 = bandas.get('band7')
-    band10 = bandas.get('band10')
-
-    if nir_band is None or red_band is None or green_band is None or blue_band is None:
-        print("Algumas bandas necessárias estão faltando.")
-        return
-
-    # Criar composto RGB
-    rgb_composite = np.stack((red_band, green_band, blue_band), axis=0)
-    rgb_output_path = os.path.join(output_dir, 'CC_432.tif')
-    rgb_meta = out_meta.copy()
-    rgb_meta.update({
-        'driver': 'GTiff',
-        'count': 3,
-        'dtype': rgb_composite.dtype,
-        'width': rgb_composite.shape[2],
-        'height': rgb_composite.shape[1]
-    })
-
-    try:
-        with rasterio.open(rgb_output_path, 'w', **rgb_meta) as dst:
-            for i, band in enumerate(rgb_composite, start=1):
-                dst.write(band, i)
-        print("Composite RGB Landsat 8, be patient... Done!")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Calcular NDVI
-    NDVI = (nir_band - red_band) / (nir_band + red_band + 1e-10)
-    NDVI = np.clip(NDVI, -1, 1)
-
-    ndvi_output_path = os.path.join(output_dir, 'NDVI.tif')
-    ndvi_meta = out_meta.copy()
-    ndvi_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': NDVI.shape[1],
-        'height': NDVI.shape[0]
-    })
-
-    try:
-        with rasterio.open(ndvi_output_path, 'w', **ndvi_meta) as dst:
-            dst.write(NDVI.astype('float32'), 1)
-        print("NDVI salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Calcular SAVI
-    Lsavi = 0.5
-    SAVI = ((nir_band - red_band) / (nir_band + red_band + Lsavi)) * (1 + Lsavi)
-    SAVI = np.clip(SAVI, -1, 1)
-
-    savi_output_path = os.path.join(output_dir, 'SAVI.tif')
-    savi_meta = out_meta.copy()
-    savi_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': SAVI.shape[1],
-        'height': SAVI.shape[0]
-    })
-
-    try:
-        with rasterio.open(savi_output_path, 'w', **savi_meta) as dst:
-            dst.write(SAVI.astype('float32'), 1)
-        print("SAVI salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Calcular LAI
-    def calculate_lai(savi):
-        lai = np.zeros_like(savi, dtype=float)
-        lai[savi < 0.1] = 0.00001
-        mask = (savi >= 0.1) & (savi < 0.687)
-        lai[mask] = -np.log((0.69 - savi[mask]) / 0.59) / 0.91
-        lai[savi >= 0.687] = 6
-        return lai
-
-    LAI = calculate_lai(SAVI)
-
-    lai_output_path = os.path.join(output_dir, 'LAI.tif')
-    lai_meta = out_meta.copy()
-    lai_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': LAI.shape[1],
-        'height': LAI.shape[0]
-    })
-
-    try:
-        with rasterio.open(lai_output_path, 'w', **lai_meta) as dst:
-            dst.write(LAI.astype('float32'), 1)
-        print("LAI salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Processar Temperatura de Superfície (Ts)
-    radiance_mult_key = 'RADIANCE_MULT_BAND_10'
-    radiance_add_key = 'RADIANCE_ADD_BAND_10'
-    K1 = float(mtl_data['K1_CONSTANT_BAND_10'])
-    K2 = float(mtl_data['K2_CONSTANT_BAND_10'])
-
-    radiance_mult = float(mtl_data[radiance_mult_key])
-    radiance_add = float(mtl_data[radiance_add_key])
-
-    radiance = radiance_mult * band10 + radiance_add
-
-    temperature_brightness = K2 / np.log((K1 / radiance) + 1)
-
-    # Cálculo da Emissividade de Banda Estreita (eNBf)
-    eNB = np.where((LAI < 3) & (NDVI > 0), 0.97 + 0.0033 * LAI,
-                   np.where((LAI >= 3) & (NDVI > 0), 0.98, np.nan))
-    eNBf = np.where(np.isnan(eNB), 0.99, eNB)
-
-    eNBf_output_path = os.path.join(output_dir, 'eNBf.tif')
-    eNBf_meta = out_meta.copy()
-    eNBf_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': eNBf.dtype,
-        'width': eNBf.shape[1],
-        'height': eNBf.shape[0]
-    })
-
-    try:
-        with rasterio.open(eNBf_output_path, 'w', **eNBf_meta) as dst:
-            dst.write(eNBf, 1)
-        print("eNBf salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Cálculo da Emissividade de Banda Larga (e0f)
-    e0 = np.where((LAI < 3) & (NDVI > 0), 0.95 + 0.01 * LAI,
-                  np.where((LAI >= 3) & (NDVI > 0), 0.98, np.nan))
-    e0f = np.where(np.isnan(e0), 0.985, e0)
-
-    e0f_output_path = os.path.join(output_dir, 'e0f.tif')
-    e0f_meta = out_meta.copy()
-    e0f_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': e0f.dtype,
-        'width': e0f.shape[1],
-        'height': e0f.shape[0]
-    })
-
-    try:
-        with rasterio.open(e0f_output_path, 'w', **e0f_meta) as dst:
-            dst.write(e0f, 1)
-        print("e0f salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    Ts = temperature_brightness / (1 + ((10.8 * temperature_brightness / 14380) * np.log(eNBf)))
-
-    Ts_output_path = os.path.join(output_dir, 'Ts.tif')
-
-    Ts_meta = out_meta.copy()
-    Ts_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': Ts.shape[1],
-        'height': Ts.shape[0]
-    })
-
-    try:
-        with rasterio.open(Ts_output_path, 'w', **Ts_meta) as dst:
-            dst.write(Ts.astype('float32'), 1)
-        print("Ts salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Média da Temperatura de Brilho:", np.mean(temperature_brightness))
-    print("Média da Emissividade (Banda Estreita):", np.mean(eNBf))
-    print("Média da Emissividade (Banda Larga):", np.mean(e0f))
-    print("Média da Temperatura de Superfície:", np.mean(Ts))
-
-    # Cálculo de aTOA e aS
-    if 'EARTH_SUN_DISTANCE' in mtl_data:
-        d = float(mtl_data['EARTH_SUN_DISTANCE'])
-    else:
-        print("Chave 'EARTH_SUN_DISTANCE' não encontrada no MTL.")
-        return
-
-    radiance_maximum = {}
-    reflectance_maximum = {}
-
-    for key, value in mtl_data.items():
-        if 'RADIANCE_MAXIMUM_BAND_' in key:
-            radiance_maximum[key] = float(value)
-        elif 'REFLECTANCE_MAXIMUM_BAND_' in key:
-            reflectance_maximum[key] = float(value)
-
-    ESUN = []
-    for i in range(1, 8):
-        rad_max_key = f'RADIANCE_MAXIMUM_BAND_{i}'
-        ref_max_key = f'REFLECTANCE_MAXIMUM_BAND_{i}'
-        if rad_max_key in radiance_maximum and ref_max_key in reflectance_maximum:
-            ESUN_i = (math.pi * d * d) * (radiance_maximum[rad_max_key] / reflectance_maximum[ref_max_key])
-            ESUN.append(ESUN_i)
+    if not lidas:
+        return bandas, None, out_meta
+
+    for mascara in mascaras:
+        if mascara.shape != valido.shape:
+            LOGGER.error("A grade do MDT ou do QA_PIXEL não coincide com a das bandas recortadas; verifique o raster de referência.")
+            return {}, None, out_meta
+        valido &= mascara
+    store = PixelStore.from_mask(valido)
+    del valido
+
+    # Reflectâncias TOA das bandas 1 a 7 em uma única pilha contígua (banda, pixel)
+    reflectancias = np.full((len(BANDAS_REFLETIVAS), store.n), np.nan)
+    bandas['reflectancias'] = reflectancias
+    for band_number, dn in lidas.items():
+        dn = store.compact(dn)
+        if band_number == BANDA_TERMAL:
+            processed_data = dn
         else:
-            print(f"Chaves de radiância ou reflectância máxima faltando para a banda {i}.")
-            ESUN.append(0)
-
-    W = [value / sum(ESUN) for value in ESUN]
+            # Calcula a reflectância TOA
+            if cena.has_reflectance(band_number):
+                processed_data = cena.toa_reflectance(band_number, dn,
+                                                      out=reflectancias[BANDAS_REFLETIVAS.index(band_number)])
+            else:
+                LOGGER.warning(f"Chaves de metadados faltando para a banda {band_number}.")
+                continue
 
-    W1, W2, W3, W4, W5, W6, W7 = W
+        nome_saida = f'band{band_number}.tif'
+        try:
+            nodata = out_meta['nodata'] if out_meta['nodata'] is not None else 0
+            with rasterio.open(os.path.join(output_dir, nome_saida), 'w', **out_meta) as dst:
+                dst.write(store.expand(processed_data, preenchimento=nodata), 1)
+        except Exception as e:
+            LOGGER.error(f"Erro ao escrever a banda {band_number}: {e}")
+        bandas[nome_saida.replace('.tif', '')] = processed_data
 
-    aTOA = (band1 * W1 + band2 * W2 + band3 * W3 + band4 * W4 + band5 * W5 + band6 * W6 + band7 * W7)
+    return bandas, store, out_meta
 
-    aTOA_output_path = os.path.join(output_dir, 'aTOA.tif')
-    aTOA_meta = out_meta.copy()
-    aTOA_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': aTOA.dtype,
-        'width': aTOA.shape[1],
-        'height': aTOA.shape[0]
-    })
+def carregar_mascara_qa(caminho_bandas, aoi, dilatacao=0, decimacao=1):
+    """
+    Lê o QA_PIXEL recortado pela AOI e retorna a máscara dos pixels válidos.
 
+    Retorna None quando a cena não tem a banda QA_PIXEL.
+    """
     try:
-        with rasterio.open(aTOA_output_path, 'w', **aTOA_meta) as dst:
-            dst.write(aTOA, 1)
-        print("aTOA salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
+        caminho_qa = discover_qa(caminho_bandas)
+    except (OSError, tarfile.TarError) as e:
+        LOGGER.error(f"Erro ao procurar a banda QA_PIXEL: {e}")
+        return None
+    if caminho_qa is None:
+        LOGGER.warning("Banda QA_PIXEL não encontrada; nuvens e sombras não serão mascaradas.")
+        return None
+    with abrir(caminho_qa) as src:
+        qa, _ = aoi.crop(src, decimacao)
+    invalido = qa_invalid_mask(qa[0], dilatacao=dilatacao)
+    if LOGGER.isEnabledFor(logging.INFO):
+        LOGGER.info("QA_PIXEL: %.1f%% dos pixels mascarados (nuvens, sombras e cirros).", 100 * invalido.mean())
+    return ~invalido
+
+
+def _limites_exibicao(valores):
+    """
+    Percentis 2 e 98 de uma amostra dos valores válidos, ou None sem valores finitos.
+    """
+    with np.errstate(all='ignore'):
+        finitos = valores[np.isfinite(valores)]
+    if finitos.size == 0:
+        return None
+    return percentis_amostrados(finitos)
 
-    # Cálculo de Tsw
-    Tsw = 0.75 + 0.00002 * mdt_recortado
 
-    Tsw_output_path = os.path.join(output_dir, 'Tsw.tif')
+def _salvar_raster(caminho, valores, store, out_meta, dtype='float32', overviews=None, limites=None):
+    """
+    Grava um produto calculado sobre os pixels válidos como GeoTIFF com nodata NaN.
 
-    Tsw_meta = out_meta.copy()
-    Tsw_meta.update({
+    A grade é montada a partir do PixelStore só no momento da gravação.
+    Com `overviews` (níveis, reamostragem), as overviews do arquivo são
+    geradas em segundo plano, enquanto o processamento segue. `limites`,
+    se informado, recebe em limites[caminho] os percentis 2 e 98 dos valores.
+    """
+    meta = out_meta.copy()
+    meta.update({
         'driver': 'GTiff',
         'count': 1,
-        'dtype': Tsw.dtype,
-        'width': Tsw.shape[1],
-        'height': Tsw.shape[0]
+        'dtype': dtype,
+        'nodata': np.nan,
+        'width': store.shape[1],
+        'height': store.shape[0]
     })
-
     try:
-        with rasterio.open(Tsw_output_path, 'w', **Tsw_meta) as dst:
-            dst.write(Tsw, 1)
-        print("Tsw salvo com sucesso.")
+        with rasterio.open(caminho, 'w', **meta) as dst:
+            dst.write(store.expand(valores, dtype=dtype), 1)
+        produto = os.path.splitext(os.path.basename(caminho))[0]
+        LOGGER.info(f"{produto} salvo com sucesso.", extra=evento('produto_gravado', produto=produto, caminho=caminho))
     except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
+        LOGGER.error(f"Erro ao escrever o arquivo TIFF: {e}")
+        return
+    if overviews:
+        em_segundo_plano(build_overviews, caminho, *overviews)
+    if limites is not None:
+        limites[caminho] = _limites_exibicao(valores)
 
-    # Calculando o albedo da superfície (aS)
-    aS = (aTOA - 0.03) / (Tsw ** 2)
 
-    aS_output_path = os.path.join(output_dir, 'aS.tif')
+def _solicitar_coordenadas(gui_dialog, titulo, mensagem):
+    """
+    Pede ao usuário as coordenadas (easting, northing) de um pixel âncora.
 
-    aS_meta = out_meta.copy()
-    aS_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': aS.dtype,
-        'width': aS.shape[1],
-        'height': aS.shape[0]
-    })
+    Retorna None se o usuário cancelar.
+    """
+    from PyQt5.QtWidgets import QInputDialog, QMessageBox
 
-    try:
-        with rasterio.open(aS_output_path, 'w', **aS_meta) as dst:
-            dst.write(aS, 1)
-        print("aS salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
+    coords_str, ok = QInputDialog.getText(gui_dialog, titulo, mensagem)
+    if not ok:
+        QMessageBox.warning(gui_dialog, "Processamento Cancelado", "Processamento cancelado pelo usuário.")
+        return None
+    return tuple(map(float, coords_str.strip().split(',')))
 
-    # Calcular Rsi
-    sun_elevation = float(mtl_data['SUN_ELEVATION'])
-    SUN_ELEVATION_rad = np.deg2rad(90 - sun_elevation)
-    Rsi = 1367 * np.cos(SUN_ELEVATION_rad) * (1 / (d**2)) * Tsw
 
-    Rsi_output_path = os.path.join(output_dir, 'Rsi.tif')
+def _localizar_ancora(amostrador, coordenadas, crs):
+    """
+    Posição do pixel âncora no array 1-D (None fora da AOI ou mascarado) e as suas coordenadas no SRC da grade.
+    """
+    posicoes, coordenadas_grade = amostrador.localizar(coordenadas, crs)
+    posicao = int(posicoes[0])
+    return (posicao if posicao >= 0 else None), tuple(float(valor) for valor in coordenadas_grade[0])
 
-    Rsi_meta = out_meta.copy()
-    Rsi_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': Rsi.shape[1],
-        'height': Rsi.shape[0]
-    })
 
-    try:
-        with rasterio.open(Rsi_output_path, 'w', **Rsi_meta) as dst:
-            dst.write(Rsi.astype('float32'), 1)
-        print("Rsi salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
+def _coordenadas_pixel(transform, row, col):
+    """
+    Coordenadas do centro do pixel (row, col) no SRC da grade de processamento.
+    """
+    return tuple(float(v) for v in xy(transform, row, col))
 
-    # Calcular RLo
-    RLo = e0f * 5.67e-8 * (Ts ** 4)
 
-    RLo_output_path = os.path.join(output_dir, 'RLo.tif')
+@com_sessao
+def run_processing(caminho_mtl, caminho_mdt, caminho_bandas, shapefile_path, output_dir, raster_referencia_path, u_2m, EToi, ETo, gui_dialog=None,
+                   pcold_coords=None, phot_coords=None, aoi=None, mdt_alinhado=None, estatisticas_zonais=None, zonal=None,
+                   mascara_qa=True, dilatacao_qa=0, modelos=('SEBAL',), correcao_terreno=False,
+                   perfil=None, escala_rgb=None, decimacao=1, ancoras=None, overviews=None,
+                   reamostragem_overviews=REAMOSTRAGEM_PADRAO, limites_exibicao=None, crs_ancoras=None):
+    """
+    Função principal que executa todo o processamento dos dados para calcular a evapotranspiração.
 
-    RLo_meta = out_meta.copy()
-    RLo_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': RLo.shape[1],
-        'height': RLo.shape[0]
-    })
+    `pcold_coords`/`phot_coords` são as coordenadas (easting, northing) dos pixels
+    âncora ou 'auto' para seleção automática; se None, são pedidas ao usuário.
+    Estão no SRC da grade de processamento ou em `crs_ancoras` (por exemplo
+    'EPSG:4326', com longitude e latitude).
+    `u_2m` e `ETo` podem ser escalares ou caminhos de rasters (GeoTIFF, NetCDF...),
+    reamostrados uma única vez para a grade de processamento.
+    `aoi` e `mdt_alinhado` (tupla array, meta) permitem reaproveitar a AOI e o MDT
+    já alinhado entre cenas, como no processamento em lote.
+    `estatisticas_zonais` lista os produtos resumidos por feição do shapefile
+    (True para ETday, Rn e NDVI); `zonal` reaproveita o ZonalStats entre cenas.
+    Com `mascara_qa`, nuvens, sombras e cirros do QA_PIXEL (dilatados em
+    `dilatacao_qa` pixels) são excluídos antes do balanço de energia.
+    `modelos` lista os modelos de balanço de energia (SEBAL, METRIC, SSEBop)
+    executados sobre a mesma cena: leitura, índices, Ts, Rn, G, u* e rah são
+    calculados uma única vez e compartilhados; com mais de um modelo, os
+    produtos de cada um (dT, H, LET, ETi, ETof, ETday...) ficam em uma
+    subpasta com o nome do modelo.
+    Com `correcao_terreno`, a Rsi usa o ângulo de incidência solar sobre a
+    declividade e o aspecto do MDT alinhado (calculados uma vez por grade de
+    MDT e reaproveitados entre cenas), em vez de supor terreno plano.
+    `perfil` mede cada etapa (tempo, CPU, memória, E/S e pixels): com True,
+    grava perfil.json e perfil_trace.json no diretório de saída; um
+    Profiler permite acumular as medições de várias execuções.
+    `escala_rgb` ('uint8' ou 'uint16') grava a CC_432 estirada entre os
+    percentis 2 e 98 de uma amostra dos pixels, em vez das reflectâncias
+    em float64.
+    `decimacao` > 1 é o modo prévia: bandas, MDT e QA_PIXEL são lidos
+    reduzidos por esse fator e toda a cadeia roda sobre a grade pequena,
+    em segundos, para conferir os pixels âncora e o padrão da ET antes do
+    processamento completo. `ancoras`, se informado, é um dicionário que
+    recebe as coordenadas dos pixels âncora usados ('pcold' e 'phot', no
+    SRC da grade), para repeti-las em outra execução, como a completa após
+    a prévia, e os valores das camadas da calibração nos dois pixels
+    ('valores': {camada: (frio, quente)}).
+    `overviews` gera as overviews internas de cada produto gravado, para
+    exibição imediata no QGIS: True para os níveis automáticos (2, 4, 8...
+    até cerca de 256 pixels) ou a lista dos níveis, com a reamostragem
+    `reamostragem_overviews`. São geradas em segundo plano na sessão GDAL,
+    enquanto os produtos seguintes são calculados, e aguardadas no final.
+    `limites_exibicao`, se informado, é um dicionário que recebe, para o
+    caminho de cada produto gravado, os percentis 2 e 98 de uma amostra dos
+    valores ainda em memória (uma tupla por banda na CC_432), usados como
+    mínimo e máximo do estilo das camadas no QGIS (ver qgis_layers) sem que
+    o QGIS precise calcular as estatísticas dos rasters.
+    Os cálculos são feitos só sobre os pixels válidos (dentro da AOI, com
+    dados em todas as bandas e no MDT), guardados como arrays 1-D de um
+    PixelStore desde a leitura das bandas; os demais ficam com nodata NaN.
+    A execução ocorre dentro de uma RasterSession (gdal_env), que abre cada
+    entrada uma única vez, ou na sessão já ativa do chamador.
+    Retorna True quando todos os produtos foram gerados.
+    """
+    configurar_log()
+    gravar_perfil = perfil is True
+    if overviews:
+        overviews = (None if overviews is True else tuple(overviews), reamostragem_overviews)
+    salvar = functools.partial(_salvar_raster, overviews=overviews, limites=limites_exibicao)
+    if not isinstance(perfil, Profiler):
+        perfil = Profiler(ativo=bool(perfil))
+
+    with perfil.etapa('metadados'):
+        # Leia os dados do MTL
+        # Sem MTL informado, usa o que acompanha o pacote .tar da cena
+        if not caminho_mtl and is_tar_path(caminho_bandas):
+            caminho_mtl = caminho_bandas
+        mtl_data = read_mtl(caminho_mtl)
+
+        if not mtl_data:
+            LOGGER.error("Falha ao carregar dados MTL, terminando o programa.")
+            return
 
-    try:
-        with rasterio.open(RLo_output_path, 'w', **RLo_meta) as dst:
-            dst.write(RLo.astype('float32'), 1)
-        print("RLo salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
+        try:
+            cena = SceneMetadata.from_mtl(mtl_data)
+        except (KeyError, ValueError) as e:
+            LOGGER.error(f"Metadados obrigatórios ausentes ou inválidos no MTL: {e}")
+            return
 
-    # Criação da Máscara do Pixel Frio (Pcold)
-    Ts_median = np.nanmedian(Ts)
-    Pcold = np.where((NDVI > 0.4) & (Ts < Ts_median), Ts, np.nan)
+        try:
+            modelos = criar_modelos(modelos)
+        except ValueError as e:
+            LOGGER.error(e)
+            return
+
+        if aoi is None:
+            aoi = AOI.from_shapefile(shapefile_path)
+
+    with perfil.etapa('mdt'):
+        # Recortar e alinhar o MDT
+        if mdt_alinhado is not None:
+            mdt_recortado, mdt_meta = mdt_alinhado
+        else:
+            mdt_output_path = os.path.join(output_dir, 'MDT_Sebal_recorte.tif')
+            mdt_recortado, mdt_meta = recortar_e_aliar_mdt(caminho_mdt, shapefile_path, mdt_output_path, raster_referencia_path, aoi,
+                                                           decimacao)
+
+        if mdt_recortado is None:
+            LOGGER.error("Falha ao processar MDT.")
+            return
+
+        LOGGER.info("Processamento do MDT concluído com sucesso.")
+
+    with perfil.etapa('mascara_qa'):
+        # Máscaras adicionais dos pixels válidos: MDT com dados e, com o
+        # QA_PIXEL, sem nuvens, sombras e cirros
+        mascaras = []
+        if mdt_meta.get('nodata') is not None:
+            mascaras.append(mdt_recortado != mdt_meta['nodata'])
+        if mascara_qa:
+            valido_qa = carregar_mascara_qa(caminho_bandas, aoi, dilatacao_qa, decimacao)
+            if valido_qa is not None:
+                mascaras.append(valido_qa)
+
+    with perfil.etapa('ingestao') as etapa:
+        # Processar as imagens de bandas (só os pixels válidos ficam em memória)
+        bandas, store, out_meta = process_images(caminho_bandas, shapefile_path, output_dir, cena, aoi, mascaras, decimacao)
+
+        if not bandas:
+            LOGGER.error("Nenhuma banda processada.")
+            return
+
+        # Acessar bandas específicas
+        nir_band = bandas.get('band5')  # Banda NIR
+        red_band = bandas.get('band4')  # Banda Vermelha
+        green_band = bandas.get('band3') # Banda Verde
+        blue_band = bandas.get('band2')  # Banda Azul
+
+        if nir_band is None or red_band is None or green_band is None or blue_band is None:
+            LOGGER.error("Algumas bandas necessárias estão faltando.")
+            return
+
+        if mdt_recortado.shape != store.shape:
+            LOGGER.error("O MDT alinhado não está na mesma grade das bandas recortadas; verifique o raster de referência.")
+            return
+        if store.n == 0:
+            LOGGER.error("Nenhum pixel válido na AOI (fora da cena, sem dados ou mascarado pelo QA_PIXEL).")
+            return
+        LOGGER.info(f"Pixels válidos: {store.n} de {store.shape[0] * store.shape[1]} ({store.fracao:.1%} da grade recortada).",
+                    extra=evento('pixels_validos', pixels=store.n, fracao=store.fracao))
+        etapa['pixels'] = store.n
+
+    with perfil.etapa('composicao_rgb', pixels=store.n):
+        # Criar composto RGB, gravado por blocos direto dos arrays das bandas
+        try:
+            caminho_rgb = os.path.join(output_dir, 'CC_432.tif')
+            limites_rgb = write_composite(caminho_rgb, (red_band, green_band, blue_band), store, out_meta,
+                                          escala=escala_rgb)
+            LOGGER.info("Composite RGB Landsat 8, be patient... Done!")
+            if overviews:
+                em_segundo_plano(build_overviews, caminho_rgb, *overviews)
+            if limites_exibicao is not None:
+                # A composição estirada já ocupa 1..máximo da escala inteira
+                limites_exibicao[caminho_rgb] = (
+                    [(1, ESCALAS[escala_rgb])] * 3 if limites_rgb is not None
+                    else [_limites_exibicao(banda) for banda in (red_band, green_band, blue_band)])
+        except Exception as e:
+            LOGGER.error(f"Erro ao escrever o arquivo TIFF: {e}")
+
+    with perfil.etapa('indices', pixels=store.n):
+        # Todos os cálculos são feitos sobre os arrays 1-D dos pixels válidos;
+        # a grade só é montada na gravação de cada produto
+        band1, band2, band3, band4, band5, band6, band7 = (bandas[f'band{numero}'] for numero in range(1, 8))
+        band10 = bandas['band10']
+        reflectancias = bandas['reflectancias']
+        mdt = store.compact(mdt_recortado)
+        del bandas, nir_band, red_band, green_band, blue_band
+
+        # Superfície e radiação: calculadas uma única vez e compartilhadas pelos modelos
+        NDVI, SAVI = indices_vegetacao(band5, band4)
+        salvar(os.path.join(output_dir, 'NDVI.tif'), NDVI, store, out_meta)
+        salvar(os.path.join(output_dir, 'SAVI.tif'), SAVI, store, out_meta)
+
+        # Calcular LAI e as emissividades (eNBf, e0f) em uma única passada
+        LAI, eNBf, e0f = lai_emissividades(SAVI, NDVI)
+        salvar(os.path.join(output_dir, 'LAI.tif'), LAI, store, out_meta)
+
+    with perfil.etapa('temperatura', pixels=store.n):
+        # Processar Temperatura de Superfície (Ts)
+        radiance = cena.thermal_radiance(band10)
+
+        temperature_brightness = cena.k2 / np.log((cena.k1 / radiance) + 1)
+
+        # Emissividade de Banda Estreita (eNBf) e de Banda Larga (e0f)
+        salvar(os.path.join(output_dir, 'eNBf.tif'), eNBf, store, out_meta, dtype=eNBf.dtype)
+        salvar(os.path.join(output_dir, 'e0f.tif'), e0f, store, out_meta, dtype=e0f.dtype)
+
+        Ts = temperatura_superficie(temperature_brightness, eNBf)
+        salvar(os.path.join(output_dir, 'Ts.tif'), Ts, store, out_meta)
+
+        # As médias percorrem os arrays inteiros: só são calculadas com INFO ativo
+        if LOGGER.isEnabledFor(logging.INFO):
+            LOGGER.info("Média da Temperatura de Brilho: %s", np.nanmean(temperature_brightness))
+            LOGGER.info("Média da Emissividade (Banda Estreita): %s", np.nanmean(eNBf))
+            LOGGER.info("Média da Emissividade (Banda Larga): %s", np.nanmean(e0f))
+            LOGGER.info("Média da Temperatura de Superfície: %s", np.nanmean(Ts))
+
+    with perfil.etapa('albedo', pixels=store.n):
+        # Cálculo de aTOA e aS
+        aTOA = albedo_toa(reflectancias, cena.esun_weights)
+        salvar(os.path.join(output_dir, 'aTOA.tif'), aTOA, store, out_meta, dtype=aTOA.dtype)
+
+        # Cálculo de Tsw
+        Tsw = transmissividade(mdt)
+        salvar(os.path.join(output_dir, 'Tsw.tif'), Tsw, store, out_meta, dtype=Tsw.dtype)
+
+        # Calculando o albedo da superfície (aS)
+        aS = albedo_superficie(aTOA, Tsw)
+        salvar(os.path.join(output_dir, 'aS.tif'), aS, store, out_meta, dtype=aS.dtype)
+
+    with perfil.etapa('radiacao', pixels=store.n):
+        # Calcular Rsi (terreno plano ou ângulo de incidência sobre o MDT)
+        if correcao_terreno and cena.sun_azimuth is None:
+            LOGGER.warning("SUN_AZIMUTH ausente no MTL; a Rsi será calculada para terreno plano.")
+        if correcao_terreno and cena.sun_azimuth is not None:
+            terreno = terreno_para_mdt(mdt_recortado, mdt_meta)
+            cos_incidencia = terreno.cos_incidencia(cena.sun_azimuth, cena.sun_elevation, store)
+            salvar(os.path.join(output_dir, 'cos_incidencia.tif'), cos_incidencia, store, out_meta)
+            Rsi = radiacao_onda_curta(cos_incidencia, cena.d2, Tsw)
+        else:
+            SUN_ELEVATION_rad = np.deg2rad(90 - cena.sun_elevation)
+            Rsi = radiacao_onda_curta(np.cos(SUN_ELEVATION_rad), cena.d2, Tsw)
+        salvar(os.path.join(output_dir, 'Rsi.tif'), Rsi, store, out_meta)
 
-    Pcold_output_path = os.path.join(output_dir, 'Pcold.tif')
+        # Calcular RLo
+        RLo = radiacao_onda_longa_emitida(e0f, Ts)
+        salvar(os.path.join(output_dir, 'RLo.tif'), RLo, store, out_meta)
 
-    Pcold_meta = out_meta.copy()
-    Pcold_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': Pcold.shape[1],
-        'height': Pcold.shape[0]
-    })
+        # Criação da Máscara do Pixel Frio (Pcold)
+        Ts_median = np.nanmedian(Ts)
+        Pcold = np.where((NDVI > 0.4) & (Ts < Ts_median), Ts, np.nan)
+        salvar(os.path.join(output_dir, 'Pcold.tif'), Pcold, store, out_meta)
 
-    try:
-        with rasterio.open(Pcold_output_path, 'w', **Pcold_meta) as dst:
-            dst.write(Pcold.astype('float32'), 1)
-        print("Pcold salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
+    with perfil.etapa('pixel_frio', pixels=store.n):
+        # Valores dos pixels âncora lidos direto dos arrays em memória
+        amostrador = AnchorSampler(store, out_meta['transform'], out_meta['crs'],
+                                   {'Ts': Ts, 'Tsw': Tsw, 'NDVI': NDVI, 'SAVI': SAVI, 'LAI': LAI, 'aS': aS, 'mdt': mdt})
 
-    # Solicitar as coordenadas de PCold
-    try:
-        ts_file_path = os.path.join(output_dir, 'Ts.tif')
-        tsw_file_path = os.path.join(output_dir, 'Tsw.tif')
-
-        with rasterio.open(ts_file_path) as ts_src, rasterio.open(tsw_file_path) as tsw_src:
-            # Solicitar as coordenadas de PCold
-            pcold_coords_str, ok = QInputDialog.getText(gui_dialog, 'Coordenadas PCold', 'Insira as coordenadas do PCold (easting, northing):')
-            if not ok:
-                QMessageBox.warning(gui_dialog, "Processamento Cancelado", "Processamento cancelado pelo usuário.")
+        # Solicitar as coordenadas de PCold
+        try:
+            crs_pcold = crs_ancoras
+            if pcold_coords is None:
+                pcold_coords = _solicitar_coordenadas(gui_dialog, 'Coordenadas PCold', 'Insira as coordenadas do PCold (easting, northing):')
+                if pcold_coords is None:
+                    return
+            elif pcold_coords == 'auto':
+                posicao = selecionar_pixel_frio(Ts, NDVI)[0]
+                pcold_coords, crs_pcold = _coordenadas_pixel(out_meta['transform'], *store.pixel(posicao)), None
+                LOGGER.info(f"PCold selecionado automaticamente em: {pcold_coords}")
+            pcold, pcold_coords = _localizar_ancora(amostrador, pcold_coords, crs_pcold)
+            if pcold is None:
+                LOGGER.error("O pixel frio está fora da AOI ou em um pixel mascarado (nuvem, sombra ou cirro no QA_PIXEL).")
                 return
-            row_pcold, col_pcold = ts_src.index(*map(float, pcold_coords_str.strip().split(',')))
-            z_TsPcold = ts_src.read(1)[row_pcold, col_pcold]
-            Tsw_value = tsw_src.read(1)[row_pcold, col_pcold]
-
-            print("Cold pixel temperature:", z_TsPcold, "K")
-            print("Tsw value at cold pixel:", Tsw_value)
-
-            RLi = 0.85 * ((-np.log(Tsw_value)) ** 0.09) * 5.67e-8 * z_TsPcold ** 4
-            print("Calculating incoming longwave radiation (RLi) - W/m2... Done!")
+            if ancoras is not None:
+                ancoras['pcold'] = pcold_coords
+            # Valores na precisão dos rasters gravados (Ts em float32)
+            valores_pcold = amostrador.valores([pcold], ('Ts', 'Tsw'))
+            z_TsPcold = np.float32(valores_pcold['Ts'][0])
+            Tsw_value = valores_pcold['Tsw'][0]
 
-            RLi_output_path = os.path.join(output_dir, 'RLi.tif')
+            LOGGER.info(f"Cold pixel temperature: {z_TsPcold} K")
+            LOGGER.info(f"Tsw value at cold pixel: {Tsw_value}")
 
-            RLi_array = np.full(ts_src.shape, RLi, dtype='float32')
+            RLi = radiacao_onda_longa_incidente(Tsw_value, z_TsPcold)
+            LOGGER.info("Calculating incoming longwave radiation (RLi) - W/m2... Done!")
 
-            RLi_meta = ts_src.meta.copy()
-            RLi_meta.update({
-                'dtype': 'float32',
-                'count': 1
-            })
-
-            with rasterio.open(RLi_output_path, 'w', **RLi_meta) as dst:
-                dst.write(RLi_array, 1)
-            print("RLi salvo com sucesso.")
+            salvar(os.path.join(output_dir, 'RLi.tif'), np.full(store.n, RLi, dtype='float32'), store, out_meta)
 
-    except Exception as e:
-        print(f"Erro ao processar PCold: {e}")
-        return
-
-    # Calcular Rn
-    rsi_file_path = os.path.join(output_dir, 'Rsi.tif')
-    as_file_path = os.path.join(output_dir, 'aS.tif')
-
-    try:
-        with rasterio.open(rsi_file_path) as src_rsi:
-            Rsi = src_rsi.read(1)
-        with rasterio.open(as_file_path) as src_as:
-            aS = src_as.read(1)
-
-        Rn = (1 - aS) * Rsi + RLi - RLo - (1 - e0f) * RLi
-
-        Rn_output_path = os.path.join(output_dir, 'Rn.tif')
-
-        Rn_meta = src_rsi.meta.copy()
-        Rn_meta.update({
-            'driver': 'GTiff',
-            'count': 1,
-            'dtype': 'float32',
-            'width': Rn.shape[1],
-            'height': Rn.shape[0]
-        })
-
-        with rasterio.open(Rn_output_path, 'w', **Rn_meta) as dst:
-            dst.write(Rn.astype('float32'), 1)
-        print("Rn salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao processar ou salvar os rasters: {e}")
-
-    # Calcular G
-    G_Rn = np.where(NDVI < 0, 0.5, ((Ts - 273.15) / aS) * (0.0038 * aS + 0.0074 * aS ** 2) * (1 - 0.98 * NDVI ** 4))
-    G = G_Rn * Rn
-
-    G_output_path = os.path.join(output_dir, 'G.tif')
-
-    G_meta = out_meta.copy()
-    G_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': G.shape[1],
-        'height': G.shape[0]
-    })
+        except Exception as e:
+            LOGGER.error(f"Erro ao processar PCold: {e}")
+            return
 
-    try:
-        with rasterio.open(G_output_path, 'w', **G_meta) as dst:
-            dst.write(G.astype('float32'), 1)
-        print("G salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
+    with perfil.etapa('saldo_radiacao', pixels=store.n):
+        # Calcular Rn (Rsi na precisão do raster gravado)
+        Rn = saldo_radiacao(aS, Rsi.astype('float32'), RLi, RLo, e0f)
+        salvar(os.path.join(output_dir, 'Rn.tif'), Rn, store, out_meta)
 
-    print("Calculating soil heat flux (G) - W/m2... Done!")
+        # Calcular G
+        G = fluxo_calor_solo(Ts, aS, NDVI, Rn)
+        salvar(os.path.join(output_dir, 'G.tif'), G, store, out_meta)
 
-    # Criação da Máscara do Pixel Quente (Phot)
-    Phot = np.where((SAVI > 0.18) & (SAVI < 0.3), Ts, np.nan)
+        LOGGER.info("Calculating soil heat flux (G) - W/m2... Done!")
+        amostrador.camadas.update(Rn=Rn, G=G)
 
-    Phot_output_path = os.path.join(output_dir, 'Phot.tif')
+        # Criação da Máscara do Pixel Quente (Phot)
+        Phot = np.where((SAVI > 0.18) & (SAVI < 0.3), Ts, np.nan)
+        salvar(os.path.join(output_dir, 'Phot.tif'), Phot, store, out_meta)
 
-    Phot_meta = out_meta.copy()
-    Phot_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': Phot.shape[1],
-        'height': Phot.shape[0]
-    })
-
-    try:
-        with rasterio.open(Phot_output_path, 'w', **Phot_meta) as dst:
-            dst.write(Phot.astype('float32'), 1)
-        print("Phot salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Solicitar as coordenadas de PHot
-    try:
-        ts_file_path = os.path.join(output_dir, 'Ts.tif')
-
-        with rasterio.open(ts_file_path) as ts_src:
-            # Solicitar as coordenadas de PHot
-            phot_coords_str, ok = QInputDialog.getText(gui_dialog, 'Coordenadas PHot', 'Insira as coordenadas do PHot (easting, northing):')
-            if not ok:
-                QMessageBox.warning(gui_dialog, "Processamento Cancelado", "Processamento cancelado pelo usuário.")
+    with perfil.etapa('pixel_quente', pixels=store.n):
+        # Solicitar as coordenadas de PHot
+        try:
+            crs_phot = crs_ancoras
+            if phot_coords is None:
+                phot_coords = _solicitar_coordenadas(gui_dialog, 'Coordenadas PHot', 'Insira as coordenadas do PHot (easting, northing):')
+                if phot_coords is None:
+                    return
+            elif phot_coords == 'auto':
+                posicao = selecionar_pixel_quente(Ts, SAVI)[0]
+                phot_coords, crs_phot = _coordenadas_pixel(out_meta['transform'], *store.pixel(posicao)), None
+                LOGGER.info(f"PHot selecionado automaticamente em: {phot_coords}")
+            phot, phot_coords = _localizar_ancora(amostrador, phot_coords, crs_phot)
+            if phot is None:
+                LOGGER.error("O pixel quente está fora da AOI ou em um pixel mascarado (nuvem, sombra ou cirro no QA_PIXEL).")
                 return
-            row_phot, col_phot = ts_src.index(*map(float, phot_coords_str.strip().split(',')))
-            z_TsPhot = ts_src.read(1)[row_phot, col_phot]
-            print(f"Hot pixel temperature: {z_TsPhot} K")
+            if ancoras is not None:
+                ancoras['phot'] = phot_coords
+            LOGGER.info(f"Hot pixel temperature: {np.float32(amostrador.valores([phot], ('Ts',))['Ts'][0])} K")
 
             h = 0.15  # Altura do dossel
             Zom = 0.123 * h
-            u_ast = 0.41 * u_2m / (math.log(2 / Zom))
-            u_200m = u_ast * (math.log(200 / Zom)) / 0.41
-            print("Calculating friction velocity (u*) for weather station - m/s... Done!")
-
-    except Exception as e:
-        print(f"Erro ao processar PHot: {e}")
-        return
-
-    # Cálculo de Z0map
-    savi_file_path = os.path.join(output_dir, 'SAVI.tif')
-
-    try:
-        with rasterio.open(savi_file_path) as src_savi:
-            SAVI = src_savi.read(1)
-
-        Z0map = np.exp(-5.809 + 5.62 * SAVI)
-
-        Z0map_output_path = os.path.join(output_dir, 'Z0map.tif')
-
-        Z0map_meta = src_savi.meta.copy()
-        Z0map_meta.update({
-            'driver': 'GTiff',
-            'count': 1,
-            'dtype': 'float32',
-            'width': Z0map.shape[1],
-            'height': Z0map.shape[0]
-        })
-
-        with rasterio.open(Z0map_output_path, 'w', **Z0map_meta) as dst:
-            dst.write(Z0map.astype('float32'), 1)
-        print("Z0map salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao processar ou salvar os rasters: {e}")
-
-    # Cálculo de u_astmap
-    u_astmap = 0.41 * u_200m / np.log(200 / Z0map)
-
-    u_astmap_output_path = os.path.join(output_dir, 'u_astmap.tif')
-
-    u_astmap_meta = out_meta.copy()
-    u_astmap_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': u_astmap.shape[1],
-        'height': u_astmap.shape[0]
-    })
-
-    try:
-        with rasterio.open(u_astmap_output_path, 'w', **u_astmap_meta) as dst:
-            dst.write(u_astmap.astype('float32'), 1)
-        print("u_astmap salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating the friction velocity map (u*map) - m/s... Done!")
-
-    # Cálculo de rah
-    rah = np.log(2 / 0.1) / (u_astmap * 0.41)
-    print("Calculating aerodynamic resistance to heat transport map in terms of neutral stability (rah) - s/m... Done!")
-
-    rah_output_path = os.path.join(output_dir, 'rah.tif')
-
-    rah_meta = out_meta.copy()
-    rah_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': rah.shape[1],
-        'height': rah.shape[0]
-    })
-
-    try:
-        with rasterio.open(rah_output_path, 'w', **rah_meta) as dst:
-            dst.write(rah.astype('float32'), 1)
-        print("rah salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Cálculo de dT
-    # Estimativa inicial de dT usando uma relação linear entre Ts e dT
-    # Inicialização dos valores
-    z_rahPhot = rah[row_phot, col_phot]
-    z_GPhot = G[row_phot, col_phot]
-    z_RnPhot = Rn[row_phot, col_phot]
-
-    z_rahPhot_i = 0
-    i = 0
-    while abs(z_rahPhot_i - z_rahPhot) > 0.00001 and i < 10:
-        print("Iteration number:", i)
-        i += 1
-        z_rahPhot_i = z_rahPhot
-        a = ((z_RnPhot - z_GPhot) * z_rahPhot_i) / ((z_TsPhot - z_TsPcold) * 1.25 * 1004)
-        b = -a * z_TsPcold
-        dT = a * Ts + b
-
-        H = (1.25 * 1004 * dT) / rah
-
-        # Recalcular z_rahPhot com os novos valores
-        z_rahPhot = rah[row_phot, col_phot]
-        print('a:', a, 'b:', b)
-
-    dT_output_path = os.path.join(output_dir, 'dT.tif')
-
-    dT_meta = out_meta.copy()
-    dT_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': dT.shape[1],
-        'height': dT.shape[0]
-    })
-
-    try:
-        with rasterio.open(dT_output_path, 'w', **dT_meta) as dst:
-            dst.write(dT.astype('float32'), 1)
-        print("dT salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Cálculo de H
-    H = (1.25 * 1004 * dT) / rah
-
-    H_output_path = os.path.join(output_dir, 'H.tif')
-
-    H_meta = out_meta.copy()
-    H_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': H.shape[1],
-        'height': H.shape[0]
-    })
-
-    try:
-        with rasterio.open(H_output_path, 'w', **H_meta) as dst:
-            dst.write(H.astype('float32'), 1)
-        print("H salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating sensible heat flux (H) - W/m2... Done!")
-
-    # Cálculo do Comprimento de Monin-Obukhov (L)
-    g = 9.81  # Aceleração devido à gravidade
-    L = -(1.25 * 1004 * Ts * u_astmap ** 3) / (0.41 * g * H)
+            if is_grid_input(u_2m):
+                # Grade de vento: u200m = u2m * ln(200/Zom) / ln(2/Zom), lida bloco a bloco
+                vento_200m = open_input(u_2m, out_meta, escala=math.log(200 / Zom) / math.log(2 / Zom))
+            else:
+                u_ast = 0.41 * u_2m / (math.log(2 / Zom))
+                u_200m = u_ast * (math.log(200 / Zom)) / 0.41
+                vento_200m = ConstantGrid(u_200m)
+            LOGGER.info("Calculating friction velocity (u*) for weather station - m/s... Done!")
 
-    # Definir o caminho de saída para L
-    L_output_path = os.path.join(output_dir, 'L.tif')
-
-    # Preparar os metadados para salvar L
-    L_meta = out_meta.copy()
-    L_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': L.shape[1],
-        'height': L.shape[0]
-    })
-
-    # Salvar L usando rasterio
-    try:
-        with rasterio.open(L_output_path, 'w', **L_meta) as dst:
-            dst.write(L.astype('float32'), 1)
-        print("L salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating the Monin-Obukhov length map (L) - m... Done!")
-
-    # Cálculo das correções de estabilidade atmosférica (L200m, L2m, L01m)
-    L200m = np.where(L < 0, 2 * np.log((1 + np.sqrt(1 - 16 * (200 / L))) / 2),
-                     np.where(L > 0, -5 * (200 / L), 0))
-    L2m = np.where(L < 0, 2 * np.log((1 + np.sqrt(1 - 16 * (2 / L))) / 2),
-                   np.where(L > 0, -5 * (2 / L), 0))
-    L01m = np.where(L < 0, 2 * np.log((1 + np.sqrt(1 - 16 * (0.1 / L))) / 2),
-                    np.where(L > 0, -5 * (0.1 / L), 0))
-
-    # Salvar L200m
-    L200m_output_path = os.path.join(output_dir, 'L200m.tif')
-    L200m_meta = out_meta.copy()
-    L200m_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': L200m.shape[1],
-        'height': L200m.shape[0]
-    })
-
-    try:
-        with rasterio.open(L200m_output_path, 'w', **L200m_meta) as dst:
-            dst.write(L200m.astype('float32'), 1)
-        print("L200m salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Salvar L2m
-    L2m_output_path = os.path.join(output_dir, 'L2m.tif')
-    L2m_meta = out_meta.copy()
-    L2m_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': L2m.shape[1],
-        'height': L2m.shape[0]
-    })
-
-    try:
-        with rasterio.open(L2m_output_path, 'w', **L2m_meta) as dst:
-            dst.write(L2m.astype('float32'), 1)
-        print("L2m salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    # Salvar L01m
-    L01m_output_path = os.path.join(output_dir, 'L01m.tif')
-    L01m_meta = out_meta.copy()
-    L01m_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': L01m.shape[1],
-        'height': L01m.shape[0]
-    })
-
-    try:
-        with rasterio.open(L01m_output_path, 'w', **L01m_meta) as dst:
-            dst.write(L01m.astype('float32'), 1)
-        print("L01m salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating atmospheric stability correction (L200m, L2m, L01m)... Done!")
-
-    # Cálculo de LET
-    LET = Rn - G - H
-
-    LET_output_path = os.path.join(output_dir, 'LET.tif')
-
-    LET_meta = out_meta.copy()
-    LET_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': LET.shape[1],
-        'height': LET.shape[0]
-    })
-
-    try:
-        with rasterio.open(LET_output_path, 'w', **LET_meta) as dst:
-            dst.write(LET.astype('float32'), 1)
-        print("LET salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating latent heat flux (LET) - W/m2... Done!")
-
-    # Cálculo de ETi
-    ETi = np.where(3600 * (LET / (2.45 * 1e6)) < 0, 0, 3600 * (LET / (2.45 * 1e6)))
-
-    ETi_output_path = os.path.join(output_dir, 'ETi.tif')
-
-    ETi_meta = out_meta.copy()
-    ETi_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': ETi.shape[1],
-        'height': ETi.shape[0]
-    })
-
-    try:
-        with rasterio.open(ETi_output_path, 'w', **ETi_meta) as dst:
-            dst.write(ETi.astype('float32'), 1)
-        print("ETi salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating instantaneous evapotranspiration (ETi) - mm/h... Done!")
-
-    # Cálculo de ETof
-    ETof = ETi / EToi
-
-    ETof_output_path = os.path.join(output_dir, 'ETof.tif')
-
-    ETof_meta = out_meta.copy()
-    ETof_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': ETof.shape[1],
-        'height': ETof.shape[0]
-    })
-
-    try:
-        with rasterio.open(ETof_output_path, 'w', **ETof_meta) as dst:
-            dst.write(ETof.astype('float32'), 1)
-        print("ETof salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating reference evapotranspiration fraction (ETof)... Done!")
-
-    # Cálculo de ETday
-    ETday = ETof * ETo
-
-    ETday_output_path = os.path.join(output_dir, 'ETday.tif')
-
-    ETday_meta = out_meta.copy()
-    ETday_meta.update({
-        'driver': 'GTiff',
-        'count': 1,
-        'dtype': 'float32',
-        'width': ETday.shape[1],
-        'height': ETday.shape[0]
-    })
-
-    try:
-        with rasterio.open(ETday_output_path, 'w', **ETday_meta) as dst:
-            dst.write(ETday.astype('float32'), 1)
-        print("ETday salvo com sucesso.")
-    except Exception as e:
-        print(f"Erro ao escrever o arquivo TIFF: {e}")
-
-    print("Calculating daily evapotranspiration (ETday) - mm/day... Done!")
+        except Exception as e:
+            LOGGER.error(f"Erro ao processar PHot: {e}")
+            return
+
+    with perfil.etapa('aerodinamica', pixels=store.n):
+        # Cálculo de Z0map (SAVI na precisão do raster gravado)
+        SAVI = SAVI.astype('float32')
+        Z0map = rugosidade(SAVI)
+        salvar(os.path.join(output_dir, 'Z0map.tif'), Z0map, store, out_meta)
+
+        # Cálculo de u_astmap
+        with vento_200m:
+            u_astmap = apply_by_blocks(vento_200m, velocidade_friccao, Z0map, store=store)
+        salvar(os.path.join(output_dir, 'u_astmap.tif'), u_astmap, store, out_meta)
+
+        LOGGER.info("Calculating the friction velocity map (u*map) - m/s... Done!")
+
+        # Cálculo de rah
+        rah = resistencia_aerodinamica(u_astmap)
+        LOGGER.info("Calculating aerodynamic resistance to heat transport map in terms of neutral stability (rah) - s/m... Done!")
+        salvar(os.path.join(output_dir, 'rah.tif'), rah, store, out_meta)
+
+        # Todas as camadas da calibração nos dois pixels âncora, em uma única amostragem
+        amostrador.camadas.update(SAVI=SAVI, Z0map=Z0map, u_ast=u_astmap, rah=rah)
+        calibracao = {nome: tuple(float(valor) for valor in valores) for nome, valores in
+                      amostrador.valores([pcold, phot], CAMADAS_CALIBRACAO).items()}
+        LOGGER.debug("Valores dos pixels âncora (frio, quente) para a calibração.",
+                     extra=evento('ancoras', pcold=pcold_coords, phot=phot_coords, **calibracao))
+        if ancoras is not None:
+            ancoras['valores'] = calibracao
+
+    superficie = {'NDVI': NDVI, 'SAVI': SAVI, 'LAI': LAI, 'Ts': Ts, 'aS': aS, 'Rn': Rn, 'G': G,
+                  'Z0map': Z0map, 'u_ast': u_astmap, 'rah': rah, 'mdt': mdt}
+
+    # Modelos de balanço de energia sobre a mesma superfície; com mais de um
+    # modelo, os produtos de cada um vão para uma subpasta com o seu nome
+    for modelo in modelos:
+        with perfil.etapa(f'modelo_{modelo.nome}', pixels=store.n):
+            saida_modelo = output_dir if len(modelos) == 1 else os.path.join(output_dir, modelo.nome)
+            os.makedirs(saida_modelo, exist_ok=True)
+            LOGGER.info(f"Executando o modelo {modelo.nome}...", extra=evento('modelo', modelo=modelo.nome))
+            try:
+                produtos = modelo.calcular(superficie, pcold, phot, EToi)
+            except Exception as e:
+                LOGGER.error(f"Erro ao executar o modelo {modelo.nome}: {e}")
+                return
+            for nome, valores in produtos.items():
+                salvar(os.path.join(saida_modelo, f'{nome}.tif'), valores, store, out_meta)
+
+            with perfil.etapa('etday', pixels=store.n):
+                # Cálculo de ETday (ETo escalar ou grade reamostrada, lida bloco a bloco)
+                with open_input(ETo, out_meta) as grade_eto:
+                    ETday = apply_by_blocks(grade_eto, lambda eto, etof: etof * eto, produtos['ETof'], store=store)
+                salvar(os.path.join(saida_modelo, 'ETday.tif'), ETday, store, out_meta)
+
+                LOGGER.info("Calculating daily evapotranspiration (ETday) - mm/day... Done!")
+
+            # Estatísticas zonais sobre os arrays ainda em memória
+            if estatisticas_zonais:
+                with perfil.etapa('estatisticas_zonais', pixels=store.n):
+                    disponiveis = dict(superficie, ETday=ETday, **produtos)
+                    try:
+                        if zonal is None:
+                            zonal = ZonalStats.from_shapefile(shapefile_path)
+                        nomes = PRODUTOS_PADRAO if estatisticas_zonais is True else estatisticas_zonais
+                        produtos_zonais = {nome: disponiveis[nome] for nome in nomes if nome in disponiveis}
+                        caminho_zonal = write_zonal_stats(zonal, produtos_zonais, out_meta, saida_modelo, store=store)
+                        LOGGER.info(f"Estatísticas zonais salvas em {caminho_zonal}.")
+                    except Exception as e:
+                        LOGGER.error(f"Erro ao calcular as estatísticas zonais: {e}")
+
+    if overviews:
+        with perfil.etapa('overviews'):
+            for erro in aguardar_segundo_plano():
+                LOGGER.error(f"Erro ao gerar as overviews: {erro}")
+
+    if gravar_perfil:
+        perfil.write_json(os.path.join(output_dir, 'perfil.json'))
+        perfil.write_trace(os.path.join(output_dir, 'perfil_trace.json'))
+        LOGGER.info(perfil.resumo())
+
+    LOGGER.info("Processamento concluído com sucesso. Todos os produtos foram gerados.")
+    return True
 
-    print("Processamento concluído com sucesso. Todos os produtos foram gerados.")
\ No newline at end of file
@@ -0,0 +1,167 @@
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LOGGER = logging.getLogger('evapogis.perfil')
+
+
+def _pico_rss():
+    """
+    Pico de memória residente do processo em bytes (None se indisponível).
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é dado em KiB no Linux e em bytes no macOS
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+def _bytes_io():
+    """
+    Bytes lidos e gravados pelo processo até agora, de /proc/self/io (Linux).
+
+    Usa rchar/wchar, que contam também o que foi servido pelo cache de
+    páginas, já que é esse o volume que o GDAL efetivamente movimenta.
+    """
+    try:
+        with open('/proc/self/io') as arquivo:
+            campos = dict(linha.split(':') for linha in arquivo if ':' in linha)
+        return int(campos['rchar']), int(campos['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _diferenca(fim, inicio):
+    return None if fim is None or inicio is None else fim - inicio
+
+
+class Profiler:
+    """
+    Medição das etapas do processamento: tempo de relógio e de CPU, aumento
+    do pico de memória residente, bytes lidos/gravados e pixels processados.
+
+    As etapas podem ser aninhadas; o relatório JSON lista cada uma com a
+    sua profundidade e o trace segue o formato de eventos do Chrome
+    (chrome://tracing, Perfetto, speedscope), que pode ser visto como
+    flamegraph. Cada etapa concluída gera um evento DEBUG no logger
+    evapogis.perfil. Com `ativo=False`, as etapas não medem nada além do
+    tempo de relógio desse evento, e só quando o DEBUG está habilitado.
+    """
+
+    def __init__(self, ativo=True):
+        self.ativo = ativo
+        self.etapas = []
+        self._pilha = []
+        self._origem = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome, pixels=None):
+        """
+        Mede o bloco como uma etapa; o registro retornado aceita `pixels` e
+        outros campos preenchidos dentro do bloco.
+        """
+        registro = {'etapa': nome, 'pixels': pixels}
+        if not self.ativo:
+            # Sem medição: só o evento da etapa, com o tempo de relógio, em DEBUG
+            if not LOGGER.isEnabledFor(logging.DEBUG):
+                yield registro
+                return
+            inicio = time.perf_counter()
+            try:
+                yield registro
+            finally:
+                registro['tempo_s'] = time.perf_counter() - inicio
+                self._registrar(registro)
+            return
+        registro['profundidade'] = len(self._pilha)
+        self._pilha.append(nome)
+        lidos, gravados = _bytes_io()
+        pico = _pico_rss()
+        inicio_cpu = time.process_time()
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            fim = time.perf_counter()
+            lidos_fim, gravados_fim = _bytes_io()
+            registro.update({
+                'inicio_s': inicio - self._origem,
+                'tempo_s': fim - inicio,
+                'cpu_s': time.process_time() - inicio_cpu,
+                'pico_rss_delta_bytes': _diferenca(_pico_rss(), pico),
+                'bytes_lidos': _diferenca(lidos_fim, lidos),
+                'bytes_gravados': _diferenca(gravados_fim, gravados),
+            })
+            self._pilha.pop()
+            self.etapas.append(registro)
+            self._registrar(registro)
+
+    def _registrar(self, registro):
+        LOGGER.debug(f"Etapa {registro['etapa']}: {registro['tempo_s']:.3f} s",
+                     extra={'evento': 'etapa', 'campos': registro})
+
+    def medir(self, nome=None):
+        """
+        Decorador que mede cada chamada da função como uma etapa.
+        """
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def medida(*args, **kwargs):
+                with self.etapa(nome or funcao.__name__):
+                    return funcao(*args, **kwargs)
+            return medida
+        return decorador
+
+    def relatorio(self):
+        """
+        Relatório da execução, com as etapas em ordem de início.
+        """
+        etapas = sorted(self.etapas, key=lambda registro: registro['inicio_s'])
+        return {
+            'tempo_total_s': time.perf_counter() - self._origem,
+            'pico_rss_bytes': _pico_rss(),
+            'etapas': etapas,
+        }
+
+    def write_json(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.relatorio(), arquivo, indent=2, ensure_ascii=False)
+        return caminho
+
+    def write_trace(self, caminho):
+        """
+        Grava as etapas como eventos completos ("ph": "X") do formato de trace do Chrome.
+        """
+        eventos = [{
+            'name': registro['etapa'],
+            'ph': 'X',
+            'ts': registro['inicio_s'] * 1e6,
+            'dur': registro['tempo_s'] * 1e6,
+            'pid': os.getpid(),
+            'tid': 0,
+            'args': {campo: valor for campo, valor in registro.items()
+                     if campo not in ('etapa', 'inicio_s', 'tempo_s') and valor is not None},
+        } for registro in self.etapas]
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, arquivo)
+        return caminho
+
+    def resumo(self):
+        """
+        Tabela de texto das etapas de primeiro nível, para o console.
+        """
+        linhas = [f"{'etapa':<24}{'tempo (s)':>10}{'cpu (s)':>10}{'pixels':>12}"]
+        for registro in self.relatorio()['etapas']:
+            if registro['profundidade'] == 0:
+                pixels = '' if registro['pixels'] is None else registro['pixels']
+                linhas.append(f"{registro['etapa']:<24}{registro['tempo_s']:>10.3f}{registro['cpu_s']:>10.3f}{pixels:>12}")
+        return '\n'.join(linhas)
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Bits da banda QA_PIXEL da Coleção 2 (Landsat 8/9)
+BITS_QA = {
+    'preenchimento': 0,
+    'nuvem_dilatada': 1,
+    'cirro': 2,
+    'nuvem': 3,
+    'sombra': 4,
+    'neve': 5,
+    'limpo': 6,
+    'agua': 7,
+}
+
+# Classes descartadas antes do balanço de energia
+CLASSES_MASCARADAS = ('preenchimento', 'nuvem_dilatada', 'cirro', 'nuvem', 'sombra')
+
+
+def bits_qa(classes):
+    """
+    Combina as classes do QA_PIXEL em uma única máscara de bits.
+    """
+    bits = 0
+    for classe in classes:
+        if classe not in BITS_QA:
+            raise ValueError(f"Classe QA_PIXEL desconhecida: {classe}")
+        bits |= 1 << BITS_QA[classe]
+    return bits
+
+
+def _dilatar(mascara, raio):
+    """
+    Dilatação binária por uma janela quadrada (2 * raio + 1), separável em linhas e colunas.
+    """
+    for eixo in (0, 1):
+        base = mascara
+        mascara = base.copy()
+        tamanho = base.shape[eixo]
+        for deslocamento in range(1, min(raio, tamanho - 1) + 1):
+            frente = [slice(None), slice(None)]
+            tras = [slice(None), slice(None)]
+            frente[eixo] = slice(deslocamento, None)
+            tras[eixo] = slice(None, -deslocamento)
+            mascara[tuple(frente)] |= base[tuple(tras)]
+            mascara[tuple(tras)] |= base[tuple(frente)]
+    return mascara
+
+
+def qa_invalid_mask(qa, classes=CLASSES_MASCARADAS, dilatacao=0):
+    """
+    Máscara booleana dos pixels a descartar segundo o QA_PIXEL.
+
+    A decodificação é um único AND bit a bit sobre a banda inteira;
+    `dilatacao` (em pixels) expande a máscara para cobrir bordas de nuvens e
+    sombras não sinalizadas.
+    """
+    invalido = (np.asarray(qa).astype(np.uint16, copy=False) & bits_qa(classes)) != 0
+    if dilatacao > 0:
+        invalido = _dilatar(invalido, int(dilatacao))
+    return invalido
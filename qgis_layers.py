@@ -0,0 +1,112 @@
+import os
+
+from qgis.core import (QgsColorRampShader, QgsContrastEnhancement, QgsMultiBandColorRenderer, QgsProject,
+                       QgsRasterLayer, QgsRasterShader, QgsSingleBandPseudoColorRenderer, QgsStyle)
+
+from .layer_styles import RAMPA_PADRAO, estilo_produto
+
+# Produtos abertos no mapa ao fim do processamento
+PRODUTOS_CAMADAS = ('ETday', 'ETof', 'Ts', 'Rn', 'G', 'H', 'NDVI', 'aS', 'CC_432')
+
+# Classes da rampa contínua
+CLASSES_RAMPA = 5
+
+
+def renderizador_pseudocor(provedor, minimo, maximo, rampa=RAMPA_PADRAO[0], invertida=False):
+    """
+    Renderizador de banda única com a rampa contínua entre `minimo` e `maximo`, sem estatísticas do raster.
+    """
+    cores = QgsStyle.defaultStyle().colorRamp(rampa)
+    if invertida:
+        cores.invert()
+    funcao = QgsColorRampShader(minimo, maximo, cores)
+    funcao.setColorRampType(QgsColorRampShader.Interpolated)
+    funcao.classifyColorRamp(CLASSES_RAMPA)
+    shader = QgsRasterShader(minimo, maximo)
+    shader.setRasterShaderFunction(funcao)
+    renderizador = QgsSingleBandPseudoColorRenderer(provedor, 1, shader)
+    renderizador.setClassificationMin(minimo)
+    renderizador.setClassificationMax(maximo)
+    return renderizador
+
+
+def renderizador_rgb(provedor, limites):
+    """
+    Renderizador RGB das bandas 1, 2 e 3 com o realce entre os limites (mínimo, máximo) de cada banda.
+    """
+    renderizador = QgsMultiBandColorRenderer(provedor, 1, 2, 3)
+    definir = (renderizador.setRedContrastEnhancement, renderizador.setGreenContrastEnhancement,
+               renderizador.setBlueContrastEnhancement)
+    for banda, (minimo, maximo), definir_realce in zip((1, 2, 3), limites, definir):
+        realce = QgsContrastEnhancement(provedor.dataType(banda))
+        realce.setContrastEnhancementAlgorithm(QgsContrastEnhancement.StretchToMinimumMaximum)
+        realce.setMinimumValue(minimo)
+        realce.setMaximumValue(maximo)
+        definir_realce(realce)
+    return renderizador
+
+
+def camada_produto(caminho, limites, nome=None):
+    """
+    QgsRasterLayer do produto gravado em `caminho`, com o estilo montado a partir dos `limites`
+    calculados no processamento (ver run_processing, limites_exibicao).
+
+    O estilo vem de layer_styles.estilo_produto, que sempre define os
+    limites: a camada nunca fica com o renderizador padrão do QGIS, que
+    calcularia as estatísticas lendo o raster.
+    """
+    produto = os.path.splitext(os.path.basename(caminho))[0]
+    camada = QgsRasterLayer(caminho, nome or produto, 'gdal')
+    if not camada.isValid():
+        return None
+    tipo, parametros = estilo_produto(produto, limites, camada.bandCount())
+    if tipo == 'rgb':
+        camada.setRenderer(renderizador_rgb(camada.dataProvider(), parametros))
+    else:
+        camada.setRenderer(renderizador_pseudocor(camada.dataProvider(), *parametros))
+    return camada
+
+
+def remover_grupo(grupo, projeto=None):
+    """
+    Remove do projeto o grupo `grupo` da árvore de camadas e as camadas dele, liberando os arquivos.
+    """
+    projeto = projeto or QgsProject.instance()
+    raiz = projeto.layerTreeRoot()
+    anterior = raiz.findGroup(grupo)
+    if anterior is not None:
+        projeto.removeMapLayers(anterior.findLayerIds())
+        raiz.removeChildNode(anterior)
+
+
+def carregar_produtos(limites_exibicao, grupo, produtos=PRODUTOS_CAMADAS, sufixo='', projeto=None):
+    """
+    Adiciona ao projeto, no grupo `grupo` da árvore de camadas, os `produtos` de um processamento.
+
+    `limites_exibicao` é o dicionário preenchido pelo run_processing
+    ({caminho: limites}). Os produtos de cada modelo (subpastas) ficam em
+    um subgrupo com o nome do modelo. Um grupo de mesmo nome já existente é
+    substituído. Retorna as camadas adicionadas.
+    """
+    projeto = projeto or QgsProject.instance()
+    remover_grupo(grupo, projeto)
+    no_grupo = projeto.layerTreeRoot().insertGroup(0, grupo)
+
+    pastas = {os.path.dirname(caminho) for caminho in limites_exibicao}
+    comum = os.path.commonpath(pastas) if pastas else ''
+    camadas = []
+    for produto in produtos:
+        for caminho, limites in sorted(limites_exibicao.items()):
+            if os.path.splitext(os.path.basename(caminho))[0] != produto:
+                continue
+            camada = camada_produto(caminho, limites, produto + sufixo)
+            if camada is None:
+                continue
+            subpasta = os.path.relpath(os.path.dirname(caminho), comum)
+            destino = no_grupo
+            if subpasta != os.curdir:
+                destino = no_grupo.findGroup(subpasta) or no_grupo.addGroup(subpasta)
+            projeto.addMapLayer(camada, False)
+            destino.addLayer(camada)
+            camadas.append(camada)
+    return camadas
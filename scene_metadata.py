@@ -0,0 +1,144 @@
+import logging
+import math
+
+import numpy as np
+
+# Bandas refletivas usadas no albedo e banda termal usada na temperatura
+BANDAS_REFLETIVAS = (1, 2, 3, 4, 5, 6, 7)
+BANDA_TERMAL = 10
+
+LOGGER = logging.getLogger('evapogis.metadados')
+
+
+class SceneMetadata:
+    """
+    Descritor tipado da cena, construído uma única vez a partir do MTL.
+
+    Todas as constantes derivadas (ganho/offset TOA já divididos por
+    sin(elevação solar), pesos ESUN, d², K1/K2) são pré-calculadas, de modo
+    que a conversão de cada banda se reduz a uma multiplicação e uma soma.
+    Valores que tornariam essas constantes indefinidas (sol no horizonte,
+    reflectância máxima nula, nenhuma banda com ESUN) levantam ValueError.
+    """
+
+    __slots__ = (
+        'sun_elevation',
+        'sun_azimuth',
+        'earth_sun_distance',
+        'd2',
+        'inv_sin_sun',
+        'reflectance_gain',
+        'reflectance_offset',
+        'radiance_mult_termal',
+        'radiance_add_termal',
+        'k1',
+        'k2',
+        'esun',
+        'esun_weights',
+        'date_acquired',
+        'scene_center_time',
+    )
+
+    def __init__(self, sun_elevation, earth_sun_distance, reflectance_mult,
+                 reflectance_add, radiance_mult_termal, radiance_add_termal,
+                 k1, k2, radiance_maximum, reflectance_maximum,
+                 sun_azimuth=None, date_acquired=None, scene_center_time=None):
+        self.sun_elevation = float(sun_elevation)
+        self.sun_azimuth = None if sun_azimuth is None else float(sun_azimuth)
+        self.earth_sun_distance = float(earth_sun_distance)
+        self.d2 = self.earth_sun_distance * self.earth_sun_distance
+        if not 0 < self.sun_elevation <= 90:
+            raise ValueError(f"Elevação solar inválida: {self.sun_elevation} graus.")
+        self.inv_sin_sun = 1.0 / math.sin(math.radians(self.sun_elevation))
+
+        # Ganho e offset TOA por banda, já corrigidos pelo ângulo solar
+        self.reflectance_gain = {
+            banda: float(mult) * self.inv_sin_sun
+            for banda, mult in reflectance_mult.items()
+            if banda in reflectance_add
+        }
+        self.reflectance_offset = {
+            banda: float(reflectance_add[banda]) * self.inv_sin_sun
+            for banda in self.reflectance_gain
+        }
+
+        self.radiance_mult_termal = float(radiance_mult_termal)
+        self.radiance_add_termal = float(radiance_add_termal)
+        self.k1 = float(k1)
+        self.k2 = float(k2)
+
+        # ESUN por banda refletiva e pesos normalizados para o albedo TOA
+        esun = []
+        for banda in BANDAS_REFLETIVAS:
+            if banda in radiance_maximum and banda in reflectance_maximum:
+                if float(reflectance_maximum[banda]) == 0:
+                    raise ValueError(f"Reflectância máxima nula para a banda {banda}.")
+                esun.append(math.pi * self.d2 * (float(radiance_maximum[banda]) / float(reflectance_maximum[banda])))
+            else:
+                LOGGER.warning(f"Chaves de radiância ou reflectância máxima faltando para a banda {banda}.")
+                esun.append(0.0)
+        self.esun = tuple(esun)
+        total = sum(self.esun)
+        if total <= 0:
+            raise ValueError("Soma dos ESUN das bandas refletivas nula: faltam as radiâncias e reflectâncias máximas no MTL.")
+        self.esun_weights = tuple(valor / total for valor in self.esun)
+
+        self.date_acquired = date_acquired
+        self.scene_center_time = scene_center_time
+
+    @classmethod
+    def from_mtl(cls, mtl_data):
+        """
+        Constrói o descritor a partir do dicionário retornado por read_mtl.
+
+        Levanta KeyError se faltar alguma chave obrigatória e ValueError se
+        os valores do MTL não definirem os coeficientes.
+        """
+        def por_banda(prefixo):
+            valores = {}
+            for key, value in mtl_data.items():
+                if key.startswith(prefixo):
+                    sufixo = key[len(prefixo):]
+                    if sufixo.isdigit():
+                        valores[int(sufixo)] = value
+            return valores
+
+        return cls(
+            sun_elevation=mtl_data['SUN_ELEVATION'],
+            earth_sun_distance=mtl_data['EARTH_SUN_DISTANCE'],
+            reflectance_mult=por_banda('REFLECTANCE_MULT_BAND_'),
+            reflectance_add=por_banda('REFLECTANCE_ADD_BAND_'),
+            radiance_mult_termal=mtl_data[f'RADIANCE_MULT_BAND_{BANDA_TERMAL}'],
+            radiance_add_termal=mtl_data[f'RADIANCE_ADD_BAND_{BANDA_TERMAL}'],
+            k1=mtl_data[f'K1_CONSTANT_BAND_{BANDA_TERMAL}'],
+            k2=mtl_data[f'K2_CONSTANT_BAND_{BANDA_TERMAL}'],
+            radiance_maximum=por_banda('RADIANCE_MAXIMUM_BAND_'),
+            reflectance_maximum=por_banda('REFLECTANCE_MAXIMUM_BAND_'),
+            sun_azimuth=mtl_data.get('SUN_AZIMUTH'),
+            date_acquired=mtl_data.get('DATE_ACQUIRED'),
+            scene_center_time=mtl_data.get('SCENE_CENTER_TIME'),
+        )
+
+    def has_reflectance(self, banda):
+        """
+        Indica se o MTL traz os coeficientes de reflectância da banda.
+        """
+        return banda in self.reflectance_gain
+
+    def toa_reflectance(self, banda, dn, out=None):
+        """
+        Converte números digitais em reflectância TOA com uma única multiplicação e soma.
+
+        Com `out` (float64), o resultado é gravado nele, por exemplo na linha da pilha de bandas.
+        """
+        toa = np.multiply(dn, self.reflectance_gain[banda], out=out, dtype=np.float64)
+        toa += self.reflectance_offset[banda]
+        return toa
+
+    def thermal_radiance(self, dn):
+        """
+        Converte números digitais da banda termal em radiância espectral.
+        """
+        radiance = np.multiply(dn, self.radiance_mult_termal, dtype=np.float64)
+        radiance += self.radiance_add_termal
+        return radiance
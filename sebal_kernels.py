@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def lai_emissividades(savi, ndvi):
+    """
+    Calcula LAI, eNBf e e0f em uma única passada sobre o SAVI/NDVI.
+
+    As funções por partes são avaliadas in-place sobre os buffers de saída,
+    usando apenas máscaras booleanas como temporários.
+    """
+    savi = np.asarray(savi)
+    ndvi = np.asarray(ndvi)
+
+    # LAI: trecho logarítmico avaliado sobre o SAVI limitado ao intervalo válido
+    lai = np.clip(savi, 0.1, 0.687)
+    np.subtract(0.69, lai, out=lai)
+    np.divide(lai, 0.59, out=lai)
+    np.log(lai, out=lai)
+    np.divide(lai, -0.91, out=lai)
+    np.copyto(lai, 0.00001, where=savi < 0.1)
+    np.copyto(lai, 6, where=savi >= 0.687)
+    np.copyto(lai, 0, where=np.isnan(savi))
+
+    denso = lai >= 3
+    nao_vegetado = ~(ndvi > 0)
+
+    # Emissividade de banda estreita
+    eNBf = np.multiply(lai, 0.0033)
+    eNBf += 0.97
+    np.copyto(eNBf, 0.98, where=denso)
+    np.copyto(eNBf, 0.99, where=nao_vegetado)
+
+    # Emissividade de banda larga
+    e0f = np.multiply(lai, 0.01)
+    e0f += 0.95
+    np.copyto(e0f, 0.98, where=denso)
+    np.copyto(e0f, 0.985, where=nao_vegetado)
+
+    return lai, eNBf, e0f
+
+
+def _pixel_no_percentil(Ts, candidatos, percentil):
+    """
+    Índice (row, col) do candidato cuja Ts está mais próxima do percentil pedido.
+    """
+    indices = np.flatnonzero(candidatos & np.isfinite(Ts))
+    if indices.size == 0:
+        raise ValueError("Nenhum pixel candidato para a seleção automática da âncora.")
+    valores = Ts.ravel()[indices]
+    alvo = np.percentile(valores, percentil)
+    escolhido = indices[np.argmin(np.abs(valores - alvo))]
+    return np.unravel_index(escolhido, Ts.shape)
+
+
+def selecionar_pixel_frio(Ts, NDVI, percentil=2.5):
+    """
+    Seleciona automaticamente o pixel frio entre os candidatos da máscara Pcold.
+
+    Usa o pixel no percentil baixo da Ts (e não o mínimo) para evitar
+    corpos d'água e ruído.
+    """
+    candidatos = (NDVI > 0.4) & (Ts < np.nanmedian(Ts))
+    return _pixel_no_percentil(Ts, candidatos, percentil)
+
+
+def selecionar_pixel_quente(Ts, SAVI, percentil=97.5):
+    """
+    Seleciona automaticamente o pixel quente entre os candidatos da máscara Phot.
+    """
+    candidatos = (SAVI > 0.18) & (SAVI < 0.3)
+    return _pixel_no_percentil(Ts, candidatos, percentil)
@@ -0,0 +1,109 @@
+import hashlib
+import math
+
+import numpy as np
+
+# Metros por grau de latitude (aproximação esférica), para MDTs em SRC geográfico
+METROS_POR_GRAU = 111320.0
+
+# Número de grades de MDT mantidas no cache do processo
+MAX_TERRENOS = 4
+
+_TERRENOS = {}
+
+
+def declividade_aspecto(mdt, transform, nodata=None, geografico=False):
+    """
+    Declividade e aspecto (radianos) do MDT por diferenças finitas de Horn.
+
+    O aspecto é o azimute da direção de descida, no sentido horário a partir
+    do norte. Pixels sem dado (ou com vizinhos sem dado) são tratados como
+    planos. Com `geografico`, o tamanho do pixel em graus é convertido em
+    metros pela latitude de cada linha.
+    """
+    z = np.asarray(mdt, dtype='float64')
+    if nodata is not None:
+        z = np.where(z == nodata, np.nan, z)
+    # Extrapolação linear nas bordas, para que a declividade não caia à metade
+    z = np.pad(z, 1, mode='reflect', reflect_type='odd')
+
+    dx = abs(transform.a)
+    dy = abs(transform.e)
+    if geografico:
+        linhas = np.arange(z.shape[0] - 2)
+        latitudes = np.radians(transform.f + (linhas + 0.5) * transform.e)
+        dx = (dx * METROS_POR_GRAU * np.cos(latitudes))[:, None]
+        dy = dy * METROS_POR_GRAU
+
+    # Janela 3x3: a b c / d e f / g h i, com as linhas crescendo para o sul
+    a, b, c = z[:-2, :-2], z[:-2, 1:-1], z[:-2, 2:]
+    d, f = z[1:-1, :-2], z[1:-1, 2:]
+    g, h, i = z[2:, :-2], z[2:, 1:-1], z[2:, 2:]
+    dz_leste = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * dx)
+    dz_sul = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * dy)
+
+    declividade = np.arctan(np.hypot(dz_leste, dz_sul))
+    aspecto = np.mod(np.arctan2(-dz_leste, dz_sul), 2 * np.pi)
+    plano = np.isnan(declividade)
+    declividade[plano] = 0
+    aspecto[plano] = 0
+    return declividade, aspecto
+
+
+class Terreno:
+    """
+    Termos da declividade e do aspecto de uma grade de MDT para o ângulo de incidência.
+
+    cos θ = cos s · cos z + sen z · (cos φ · sen s · cos a + sen φ · sen s · sen a),
+    com s a declividade, a o aspecto, z o zênite e φ o azimute solar. Os
+    três termos do terreno são calculados uma vez por grade; para cada cena
+    resta a combinação com os senos e cossenos do sol.
+    """
+
+    def __init__(self, declividade, aspecto):
+        seno = np.sin(declividade)
+        self.cos_declividade = np.cos(declividade).astype('float32')
+        self.seno_cos_aspecto = (seno * np.cos(aspecto)).astype('float32')
+        self.seno_sen_aspecto = (seno * np.sin(aspecto)).astype('float32')
+
+    @classmethod
+    def from_mdt(cls, mdt, transform, nodata=None, geografico=False):
+        return cls(*declividade_aspecto(mdt, transform, nodata, geografico))
+
+    def cos_incidencia(self, azimute_sol, elevacao_sol, store=None):
+        """
+        Cosseno do ângulo de incidência solar em cada pixel, sem valores negativos.
+
+        Com o `store`, só os pixels válidos são combinados e o resultado é 1-D.
+        """
+        termos = (self.cos_declividade, self.seno_cos_aspecto, self.seno_sen_aspecto)
+        if store is not None:
+            termos = tuple(store.compact(termo) for termo in termos)
+        cos_declividade, seno_cos_aspecto, seno_sen_aspecto = termos
+        zenite = math.radians(90 - elevacao_sol)
+        azimute = math.radians(azimute_sol)
+        cos_theta = cos_declividade * math.cos(zenite)
+        cos_theta += math.sin(zenite) * math.cos(azimute) * seno_cos_aspecto
+        cos_theta += math.sin(zenite) * math.sin(azimute) * seno_sen_aspecto
+        return np.maximum(cos_theta, 0, out=cos_theta)
+
+
+def terreno_para_mdt(mdt, meta):
+    """
+    Terreno do MDT alinhado, reaproveitado entre cenas com a mesma grade e o mesmo MDT.
+
+    A chave inclui o resumo dos dados do MDT, para que um MDT diferente na
+    mesma grade não reaproveite a declividade de outro.
+    """
+    mdt = np.ascontiguousarray(mdt)
+    resumo = hashlib.blake2b(mdt.data, digest_size=16).hexdigest()
+    chave = (mdt.shape, tuple(meta['transform']), resumo)
+    terreno = _TERRENOS.get(chave)
+    if terreno is None:
+        crs = meta.get('crs')
+        geografico = bool(crs is not None and crs.is_geographic)
+        terreno = Terreno.from_mdt(mdt, meta['transform'], meta.get('nodata'), geografico)
+        if len(_TERRENOS) >= MAX_TERRENOS:
+            _TERRENOS.pop(next(iter(_TERRENOS)))
+        _TERRENOS[chave] = terreno
+    return terreno
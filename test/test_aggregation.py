@@ -0,0 +1,126 @@
+# coding=utf-8
+"""Temporal ET aggregation test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from aggregation import aggregate_et, interpolation_weights, monthly_periods, period_coefficients
+
+
+class AggregationTest(unittest.TestCase):
+    """Test ETof interpolation weights and block-wise integration."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmp = tempfile.mkdtemp()
+        self.datas = [np.datetime64('2023-01-01'), np.datetime64('2023-01-11'), np.datetime64('2023-02-10')]
+        self.eto = {dia: 4.0 for dia in np.arange(np.datetime64('2023-01-01'), np.datetime64('2023-03-01'))}
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmp)
+
+    def _raster(self, nome, valor):
+        caminho = os.path.join(self.tmp, nome)
+        perfil = {'driver': 'GTiff', 'count': 1, 'dtype': 'float32', 'width': 5, 'height': 300,
+                  'transform': from_origin(0, 300, 1, 1), 'crs': 'EPSG:32724', 'nodata': np.nan}
+        with rasterio.open(caminho, 'w', **perfil) as dst:
+            dst.write(np.broadcast_to(np.asarray(valor, dtype=np.float32), (300, 5)), 1)
+        return caminho
+
+    def test_linear_weights(self):
+        """Linear weights reproduce np.interp and sum to one."""
+        dias = np.arange(np.datetime64('2022-12-30'), np.datetime64('2023-02-15'))
+        pesos = interpolation_weights(self.datas, dias)
+        valores = np.array([0.2, 0.8, 0.5])
+        x = np.array(self.datas).astype(np.int64)
+        np.testing.assert_allclose(pesos @ valores, np.interp(dias.astype(np.int64), x, valores))
+        np.testing.assert_allclose(pesos.sum(axis=1), 1.0)
+
+    def test_spline_weights(self):
+        """Spline passes through the scenes and reproduces linear data."""
+        pesos = interpolation_weights(self.datas, self.datas, 'spline')
+        np.testing.assert_allclose(pesos, np.eye(3), atol=1e-12)
+        dias = np.arange(self.datas[0], self.datas[-1] + 1)
+        x = np.array(self.datas).astype(np.float64)
+        reta = 0.1 + 0.01 * (x - x[0])
+        esperado = 0.1 + 0.01 * (dias.astype(np.float64) - x[0])
+        np.testing.assert_allclose(interpolation_weights(self.datas, dias, 'spline') @ reta, esperado)
+
+    def test_missing_eto(self):
+        """A period without daily ETo is an error."""
+        with self.assertRaises(ValueError):
+            period_coefficients(self.datas, {}, [('jan', '2023-01-01', '2023-01-31')])
+
+    def test_monthly_periods(self):
+        """Months are clipped to the requested interval."""
+        periodos = monthly_periods('2023-01-11', '2023-03-05')
+        self.assertEqual([nome for nome, _, _ in periodos], ['2023-01', '2023-02', '2023-03'])
+        self.assertEqual(periodos[0][1], np.datetime64('2023-01-11'))
+        self.assertEqual(periodos[1][2], np.datetime64('2023-02-28'))
+        self.assertEqual(periodos[2][2], np.datetime64('2023-03-05'))
+
+    def test_aggregate(self):
+        """Constant ETof integrates to ETof * sum(ETo) for each period."""
+        caminhos = [self._raster(f'ETof_{k}.tif', 0.5) for k in range(3)]
+        periodos = monthly_periods(self.datas[0], self.datas[-1])
+        saidas = aggregate_et(caminhos, self.datas, self.eto, periodos, self.tmp)
+        with rasterio.open(saidas['2023-01']) as src:
+            np.testing.assert_allclose(src.read(1), 0.5 * 4.0 * 31, rtol=1e-6)
+        with rasterio.open(saidas['2023-02']) as src:
+            np.testing.assert_allclose(src.read(1), 0.5 * 4.0 * 10, rtol=1e-6)
+
+    def test_aggregate_etday(self):
+        """ETday rasters are converted to ETof with the scene-day ETo."""
+        caminhos = [self._raster(f'ETday_{k}.tif', 2.0) for k in range(3)]
+        periodos = [('total', self.datas[0], self.datas[-1])]
+        saidas = aggregate_et(caminhos, self.datas, self.eto, periodos, self.tmp, tipo='ETday')
+        with rasterio.open(saidas['total']) as src:
+            np.testing.assert_allclose(src.read(1), 2.0 * 41, rtol=1e-6)
+
+    def test_cloudy_pixels_interpolated(self):
+        """A pixel masked in one scene is interpolated between its valid scenes; NaN only without any."""
+        valores = [np.full((300, 5), valor, dtype=np.float32) for valor in (0.2, 0.5, 0.8)]
+        valores[1][0, 0] = np.nan  # nuvem na cena do meio
+        valores[0][1, 1] = np.nan  # nuvem na primeira cena
+        for grade in valores:
+            grade[2, 2] = np.nan  # sem nenhuma cena válida
+        caminhos = [self._raster(f'ETof_{k}.tif', grade) for k, grade in enumerate(valores)]
+        periodos = [('total', self.datas[0], self.datas[-1])]
+        with rasterio.open(aggregate_et(caminhos, self.datas, self.eto, periodos, self.tmp)['total']) as src:
+            et = src.read(1)
+        dias = np.arange(self.datas[0], self.datas[-1] + 1).astype(np.int64)
+        x = np.array(self.datas).astype(np.int64)
+        self.assertAlmostEqual(et[3, 3], 4.0 * np.interp(dias, x, [0.2, 0.5, 0.8]).sum(), places=3)
+        self.assertAlmostEqual(et[0, 0], 4.0 * np.interp(dias, x[[0, 2]], [0.2, 0.8]).sum(), places=3)
+        # Antes da segunda cena vale a cena válida mais próxima
+        self.assertAlmostEqual(et[1, 1], 4.0 * np.interp(dias, x[1:], [0.5, 0.8]).sum(), places=3)
+        self.assertTrue(np.isnan(et[2, 2]))
+        self.assertEqual(int(np.isnan(et).sum()), 1)
+
+    def test_etday_missing_scene_eto(self):
+        """ETday needs the ETo of every scene date."""
+        caminhos = [self._raster(f'ETday_{k}.tif', 2.0) for k in range(3)]
+        eto = {dia: valor for dia, valor in self.eto.items() if dia != self.datas[1]}
+        periodos = [('fev', np.datetime64('2023-02-01'), self.datas[-1])]
+        with self.assertRaisesRegex(ValueError, '2023-01-11'):
+            aggregate_et(caminhos, self.datas, eto, periodos, self.tmp, tipo='ETday')
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(AggregationTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,79 @@
+# coding=utf-8
+"""Anchor pixel sampling test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.warp import transform
+
+from anchors import AnchorSampler, amostrar_rasters
+from pixel_store import PixelStore
+
+
+class AnchorSamplerTest(unittest.TestCase):
+    """Test batched sampling from in-memory layers and from written rasters."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.mascara = np.random.default_rng(0).uniform(size=(50, 40)) > 0.3
+        self.mascara[10, 35] = True
+        self.mascara[45, 5] = False
+        self.store = PixelStore.from_mask(self.mascara)
+        self.transform = from_origin(500000, 9000000, 30, 30)
+        self.grade = np.arange(2000, dtype='float32').reshape(50, 40)
+        self.amostrador = AnchorSampler(self.store, self.transform, 'EPSG:32723',
+                                        {'Ts': self.store.compact(self.grade), 'RLi': np.float64(350.0)})
+        # Dentro da AOI, em pixel mascarado e fora da grade
+        self.pontos = [(500000 + 35 * 30 + 1, 9000000 - 10 * 30 - 1), (500000 + 5 * 30 + 15, 9000000 - 45 * 30 - 15),
+                       (400000, 9000000)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batch_in_memory(self):
+        """One call returns every layer for every point, NaN where there is no valid pixel."""
+        amostras = self.amostrador.amostrar(self.pontos)
+        np.testing.assert_array_equal(amostras['Ts'], [self.grade[10, 35], np.nan, np.nan])
+        self.assertEqual(amostras['Ts'].dtype, np.float32)
+        np.testing.assert_array_equal(amostras['RLi'], [350.0, np.nan, np.nan])
+        posicoes, _ = self.amostrador.localizar(self.pontos)
+        self.assertEqual(posicoes[0], self.store.position(10, 35))
+        self.assertEqual(list(posicoes[1:]), [-1, -1])
+
+    def test_geographic_coordinates(self):
+        """Longitude/latitude points land on the same pixel as the projected ones."""
+        longitudes, latitudes = transform('EPSG:32723', 'EPSG:4326', *zip(*self.pontos[:1]))
+        posicoes, coordenadas = self.amostrador.localizar([(longitudes[0], latitudes[0])], 'EPSG:4326')
+        self.assertEqual(posicoes[0], self.store.position(10, 35))
+        np.testing.assert_allclose(coordenadas[0], self.pontos[0], atol=1e-3)
+
+    def test_written_rasters(self):
+        """Sampling the written product matches the in-memory values."""
+        caminho = os.path.join(self.tmp.name, 'Ts.tif')
+        with rasterio.open(caminho, 'w', driver='GTiff', width=40, height=50, count=1, dtype='float32',
+                           crs='EPSG:32723', transform=self.transform, nodata=np.nan) as dst:
+            dst.write(self.store.expand(self.store.compact(self.grade)), 1)
+        np.testing.assert_array_equal(amostrar_rasters({'Ts': caminho}, self.pontos)['Ts'],
+                                      self.amostrador.amostrar(self.pontos, nomes=('Ts',))['Ts'])
+
+    def test_positions_match_position(self):
+        """The vectorized lookup agrees with the scalar one on every pixel of the grid."""
+        linhas, colunas = np.indices(self.store.shape).reshape(2, -1)
+        esperadas = [self.store.position(linha, coluna) for linha, coluna in zip(linhas, colunas)]
+        np.testing.assert_array_equal(self.store.positions(linhas, colunas),
+                                      [-1 if posicao is None else posicao for posicao in esperadas])
+
+
+if __name__ == '__main__':
+    unittest.main()
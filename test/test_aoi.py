@@ -0,0 +1,63 @@
+# coding=utf-8
+"""AOI crop and decimated read test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from shapely.geometry import box, mapping
+
+from aoi import AOI, grade_decimada
+
+
+class AOITest(unittest.TestCase):
+    """Test the full-resolution crop against the reduced preview grid."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.tmp.name, 'banda.tif')
+        self.transform = from_origin(500000, 9000000, 30, 30)
+        dados = np.arange(100 * 90, dtype='uint16').reshape(100, 90) + 1
+        with rasterio.open(self.caminho, 'w', driver='GTiff', width=90, height=100, count=1, dtype='uint16',
+                           crs='EPSG:32723', transform=self.transform, nodata=0) as dst:
+            dst.write(dados, 1)
+        # AOI de 60 x 50 pixels a partir da linha 10 e da coluna 20
+        self.aoi = AOI([mapping(box(500000 + 20 * 30, 9000000 - 70 * 30, 500000 + 70 * 30, 9000000 - 10 * 30))])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_grade_decimada(self):
+        """The reduced grid covers the same extent with ceil(n / factor) pixels."""
+        self.assertEqual(grade_decimada(self.transform, 100, 90, 1), (self.transform, 100, 90))
+        transform, altura, largura = grade_decimada(self.transform, 100, 90, 8)
+        self.assertEqual((altura, largura), (13, 12))
+        self.assertEqual(transform * (largura, altura), self.transform * (90, 100))
+
+    def test_decimated_crop(self):
+        """A decimated crop reads the AOI window already reduced, on the reduced grid."""
+        with rasterio.open(self.caminho) as src:
+            completo, transform = self.aoi.crop(src)
+            reduzido, transform_reduzido = self.aoi.crop(src, decimacao=5)
+            dentro = self.aoi.inside(src, decimacao=5)
+        self.assertEqual(completo.shape, (1, 60, 50))
+        self.assertEqual(reduzido.shape, (1, 12, 10))
+        self.assertEqual(dentro.shape, (12, 10))
+        self.assertTrue(dentro.all())
+        self.assertEqual(transform_reduzido, grade_decimada(transform, 60, 50, 5)[0])
+        # Vizinho mais próximo: cada pixel reduzido é um pixel da janela original
+        self.assertTrue(np.isin(reduzido, completo).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# coding=utf-8
+"""Auxiliary grid resampling test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+from rasterio.warp import reproject
+
+from benchmarks import golden
+
+grades = golden.importar_plugin('aux_grids')
+gdal_env = golden.importar_plugin('gdal_env')
+PixelStore = golden.importar_plugin('pixel_store').PixelStore
+
+
+class AuxGridTest(unittest.TestCase):
+    """Test block-wise resampling, block application and the cache lifetime."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # Grade auxiliar grossa (ETo em 300 m, geográfica) sobre a grade de 30 m da cena
+        self.caminho = os.path.join(self.tmp.name, 'eto.tif')
+        dados = np.linspace(3.0, 7.0, 70 * 12, dtype='float32').reshape(70, 12)
+        dados[5, 3] = -9999
+        with rasterio.open(self.caminho, 'w', driver='GTiff', width=12, height=70, count=1, dtype='float32',
+                           crs='EPSG:4326', transform=from_origin(-45.05, -9.5, 0.0027, 0.0027), nodata=-9999) as dst:
+            dst.write(dados, 1)
+        # Altura acima de um bloco (TAMANHO_BLOCO linhas) para exercitar várias janelas
+        self.meta = {'crs': rasterio.crs.CRS.from_epsg(32723), 'transform': from_origin(494500, 8949500, 30, 30),
+                     'width': 40, 'height': 600}
+        self.mascara = np.random.default_rng(3).uniform(size=(600, 40)) > 0.4
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def inteira(self):
+        """The auxiliary grid resampled onto the reference grid in a single call."""
+        destino = np.full((self.meta['height'], self.meta['width']), np.nan, dtype='float32')
+        with rasterio.open(self.caminho) as src:
+            reproject(rasterio.band(src, 1), destino, dst_transform=self.meta['transform'], dst_crs=self.meta['crs'],
+                      dst_nodata=np.nan, resampling=Resampling.bilinear)
+        return destino
+
+    def test_blockwise_matches_whole_array(self):
+        """Reading the cached grid window by window matches a whole-array resampling."""
+        with grades.AuxGrid(self.caminho, self.meta) as grade:
+            blocos = np.vstack([grade.read(janela) for janela in grades.iter_windows(600, 40)])
+        esperado = self.inteira()
+        self.assertGreater(np.isfinite(esperado).sum(), 0.9 * esperado.size)
+        np.testing.assert_allclose(blocos, esperado, rtol=1e-5, atol=1e-4, equal_nan=True)
+
+    def test_apply_by_blocks(self):
+        """Block application equals the whole-array computation, on grids and on pixel stores."""
+        cena = np.random.default_rng(4).uniform(0.2, 1.0, size=(600, 40))
+        with grades.open_input(self.caminho, self.meta, escala=0.5) as grade:
+            inteira = np.vstack([grade.read(janela) for janela in grades.iter_windows(600, 40)])
+            saida = grades.apply_by_blocks(grade, lambda eto, kc: eto * kc, cena)
+            np.testing.assert_array_equal(saida, inteira * cena)
+            store = PixelStore.from_mask(self.mascara)
+            compacta = grades.apply_by_blocks(grade, lambda eto, kc: eto * kc, store.compact(cena), store=store)
+            np.testing.assert_array_equal(compacta, store.compact(inteira * cena))
+        np.testing.assert_allclose(inteira, 0.5 * self.inteira(), rtol=1e-5, atol=1e-4, equal_nan=True)
+
+    def test_constant_grid(self):
+        """Scalars become constant grids with the same block interface."""
+        self.assertFalse(grades.is_grid_input(5.2))
+        with grades.open_input(5.2, self.meta, escala=0.5) as grade:
+            self.assertIsInstance(grade, grades.ConstantGrid)
+            self.assertEqual(grade.read(None), 2.6)
+            saida = grades.apply_by_blocks(grade, lambda eto, kc: eto * kc, np.ones((600, 40)))
+        np.testing.assert_array_equal(saida, np.full((600, 40), 2.6))
+
+    def test_cache_removed_on_close(self):
+        """Outside a session the resampled file is deleted when the grid closes."""
+        grade = grades.open_input(self.caminho, self.meta)
+        self.assertTrue(os.path.exists(grade.caminho_cache))
+        grade.close()
+        self.assertFalse(os.path.exists(grade.caminho_cache))
+
+    def test_cache_shared_within_session(self):
+        """Inside a session scenes on the same grid reuse one file, deleted when the session ends."""
+        with gdal_env.RasterSession():
+            with grades.AuxGrid(self.caminho, self.meta) as primeira:
+                pass
+            self.assertTrue(os.path.exists(primeira.caminho_cache))
+            with grades.AuxGrid(self.caminho, self.meta, escala=2.0) as segunda:
+                self.assertEqual(segunda.caminho_cache, primeira.caminho_cache)
+            with grades.AuxGrid(self.caminho, self.meta, resampling=Resampling.nearest) as vizinho:
+                self.assertNotEqual(vizinho.caminho_cache, primeira.caminho_cache)
+        self.assertFalse(os.path.exists(primeira.caminho_cache))
+        self.assertFalse(os.path.exists(os.path.dirname(primeira.caminho_cache)))
+
+
+if __name__ == '__main__':
+    unittest.main()
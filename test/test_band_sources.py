@@ -0,0 +1,95 @@
+# coding=utf-8
+"""Landsat band discovery test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tarfile
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from benchmarks import golden
+
+bandas = golden.importar_plugin('band_sources')
+
+PREFIXO = 'LC08_L1TP_219076_20230810_20230812_02_T1'
+
+
+class BandSourcesTest(unittest.TestCase):
+    """Test band and QA discovery in a directory, a .tar package and a /vsitar path."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pasta = os.path.join(cls.tmp.name, PREFIXO)
+        os.makedirs(cls.pasta)
+        # B8 (pancromática) não é usada pelo SEBAL; o MTL e o readme não são rasters
+        cls.valores = {'B2': 2, 'B10': 10, 'B8': 8, 'QA_PIXEL': 21824}
+        for sufixo, valor in cls.valores.items():
+            with rasterio.open(os.path.join(cls.pasta, f'{PREFIXO}_{sufixo}.TIF'), 'w', driver='GTiff', width=4,
+                               height=3, count=1, dtype='uint16', crs='EPSG:32623',
+                               transform=from_origin(500000, 9000000, 30, 30)) as dst:
+                dst.write(np.full((3, 4), valor, dtype='uint16'), 1)
+        for nome in (f'{PREFIXO}_MTL.txt', 'readme.txt'):
+            with open(os.path.join(cls.pasta, nome), 'w') as arquivo:
+                arquivo.write('\n')
+        cls.pacotes = {}
+        for extensao, modo in (('.tar', 'w'), ('.tar.gz', 'w:gz')):
+            caminho = os.path.join(cls.tmp.name, PREFIXO + extensao)
+            with tarfile.open(caminho, modo) as tar:
+                for nome in sorted(os.listdir(cls.pasta)):
+                    tar.add(os.path.join(cls.pasta, nome), arcname=nome)
+            cls.pacotes[extensao] = caminho
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def verificar(self, caminho_bandas):
+        """The required bands and the QA band are found and readable by GDAL."""
+        encontradas = bandas.discover_bands(caminho_bandas)
+        self.assertEqual(sorted(encontradas), [2, 10])
+        qa = bandas.discover_qa(caminho_bandas)
+        self.assertTrue(qa.endswith(f'{PREFIXO}_QA_PIXEL.TIF'))
+        for caminho, sufixo in ((encontradas[2], 'B2'), (encontradas[10], 'B10'), (qa, 'QA_PIXEL')):
+            with rasterio.open(caminho) as src:
+                self.assertEqual(int(src.read(1)[0, 0]), self.valores[sufixo])
+        return encontradas, qa
+
+    def test_directory(self):
+        """A local directory is listed with plain file paths."""
+        encontradas, _ = self.verificar(self.pasta)
+        self.assertEqual(encontradas[2], os.path.join(self.pasta, f'{PREFIXO}_B2.TIF'))
+
+    def test_tar_packages(self):
+        """.tar and .tar.gz packages are listed as /vsitar/ paths, without extracting."""
+        for extensao, caminho in self.pacotes.items():
+            with self.subTest(extensao):
+                encontradas, _ = self.verificar(caminho)
+                self.assertEqual(encontradas[10], f'/vsitar/{caminho}/{PREFIXO}_B10.TIF')
+                self.assertEqual(sorted(nome for nome, _ in bandas.list_rasters(caminho)),
+                                 sorted(f'{PREFIXO}_{sufixo}.TIF' for sufixo in self.valores))
+
+    @unittest.skipIf(bandas._importar_gdal() is None, 'osgeo.gdal is not available')
+    def test_vsitar_path(self):
+        """A /vsitar/ path is listed through GDAL."""
+        encontradas, _ = self.verificar(f'/vsitar/{self.pacotes[".tar"]}')
+        self.assertTrue(encontradas[2].startswith('/vsitar/'))
+
+    def test_missing_path(self):
+        """A path that does not exist raises OSError."""
+        with self.assertRaises(OSError):
+            bandas.discover_bands(os.path.join(self.tmp.name, 'nao_existe'))
+
+
+if __name__ == '__main__':
+    unittest.main()
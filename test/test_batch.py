@@ -0,0 +1,152 @@
+# coding=utf-8
+"""Batch processing test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks import golden
+
+lote = golden.importar_plugin('batch')
+meteorologia = golden.importar_plugin('weather')
+
+
+class ManifestTest(unittest.TestCase):
+    """Test the manifest parsing and the worker count."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_coordenadas(self):
+        """Anchor columns accept easting,northing, a list, or auto/empty."""
+        for valor in (None, '', '  ', 'auto', ' AUTO '):
+            self.assertEqual(lote.parse_coordenadas(valor), 'auto')
+        self.assertEqual(lote.parse_coordenadas('504425.0, 8995875'), (504425.0, 8995875.0))
+        self.assertEqual(lote.parse_coordenadas('504425;8995875'), (504425.0, 8995875.0))
+        self.assertEqual(lote.parse_coordenadas([504425, '8995875']), (504425.0, 8995875.0))
+        with self.assertRaises(ValueError):
+            lote.parse_coordenadas('leste,norte')
+
+    def test_carregar_manifesto_csv(self):
+        """CSV paths are resolved against the manifest folder; /vsi paths and empty columns are kept."""
+        caminho = os.path.join(self.tmp.name, 'manifesto.csv')
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            arquivo.write('cena,mtl,bandas,u2m,EToi,ETo,pcold,phot\n'
+                          'c1,c1/MTL.txt,c1/bandas,2.1,0.6,5.2,"504425.0,8995875.0",auto\n'
+                          ',,/vsis3/landsat/c2.tar,,,,,\n')
+        jobs, comuns = lote.carregar_manifesto(caminho)
+        self.assertEqual(comuns, {})
+        self.assertEqual(jobs[0]['mtl'], os.path.join(self.tmp.name, 'c1/MTL.txt'))
+        self.assertEqual(jobs[0]['bandas'], os.path.join(self.tmp.name, 'c1/bandas'))
+        self.assertEqual((jobs[0]['u2m'], jobs[0]['pcold'], jobs[0]['phot']), ('2.1', (504425.0, 8995875.0), 'auto'))
+        self.assertEqual((jobs[1]['cena'], jobs[1]['mtl'], jobs[1]['bandas']), ('cena_0001', '', '/vsis3/landsat/c2.tar'))
+        self.assertEqual((jobs[1]['u2m'], jobs[1]['pcold']), ('', 'auto'))
+
+    def test_carregar_manifesto_json(self):
+        """A JSON object carries the scenes and the common parameters."""
+        caminho = os.path.join(self.tmp.name, 'manifesto.json')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({'mdt': 'mdt.tif', 'fuso_horario': -3,
+                       'cenas': [{'cena': 'c1', 'bandas': 'c1.tar', 'u2m': 2.1, 'pcold': [1, 2]}]}, arquivo)
+        jobs, comuns = lote.carregar_manifesto(caminho)
+        self.assertEqual(comuns, {'mdt': 'mdt.tif', 'fuso_horario': -3})
+        self.assertEqual(jobs[0]['bandas'], os.path.join(self.tmp.name, 'c1.tar'))
+        self.assertEqual((jobs[0]['u2m'], jobs[0]['ETo'], jobs[0]['pcold']), (2.1, None, (1.0, 2.0)))
+
+    def test_calcular_workers(self):
+        """Workers are bounded by max_workers and by the available memory, never below one."""
+        gib = 1024 ** 3
+        with mock.patch.object(lote, 'memoria_disponivel', return_value=10 * gib):
+            self.assertEqual(lote.calcular_workers(2 * gib, 8), 3)
+            self.assertEqual(lote.calcular_workers(2 * gib, 2), 2)
+            self.assertEqual(lote.calcular_workers(100 * gib, 8), 1)
+            self.assertEqual(lote.calcular_workers(0, 5), 5)
+        with mock.patch.object(lote, 'memoria_disponivel', return_value=None):
+            self.assertEqual(lote.calcular_workers(100 * gib, 4), 4)
+
+
+class BatchStatusTest(unittest.TestCase):
+    """Failing scenes get a status row without aborting the batch."""
+
+    @classmethod
+    def setUpClass(cls):
+        golden.importar_plugin('log').configurar_log(nivel='WARNING')
+        cls.tmp = tempfile.mkdtemp()
+        cls.cena = golden.gerar_cena_golden(os.path.join(cls.tmp, 'cena'))
+        # Cópia do MTL com uma data sem registros nas estações
+        cls.mtl_sem_dados = os.path.join(cls.tmp, 'sem_dados_MTL.txt')
+        with open(cls.cena['mtl'], encoding='utf-8') as arquivo:
+            texto = arquivo.read()
+        with open(cls.mtl_sem_dados, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto.replace('DATE_ACQUIRED = 2023-08-10', 'DATE_ACQUIRED = 2023-09-10'))
+        cls.estacao = os.path.join(cls.tmp, 'estacao.csv')
+        with open(cls.estacao, 'w') as arquivo:
+            arquivo.write('data_hora,u2m,EToi,ETo\n'
+                          '2023-08-10 00:00,1.0,0.0,5.2\n'
+                          '2023-08-10 12:00,2.0,0.6,5.2\n'
+                          '2023-08-10 13:00,2.2,0.6,5.2\n')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def escrever_manifesto(self, linhas):
+        caminho = os.path.join(self.tmp, 'manifesto.csv')
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.DictWriter(arquivo, fieldnames=('cena', 'mtl', 'bandas', 'u2m', 'EToi', 'ETo', 'pcold', 'phot'))
+            escritor.writeheader()
+            escritor.writerows(linhas)
+        return caminho
+
+    def test_unresolvable_scene_does_not_abort(self):
+        """One scene without station data gets an error row; the others are processed."""
+        ancoras = {'pcold': '{},{}'.format(*golden.coordenadas(golden.ANCORA_FRIA)),
+                   'phot': '{},{}'.format(*golden.coordenadas(golden.ANCORA_QUENTE))}
+        linhas = [dict(ancoras, cena=nome, mtl=mtl, bandas=self.cena['bandas'])
+                  for nome, mtl in (('a', self.cena['mtl']), ('sem_dados', self.mtl_sem_dados),
+                                    ('sem_mtl', os.path.join(self.tmp, 'nao_existe_MTL.txt')), ('b', self.cena['mtl']))]
+        jobs, _ = lote.carregar_manifesto(self.escrever_manifesto(linhas))
+        saida = os.path.join(self.tmp, 'saida')
+        resultados = lote.run_batch(jobs, self.cena['mdt'], self.cena['aoi'], self.cena['referencia'], saida,
+                                    max_workers=1, meteorologia=meteorologia.WeatherProvider(self.estacao))
+        status = {linha['cena']: linha for linha in resultados}
+        self.assertEqual({cena: linha['status'] for cena, linha in status.items()},
+                         {'a': 'ok', 'b': 'ok', 'sem_dados': 'erro', 'sem_mtl': 'erro'})
+        self.assertIn('Sem dados meteorológicos', status['sem_dados']['mensagem'])
+        self.assertIn('MTL', status['sem_mtl']['mensagem'])
+        with open(os.path.join(saida, 'status_lote.csv'), encoding='utf-8') as arquivo:
+            self.assertEqual(sorted(linha['cena'] for linha in csv.DictReader(arquivo)), ['a', 'b', 'sem_dados', 'sem_mtl'])
+
+    def test_malformed_wind(self):
+        """A u2m value that is neither a number nor a raster becomes an error row with the column name."""
+        ancoras = {'pcold': '{},{}'.format(*golden.coordenadas(golden.ANCORA_FRIA)),
+                   'phot': '{},{}'.format(*golden.coordenadas(golden.ANCORA_QUENTE))}
+        linhas = [dict(ancoras, cena=nome, mtl=self.cena['mtl'], bandas=self.cena['bandas'], u2m=u2m, EToi='0.6', ETo='5.2')
+                  for nome, u2m in (('vento_invalido', '2,1 m/s'), ('ok', '2.1'))]
+        jobs, _ = lote.carregar_manifesto(self.escrever_manifesto(linhas))
+        saida = os.path.join(self.tmp, 'saida_vento')
+        resultados = lote.run_batch(jobs, self.cena['mdt'], self.cena['aoi'], self.cena['referencia'], saida,
+                                    max_workers=1)
+        status = {linha['cena']: linha for linha in resultados}
+        self.assertEqual(status['ok']['status'], 'ok')
+        self.assertEqual(status['vento_invalido']['status'], 'erro')
+        self.assertIn('ValueError: u2m inválido', status['vento_invalido']['mensagem'])
+        self.assertEqual(set(status['ok']), set(lote.COLUNAS_STATUS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# coding=utf-8
+"""Windowed composite writer test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from composite import estirar, percentis_amostrados, write_composite
+from pixel_store import PixelStore
+
+
+class CompositeTest(unittest.TestCase):
+    """Test the block-by-block composite and the percentile stretch."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        # Mais linhas que um bloco, com uma AOI irregular
+        mascara = rng.uniform(size=(600, 90)) > 0.3
+        self.store = PixelStore.from_mask(mascara)
+        self.bandas = [rng.uniform(0, 0.4, self.store.n) for _ in range(3)]
+        self.meta = {'driver': 'GTiff', 'crs': 'EPSG:32723', 'transform': from_origin(500000, 9000000, 30, 30),
+                     'count': 1, 'dtype': 'uint16', 'nodata': 0}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_float_matches_expanded_stack(self):
+        """Without scaling, the composite equals the stacked expanded bands."""
+        caminho = os.path.join(self.tmp.name, 'rgb.tif')
+        self.assertIsNone(write_composite(caminho, self.bandas, self.store, self.meta))
+        with rasterio.open(caminho) as src:
+            self.assertEqual((src.count, src.dtypes[0]), (3, 'float64'))
+            np.testing.assert_array_equal(src.read(), np.stack([self.store.expand(banda) for banda in self.bandas]))
+
+    def test_uint8_stretch(self):
+        """Scaled composites use 1..255 for valid pixels and 0 for nodata."""
+        caminho = os.path.join(self.tmp.name, 'rgb8.tif')
+        limites = write_composite(caminho, self.bandas, self.store, self.meta, escala='uint8')
+        with rasterio.open(caminho) as src:
+            self.assertEqual((src.dtypes[0], src.nodata), ('uint8', 0))
+            rgb = src.read()
+        valido = self.store.mask()
+        self.assertTrue((rgb[:, valido] >= 1).all())
+        self.assertTrue((rgb[:, ~valido] == 0).all())
+        self.assertEqual(rgb.max(), 255)
+        baixo, alto = limites[0]
+        self.assertAlmostEqual(baixo, np.percentile(self.bandas[0], 2), delta=0.01)
+        self.assertAlmostEqual(alto, np.percentile(self.bandas[0], 98), delta=0.01)
+
+    def test_stretch_helpers(self):
+        """The sampled percentiles and the stretch saturate at the limits."""
+        valores = np.linspace(0, 1, 1000001)
+        baixo, alto = percentis_amostrados(valores, (0, 100), amostra=1000)
+        self.assertEqual((baixo, alto), (0.0, 1.0))
+        np.testing.assert_array_equal(estirar(np.array([-1.0, 0.0, 0.5, 1.0, 2.0]), 0.0, 1.0, 'uint8'),
+                                      [1, 1, 128, 255, 255])
+
+    def test_unknown_scale(self):
+        with self.assertRaises(ValueError):
+            write_composite(os.path.join(self.tmp.name, 'x.tif'), self.bandas, self.store, self.meta, escala='int8')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# coding=utf-8
+"""Energy balance model engines test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import unittest
+
+import numpy as np
+
+from energy_balance import (ModeloBalanco, albedo_toa, criar_modelos, fluxo_calor_solo, psi_calor, psi_momento,
+                            resistencia_aerodinamica, rugosidade, velocidade_friccao)
+
+
+def _superficie(n=500, semente=0):
+    """Superfície sintética com um gradiente de Ts do pixel frio (0) ao quente (n - 1)."""
+    rng = np.random.default_rng(semente)
+    Ts = np.linspace(295, 315, n) + rng.normal(0, 0.2, n)
+    Ts[0], Ts[-1] = 295, 315
+    NDVI = np.linspace(0.8, 0.15, n)
+    SAVI = NDVI * 0.7
+    aS = np.linspace(0.15, 0.25, n)
+    Rn = np.linspace(650, 480, n)
+    G = fluxo_calor_solo(Ts, aS, NDVI, Rn)
+    Z0map = rugosidade(SAVI)
+    u_ast = velocidade_friccao(6.0, Z0map)
+    return {'NDVI': NDVI, 'SAVI': SAVI, 'Ts': Ts, 'aS': aS, 'Rn': Rn, 'G': G, 'Z0map': Z0map,
+            'u_ast': u_ast, 'rah': resistencia_aerodinamica(u_ast), 'mdt': np.linspace(400, 900, n)}
+
+
+class EnergyBalanceTest(unittest.TestCase):
+    """Test the shared primitives and the SEBAL/METRIC/SSEBop engines."""
+
+    def test_anchor_conditions(self):
+        """Every engine honours its cold and hot pixel assumptions."""
+        superficie = _superficie()
+        frio, quente, EToi = 0, len(superficie['Ts']) - 1, 0.6
+        sebal, metric, ssebop = criar_modelos(('SEBAL', 'METRIC', 'SSEBop'))
+
+        produtos = sebal.calcular(superficie, frio, quente, EToi)
+        self.assertAlmostEqual(produtos['H'][frio], 0, places=6)
+        self.assertAlmostEqual(produtos['LET'][quente], 0, places=6)
+
+        produtos = metric.calcular(superficie, frio, quente, EToi)
+        self.assertAlmostEqual(produtos['ETi'][frio], 1.05 * EToi, places=6)
+        self.assertAlmostEqual(produtos['LET'][quente], 0, places=4)
+
+        produtos = ssebop.calcular(superficie, frio, quente, EToi)
+        self.assertEqual(produtos['ETof'][frio], 1)
+        self.assertEqual(produtos['ETof'][quente], 0)
+        self.assertTrue(np.all((produtos['ETof'] >= 0) & (produtos['ETof'] <= 1.05)))
+
+    def test_models_share_surface(self):
+        """Engines do not modify the shared surface arrays."""
+        superficie = _superficie()
+        copia = {nome: valores.copy() for nome, valores in superficie.items()}
+        for modelo in criar_modelos(('SEBAL', 'METRIC', 'SSEBop')):
+            modelo.calcular(superficie, 0, len(superficie['Ts']) - 1, 0.6)
+        for nome, valores in copia.items():
+            np.testing.assert_array_equal(superficie[nome], valores)
+
+    def test_stability_corrections(self):
+        """Momentum and heat corrections agree in sign and vanish for neutral conditions."""
+        L = np.array([-50.0, np.inf, 50.0])
+        np.testing.assert_array_equal(np.sign(psi_momento(L, 200)), [1, 0, -1])
+        np.testing.assert_array_equal(np.sign(psi_calor(L, 2)), [1, 0, -1])
+        self.assertGreater(psi_momento(L, 200)[0], psi_calor(L, 200)[0] / 2)
+
+    def test_albedo_band_stack(self):
+        """The stacked albedo matches the band-by-band weighted sum and keeps the stack dtype."""
+        rng = np.random.default_rng(1)
+        reflectancias = rng.uniform(0, 0.5, (7, 1000))
+        pesos = rng.dirichlet(np.ones(7))
+        esperado = sum(banda * peso for banda, peso in zip(reflectancias, pesos))
+        np.testing.assert_allclose(albedo_toa(reflectancias, pesos), esperado, rtol=1e-14)
+        self.assertEqual(albedo_toa(reflectancias.astype('float32'), pesos).dtype, np.float32)
+
+    def test_unknown_model(self):
+        """Unknown model names are rejected."""
+        with self.assertRaises(ValueError):
+            criar_modelos(('SEBAL', 'TSEB'))
+
+    def test_model_base_is_abstract(self):
+        """A model without calcular cannot be instantiated."""
+        class SemCalculo(ModeloBalanco):
+            nome = 'incompleto'
+
+        for classe in (ModeloBalanco, SemCalculo):
+            with self.assertRaises(TypeError):
+                classe()
+
+
+if __name__ == '__main__':
+    unittest.main()
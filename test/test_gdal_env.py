@@ -0,0 +1,114 @@
+# coding=utf-8
+"""GDAL environment and dataset pool test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+import gdal_env
+from gdal_env import RasterSession, abrir, aguardar_segundo_plano, com_sessao, em_segundo_plano, memorizar
+
+
+class RasterSessionTest(unittest.TestCase):
+    """Test the pooled handles and the session lifetime."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.caminhos = []
+        perfil = {'driver': 'GTiff', 'height': 8, 'width': 8, 'count': 1, 'dtype': 'float32',
+                  'crs': 'EPSG:32723', 'transform': from_origin(500000, 9000000, 30, 30)}
+        for indice in range(3):
+            caminho = os.path.join(self.tmp.name, f'banda{indice}.tif')
+            with rasterio.open(caminho, 'w', **perfil) as dst:
+                dst.write(np.full((8, 8), indice, dtype='float32'), 1)
+            self.caminhos.append(caminho)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_handles_reused_within_session(self):
+        """The same path opens once and stays open until the session ends."""
+        with RasterSession() as sessao:
+            with abrir(self.caminhos[0]) as primeiro:
+                self.assertEqual(primeiro.read(1)[0, 0], 0)
+            with abrir(self.caminhos[0]) as segundo:
+                self.assertIs(primeiro, segundo)
+                self.assertFalse(segundo.closed)
+            self.assertEqual((sessao.aberturas, sessao.reaproveitamentos), (1, 1))
+        self.assertTrue(primeiro.closed)
+        self.assertIsNone(gdal_env.sessao_ativa())
+
+    def test_without_session_closes(self):
+        """Outside a session abrir behaves like rasterio.open."""
+        with abrir(self.caminhos[1]) as dataset:
+            self.assertEqual(dataset.read(1)[0, 0], 1)
+        self.assertTrue(dataset.closed)
+
+    def test_pool_limit(self):
+        """The least recently used handle is closed beyond the pool limit."""
+        with RasterSession(max_datasets=2):
+            handles = []
+            for caminho in self.caminhos:
+                with abrir(caminho) as dataset:
+                    handles.append(dataset)
+            self.assertEqual([dataset.closed for dataset in handles], [True, False, False])
+
+    def test_options_applied(self):
+        """The GDAL options are active inside the session."""
+        with RasterSession(GDAL_CACHEMAX=64):
+            opcoes = rasterio.env.getenv()
+            self.assertEqual(opcoes['GDAL_DISABLE_READDIR_ON_OPEN'], 'EMPTY_DIR')
+            self.assertEqual(str(opcoes['GDAL_CACHEMAX']), '64')
+
+    def test_memo_and_nesting(self):
+        """Scans are memoized per session and com_sessao reuses the active one."""
+        chamadas = []
+
+        def listar():
+            chamadas.append(1)
+            return ['a']
+
+        @com_sessao
+        def executar():
+            return gdal_env.sessao_ativa()
+
+        with RasterSession() as sessao:
+            memorizar('chave', listar)
+            memorizar('chave', listar)
+            self.assertIs(executar(), sessao)
+        memorizar('chave', listar)
+        self.assertEqual(len(chamadas), 2)
+        self.assertIsNotNone(executar())
+        self.assertIsNone(gdal_env.sessao_ativa())
+
+    def test_background_tasks(self):
+        """Background tasks see the session options and are joined; errors are returned."""
+        opcoes = []
+
+        def falhar():
+            raise OSError('falha')
+
+        with RasterSession():
+            em_segundo_plano(lambda: opcoes.append(rasterio.env.getenv()['GDAL_DISABLE_READDIR_ON_OPEN']))
+            em_segundo_plano(falhar)
+            erros = aguardar_segundo_plano()
+        self.assertEqual(opcoes, ['EMPTY_DIR'])
+        self.assertEqual([str(erro) for erro in erros], ['falha'])
+        # Sem sessão, a tarefa roda imediatamente
+        self.assertIsNone(em_segundo_plano(opcoes.append, 'direto'))
+        self.assertEqual(opcoes[-1], 'direto')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# coding=utf-8
+"""Golden-output regression test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.warp import transform
+
+from benchmarks import golden
+
+
+class GoldenTest(unittest.TestCase):
+    """Run every processing mode against the stored golden products."""
+
+    @classmethod
+    def setUpClass(cls):
+        golden.importar_plugin('log').configurar_log(nivel='WARNING')
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.cena = golden.gerar_cena_golden(os.path.join(cls.tmp.name, 'cena'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_modes_match_golden(self):
+        """Each engine and mode reproduces the golden rasters and statistics."""
+        for modo in golden.MODOS:
+            with self.subTest(modo=modo):
+                self.assertEqual(golden.verificar(modo, cena=self.cena), [])
+
+    def test_divergence_detected(self):
+        """A perturbation beyond the product tolerance is reported."""
+        with np.load(os.path.join(golden.PASTA_PADRAO, 'SEBAL.npz')) as produtos:
+            ETday = produtos['ETday']
+        self.assertEqual(golden.comparar_produto('ETday', ETday.copy(), ETday), [])
+        alterado = ETday.copy()
+        alterado[~np.isnan(alterado)] *= 1.001
+        self.assertEqual(len(golden.comparar_produto('ETday', alterado, ETday)), 1)
+        linha, coluna = np.argwhere(~np.isnan(ETday))[0]
+        alterado[linha, coluna] = np.nan
+        self.assertEqual(len(golden.comparar_produto('ETday', alterado, ETday)), 2)
+
+    def test_display_limits(self):
+        """The run records sampled display limits inside the range of each product."""
+        processamento = golden.importar_plugin('processing_functions')
+        saida = os.path.join(self.tmp.name, 'limites')
+        os.makedirs(saida)
+        limites = {}
+        with np.errstate(all='ignore'):
+            self.assertTrue(processamento.run_processing(
+                self.cena['mtl'], self.cena['mdt'], self.cena['bandas'], self.cena['aoi'], saida,
+                self.cena['referencia'], 2.1, 0.6, 5.2, pcold_coords=golden.coordenadas(golden.ANCORA_FRIA),
+                phot_coords=golden.coordenadas(golden.ANCORA_QUENTE), limites_exibicao=limites))
+        with open(os.path.join(golden.PASTA_PADRAO, 'golden.json'), encoding='utf-8') as arquivo:
+            esperadas = json.load(arquivo)['estatisticas']['SEBAL']
+        for nome in ('ETday', 'NDVI', 'Ts', 'H'):
+            baixo, alto = limites[os.path.join(saida, f'{nome}.tif')]
+            self.assertLessEqual(esperadas[nome]['minimo'], baixo)
+            self.assertLess(baixo, alto)
+            self.assertLessEqual(alto, esperadas[nome]['maximo'])
+        self.assertEqual(len(limites[os.path.join(saida, 'CC_432.tif')]), 3)
+
+    def test_geographic_anchors(self):
+        """Anchors given as longitude/latitude reproduce the SEBAL golden and report their values."""
+        processamento = golden.importar_plugin('processing_functions')
+        saida = os.path.join(self.tmp.name, 'latlon')
+        os.makedirs(saida)
+        projetadas = [golden.coordenadas(golden.ANCORA_FRIA), golden.coordenadas(golden.ANCORA_QUENTE)]
+        with rasterio.open(self.cena['referencia']) as src:
+            longitudes, latitudes = transform(src.crs, 'EPSG:4326', *zip(*projetadas))
+        ancoras = {}
+        with np.errstate(all='ignore'):
+            self.assertTrue(processamento.run_processing(
+                self.cena['mtl'], self.cena['mdt'], self.cena['bandas'], self.cena['aoi'], saida,
+                self.cena['referencia'], 2.1, 0.6, 5.2, pcold_coords=(longitudes[0], latitudes[0]),
+                phot_coords=(longitudes[1], latitudes[1]), crs_ancoras='EPSG:4326', ancoras=ancoras))
+        np.testing.assert_allclose([ancoras['pcold'], ancoras['phot']], projetadas, atol=1e-3)
+        self.assertEqual(len(ancoras['valores']['Ts']), 2)
+        with np.load(os.path.join(golden.PASTA_PADRAO, 'SEBAL.npz')) as produtos:
+            self.assertEqual(golden.comparar_produto('ETday', golden.ler_produtos(saida)['ETday'], produtos['ETday']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
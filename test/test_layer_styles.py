@@ -0,0 +1,51 @@
+# coding=utf-8
+"""Product layer style selection test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import unittest
+
+from layer_styles import LIMITES_SEM_DADOS, RAMPA_PADRAO, estilo_produto, limites_banda, rampa_produto
+
+
+class LayerStylesTest(unittest.TestCase):
+    """Test the ramp and display-limit choices made before building the QGIS renderers."""
+
+    def test_ramps(self):
+        """Products have their own ramp; the others use the default one."""
+        self.assertEqual(rampa_produto('Ts'), ('Spectral', True))
+        self.assertEqual(rampa_produto('NDVI'), ('RdYlGn', False))
+        self.assertEqual(rampa_produto('Z0map'), RAMPA_PADRAO)
+
+    def test_single_band(self):
+        """Single-band products get a pseudocolor style with the processing limits."""
+        self.assertEqual(estilo_produto('ETday', (0.4, 6.2)), ('pseudocor', (0.4, 6.2, 'RdYlBu', False)))
+        self.assertEqual(estilo_produto('aS', [(0.1, 0.3)]), ('pseudocor', (0.1, 0.3) + RAMPA_PADRAO))
+
+    def test_rgb(self):
+        """Composites get one stretch per band."""
+        limites = [(1, 255)] * 3
+        self.assertEqual(estilo_produto('CC_432', limites, 3), ('rgb', [(1.0, 255.0)] * 3))
+        self.assertEqual(estilo_produto('CC_432', (0.0, 0.3), 4), ('rgb', [(0.0, 0.3)] * 3))
+
+    def test_missing_limits_logged(self):
+        """A band without limits gets explicit fallback limits and a warning, never the QGIS default renderer."""
+        with self.assertLogs('evapogis.camadas', 'WARNING') as registros:
+            tipo, limites = estilo_produto('CC_432', [(0.02, 0.2), None, (0.01, 0.15)], 3)
+        self.assertEqual((tipo, limites), ('rgb', [(0.02, 0.2), LIMITES_SEM_DADOS, (0.01, 0.15)]))
+        self.assertIn('CC_432', registros.output[0])
+        with self.assertLogs('evapogis.camadas', 'WARNING'):
+            self.assertEqual(estilo_produto('ETof', None), ('pseudocor', LIMITES_SEM_DADOS + ('RdYlBu', False)))
+
+    def test_constant_product(self):
+        """Equal limits are widened around the value so the ramp is defined."""
+        self.assertEqual(limites_banda((350.0, 350.0)), (349.5, 350.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
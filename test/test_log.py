@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Logging configuration test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from log import BIBLIOTECAS, FiltroProgresso, configurar_log, evento
+
+
+def _registro(**campos):
+    registro = logging.LogRecord('evapogis.teste', logging.INFO, __file__, 1, 'progresso', None, None)
+    registro.evento = 'progresso'
+    registro.campos = dict(descricao='teste', **campos)
+    return registro
+
+
+class LogTest(unittest.TestCase):
+    """Test the evapogis logger, the progress filter and the JSON output."""
+
+    def tearDown(self):
+        logger = logging.getLogger('evapogis')
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        for nome in BIBLIOTECAS:
+            logging.getLogger(nome).setLevel(logging.NOTSET)
+
+    def test_progress_rate_limited(self):
+        """Only the first progress record of an interval and the final one pass."""
+        filtro = FiltroProgresso(intervalo=60)
+        passaram = [filtro.filter(_registro(feito=feito, total=10)) for feito in range(1, 11)]
+        self.assertEqual(passaram, [True] + [False] * 8 + [True])
+        comum = logging.LogRecord('evapogis.teste', logging.INFO, __file__, 1, 'mensagem', None, None)
+        self.assertTrue(filtro.filter(comum))
+
+    def test_third_party_capped(self):
+        """Library loggers are capped at WARNING even under a DEBUG root logger."""
+        configurar_log(forcar=True)
+        self.assertEqual(logging.getLogger('rasterio').level, logging.WARNING)
+        self.assertFalse(logging.getLogger('rasterio.env').isEnabledFor(logging.DEBUG))
+
+    def test_json_events(self):
+        """Structured fields are written as JSON lines without overriding the base keys."""
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'eventos.jsonl')
+            logger = configurar_log(arquivo=caminho, forcar=True)
+            logger.getChild('teste').info("NDVI salvo", extra=evento('produto_gravado', produto='NDVI', mensagem='x'))
+            for handler in logger.handlers:
+                handler.flush()
+            with open(caminho, encoding='utf-8') as arquivo:
+                registro = json.loads(arquivo.readline())
+            self.tearDown()
+        self.assertEqual(registro['evento'], 'produto_gravado')
+        self.assertEqual(registro['produto'], 'NDVI')
+        self.assertEqual(registro['mensagem'], 'NDVI salvo')
+        self.assertEqual(registro['logger'], 'evapogis.teste')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# coding=utf-8
+"""MTL parser test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from mtl_parser import (
+    CHAVES_OBRIGATORIAS, MTLError, flatten_mtl, load_mtl, parse_mtl_json,
+    parse_mtl_text, parse_mtl_xml, validate_mtl)
+
+MTL_TXT = '''GROUP = LANDSAT_METADATA_FILE
+  GROUP = IMAGE_ATTRIBUTES
+    SUN_ELEVATION = 55.12345678
+    SCENE_CENTER_TIME = "12:41:12.0000000Z"
+  END_GROUP = IMAGE_ATTRIBUTES
+  GROUP = LEVEL1_THERMAL_CONSTANTS
+    K1_CONSTANT_BAND_10 = 774.8853
+  END_GROUP = LEVEL1_THERMAL_CONSTANTS
+END_GROUP = LANDSAT_METADATA_FILE
+END
+'''
+
+
+class MTLParserTest(unittest.TestCase):
+    """Test the MTL parser for the three Collection 2 formats."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmp)
+
+    def test_parse_text_groups(self):
+        """Test the text parser keeps the group hierarchy."""
+        grupos = parse_mtl_text(MTL_TXT)
+        atributos = grupos['LANDSAT_METADATA_FILE']['IMAGE_ATTRIBUTES']
+        self.assertEqual(atributos['SUN_ELEVATION'], '55.12345678')
+        self.assertEqual(atributos['SCENE_CENTER_TIME'], '12:41:12.0000000Z')
+
+    def test_formats_are_equivalent(self):
+        """Test the JSON and XML parsers match the text parser."""
+        grupos = parse_mtl_text(MTL_TXT)
+        xml = ('<LANDSAT_METADATA_FILE><IMAGE_ATTRIBUTES>'
+               '<SUN_ELEVATION>55.12345678</SUN_ELEVATION>'
+               '<SCENE_CENTER_TIME>12:41:12.0000000Z</SCENE_CENTER_TIME>'
+               '</IMAGE_ATTRIBUTES><LEVEL1_THERMAL_CONSTANTS>'
+               '<K1_CONSTANT_BAND_10>774.8853</K1_CONSTANT_BAND_10>'
+               '</LEVEL1_THERMAL_CONSTANTS></LANDSAT_METADATA_FILE>')
+        self.assertEqual(parse_mtl_json(json.dumps(grupos)), grupos)
+        self.assertEqual(parse_mtl_xml(xml), grupos)
+
+    def test_unbalanced_groups(self):
+        """Test a truncated file raises MTLError instead of exiting."""
+        with self.assertRaises(MTLError):
+            parse_mtl_text('GROUP = A\n  X = 1\n')
+        with self.assertRaises(MTLError):
+            load_mtl(os.path.join(self.tmp, 'inexistente_MTL.txt'))
+
+    def test_load_from_tar(self):
+        """Test the MTL is read straight from a .tar bundle."""
+        caminho = os.path.join(self.tmp, 'LC08_TESTE.tar')
+        dados = MTL_TXT.encode('utf-8')
+        with tarfile.open(caminho, 'w') as tar:
+            membro = tarfile.TarInfo('LC08_TESTE_MTL.txt')
+            membro.size = len(dados)
+            tar.addfile(membro, io.BytesIO(dados))
+        plano = flatten_mtl(load_mtl(caminho))
+        self.assertEqual(plano['K1_CONSTANT_BAND_10'], '774.8853')
+
+    def test_validate_required_keys(self):
+        """Test missing required keys are reported up front."""
+        plano = {chave: '1.0' for chave in CHAVES_OBRIGATORIAS}
+        self.assertIs(validate_mtl(plano), plano)
+        del plano['SUN_ELEVATION']
+        with self.assertRaises(MTLError):
+            validate_mtl(plano)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(MTLParserTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
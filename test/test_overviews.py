@@ -0,0 +1,58 @@
+# coding=utf-8
+"""Product overview builder test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from overviews import build_overviews, niveis_automaticos
+
+
+class OverviewsTest(unittest.TestCase):
+    """Test the automatic levels and the internal overviews of a product."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.tmp.name, 'ETday.tif')
+        dados = np.arange(600 * 520, dtype='float32').reshape(600, 520)
+        dados[:, :8] = np.nan
+        with rasterio.open(self.caminho, 'w', driver='GTiff', width=520, height=600, count=1, dtype='float32',
+                           crs='EPSG:32723', transform=from_origin(500000, 9000000, 30, 30), nodata=np.nan) as dst:
+            dst.write(dados, 1)
+        self.dados = dados
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_automatic_levels(self):
+        """Levels stop once the overview is below the minimum side."""
+        self.assertEqual(niveis_automaticos(7800, 7600), [2, 4, 8, 16, 32])
+        self.assertEqual(niveis_automaticos(1000, 1000), [2, 4])
+        self.assertEqual(niveis_automaticos(64, 64), [])
+
+    def test_build_overviews(self):
+        """Overviews are internal, tagged and leave the full resolution untouched."""
+        self.assertEqual(build_overviews(self.caminho), [2, 4])
+        self.assertEqual(build_overviews(self.caminho, [2, 4, 8], 'nearest'), [2, 4, 8])
+        self.assertEqual(os.listdir(self.tmp.name), ['ETday.tif'])
+        with rasterio.open(self.caminho) as src:
+            self.assertEqual(src.overviews(1), [2, 4, 8])
+            self.assertEqual(src.tags(ns='rio_overview')['resampling'], 'nearest')
+            np.testing.assert_array_equal(src.read(1), self.dados)
+            reduzido = src.read(1, out_shape=(75, 65))
+        self.assertFalse(np.isnan(reduzido[:, 1:]).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# coding=utf-8
+"""Compacted pixel store test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import unittest
+
+import numpy as np
+
+from pixel_store import PixelStore
+
+
+class PixelStoreTest(unittest.TestCase):
+    """Test row-span compaction and expansion."""
+
+    def setUp(self):
+        """Runs before each test."""
+        gerador = np.random.default_rng(7)
+        self.mascara = gerador.random((13, 17)) > 0.6
+        self.mascara[0] = True
+        self.mascara[5] = False
+        self.grade = gerador.random((13, 17))
+        self.store = PixelStore.from_mask(self.mascara)
+
+    def test_round_trip(self):
+        """Compacting follows row order and expanding restores the grid."""
+        valores = self.store.compact(self.grade)
+        np.testing.assert_array_equal(valores, self.grade[self.mascara])
+        np.testing.assert_array_equal(self.store.indices(), np.flatnonzero(self.mascara))
+        np.testing.assert_array_equal(self.store.mask(), self.mascara)
+        expandida = self.store.expand(valores)
+        np.testing.assert_array_equal(expandida[self.mascara], self.grade[self.mascara])
+        self.assertTrue(np.isnan(expandida[~self.mascara]).all())
+        self.assertEqual(self.store.n, self.mascara.sum())
+
+    def test_position_and_pixel(self):
+        """Grid coordinates and compacted positions map to each other."""
+        for posicao, (row, col) in enumerate(zip(*np.nonzero(self.mascara))):
+            self.assertEqual(self.store.position(row, col), posicao)
+            self.assertEqual(self.store.pixel(posicao), (row, col))
+        row, col = np.argwhere(~self.mascara)[0]
+        self.assertIsNone(self.store.position(row, col))
+        self.assertIsNone(self.store.position(-1, 0))
+        self.assertIsNone(self.store.position(0, 17))
+
+    def test_rows(self):
+        """A block of whole rows is a contiguous slice of the compacted arrays."""
+        valores = self.store.compact(self.grade)
+        sub, fatia = self.store.rows(3, 9)
+        np.testing.assert_array_equal(valores[fatia], sub.compact(self.grade[3:9]))
+        np.testing.assert_array_equal(sub.mask(), self.mascara[3:9])
+
+    def test_mask_cached(self):
+        """The mask is built once, shared with row blocks and read-only."""
+        mascara = self.store.mask()
+        self.assertIs(self.store.mask(), mascara)
+        self.assertFalse(mascara.flags.writeable)
+        valores = self.store.compact(self.grade)
+        np.testing.assert_array_equal(self.store.compact(self.store.expand(valores)), valores)
+        self.assertIs(self.store.mask(), mascara)
+        sub, _ = self.store.rows(3, 9)
+        self.assertTrue(np.shares_memory(sub.mask(), mascara))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PixelStoreTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
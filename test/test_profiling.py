@@ -0,0 +1,77 @@
+# coding=utf-8
+"""Stage profiler test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from profiling import Profiler
+
+
+class ProfilerTest(unittest.TestCase):
+    """Test stage measurement and the JSON/trace reports."""
+
+    def test_nested_stages(self):
+        """Nested stages are recorded with depth, timings and pixel counts."""
+        perfil = Profiler()
+        with perfil.etapa('cena'):
+            with perfil.etapa('indices') as etapa:
+                sum(range(10000))
+                etapa['pixels'] = 42
+        relatorio = perfil.relatorio()
+        nomes = [registro['etapa'] for registro in relatorio['etapas']]
+        self.assertEqual(nomes, ['cena', 'indices'])
+        cena, indices = relatorio['etapas']
+        self.assertEqual((cena['profundidade'], indices['profundidade']), (0, 1))
+        self.assertEqual(indices['pixels'], 42)
+        self.assertGreaterEqual(cena['tempo_s'], indices['tempo_s'])
+
+    def test_stage_recorded_on_error(self):
+        """A stage that raises is still recorded."""
+        perfil = Profiler()
+        with self.assertRaises(ValueError):
+            with perfil.etapa('falha'):
+                raise ValueError
+        self.assertEqual(perfil.etapas[0]['etapa'], 'falha')
+
+    def test_decorator(self):
+        """The decorator measures each call under the function name."""
+        perfil = Profiler()
+
+        @perfil.medir()
+        def calcular(x):
+            return x * 2
+
+        self.assertEqual(calcular(3), 6)
+        self.assertEqual(perfil.etapas[0]['etapa'], 'calcular')
+
+    def test_disabled(self):
+        """A disabled profiler records nothing."""
+        perfil = Profiler(ativo=False)
+        with perfil.etapa('cena', pixels=10) as etapa:
+            etapa['pixels'] = 20
+        self.assertEqual(perfil.etapas, [])
+
+    def test_reports(self):
+        """The JSON report and the Chrome trace are written."""
+        perfil = Profiler()
+        with perfil.etapa('ingestao', pixels=100):
+            pass
+        with tempfile.TemporaryDirectory() as pasta:
+            with open(perfil.write_json(os.path.join(pasta, 'perfil.json'))) as arquivo:
+                self.assertEqual(json.load(arquivo)['etapas'][0]['pixels'], 100)
+            with open(perfil.write_trace(os.path.join(pasta, 'trace.json'))) as arquivo:
+                evento = json.load(arquivo)['traceEvents'][0]
+        self.assertEqual((evento['name'], evento['ph']), ('ingestao', 'X'))
+
+
+if __name__ == '__main__':
+    unittest.main()
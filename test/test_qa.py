@@ -0,0 +1,48 @@
+# coding=utf-8
+"""QA_PIXEL mask test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import unittest
+
+import numpy as np
+
+from qa import bits_qa, qa_invalid_mask
+
+
+class QAMaskTest(unittest.TestCase):
+    """Test QA_PIXEL bit decoding and dilation."""
+
+    def test_decoding(self):
+        """Cloud, shadow and fill pixels are masked; clear and water are kept."""
+        qa = np.array([[21824, 22280, 23888], [1, 21952, 0]], dtype=np.uint16)
+        esperado = np.array([[False, True, True], [True, False, False]])
+        np.testing.assert_array_equal(qa_invalid_mask(qa), esperado)
+
+    def test_selected_classes(self):
+        """Only the requested classes are masked."""
+        qa = np.array([[1 << 3, 1 << 4]], dtype=np.uint16)
+        np.testing.assert_array_equal(qa_invalid_mask(qa, classes=('sombra',)), [[False, True]])
+        self.assertEqual(bits_qa(('nuvem', 'sombra')), 0b11000)
+        with self.assertRaises(ValueError):
+            bits_qa(('granizo',))
+
+    def test_dilation(self):
+        """Dilation grows the mask by a square window."""
+        qa = np.zeros((7, 7), dtype=np.uint16)
+        qa[3, 3] = 1 << 3
+        mascara = qa_invalid_mask(qa, dilatacao=2)
+        esperado = np.zeros((7, 7), dtype=bool)
+        esperado[1:6, 1:6] = True
+        np.testing.assert_array_equal(mascara, esperado)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(QAMaskTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,87 @@
+# coding=utf-8
+"""Scene metadata descriptor test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import math
+import unittest
+
+import numpy as np
+
+from scene_metadata import BANDA_TERMAL, BANDAS_REFLETIVAS, SceneMetadata
+
+
+def mtl_exemplo():
+    """Flattened MTL of a Landsat 8 scene, as returned by read_mtl."""
+    mtl = {
+        'SUN_ELEVATION': 58.3,
+        'SUN_AZIMUTH': 51.2,
+        'EARTH_SUN_DISTANCE': 1.0131,
+        'DATE_ACQUIRED': '2023-08-10',
+        f'RADIANCE_MULT_BAND_{BANDA_TERMAL}': 3.342e-4,
+        f'RADIANCE_ADD_BAND_{BANDA_TERMAL}': 0.1,
+        f'K1_CONSTANT_BAND_{BANDA_TERMAL}': 774.8853,
+        f'K2_CONSTANT_BAND_{BANDA_TERMAL}': 1321.0789,
+    }
+    for banda in BANDAS_REFLETIVAS:
+        mtl[f'REFLECTANCE_MULT_BAND_{banda}'] = 2.0e-5
+        mtl[f'REFLECTANCE_ADD_BAND_{banda}'] = -0.1
+        mtl[f'RADIANCE_MAXIMUM_BAND_{banda}'] = 800.0 - 100 * banda
+        mtl[f'REFLECTANCE_MAXIMUM_BAND_{banda}'] = 1.2107
+    return mtl
+
+
+class SceneMetadataTest(unittest.TestCase):
+    """Test the precomputed TOA gains, ESUN weights and thermal constants."""
+
+    def setUp(self):
+        self.mtl = mtl_exemplo()
+        self.cena = SceneMetadata.from_mtl(self.mtl)
+
+    def test_gains(self):
+        """Gains and offsets already include the sun elevation correction."""
+        seno = math.sin(math.radians(58.3))
+        self.assertAlmostEqual(self.cena.reflectance_gain[4], 2.0e-5 / seno)
+        self.assertAlmostEqual(self.cena.reflectance_offset[4], -0.1 / seno)
+        dn = np.array([[7000, 12000], [20000, 0]], dtype='uint16')
+        np.testing.assert_allclose(self.cena.toa_reflectance(4, dn), (2.0e-5 * dn - 0.1) / seno)
+        np.testing.assert_allclose(self.cena.thermal_radiance(dn), 3.342e-4 * dn + 0.1)
+        self.assertTrue(self.cena.has_reflectance(7))
+        self.assertFalse(self.cena.has_reflectance(BANDA_TERMAL))
+
+    def test_d2_and_esun_weights(self):
+        """d² is the squared distance; the ESUN weights are normalized and do not depend on it."""
+        self.assertAlmostEqual(self.cena.d2, 1.0131 ** 2)
+        self.assertAlmostEqual(self.cena.esun[0], math.pi * 1.0131 ** 2 * 700.0 / 1.2107)
+        razoes = np.array([800.0 - 100 * banda for banda in BANDAS_REFLETIVAS])
+        np.testing.assert_allclose(self.cena.esun_weights, razoes / razoes.sum())
+        self.assertAlmostEqual(sum(self.cena.esun_weights), 1.0)
+
+    def test_missing_band_weight(self):
+        """A band without maximum radiance gets zero weight, with a warning."""
+        del self.mtl['RADIANCE_MAXIMUM_BAND_1']
+        with self.assertLogs('evapogis.metadados', 'WARNING'):
+            cena = SceneMetadata.from_mtl(self.mtl)
+        self.assertEqual(cena.esun_weights[0], 0.0)
+        self.assertAlmostEqual(sum(cena.esun_weights), 1.0)
+
+    def test_invalid_values(self):
+        """Values that leave the constants undefined raise ValueError instead of ZeroDivisionError."""
+        sem_esun = {chave: valor for chave, valor in self.mtl.items() if not chave.startswith('RADIANCE_MAXIMUM')}
+        with self.assertLogs('evapogis.metadados', 'WARNING'), self.assertRaises(ValueError):
+            SceneMetadata.from_mtl(sem_esun)
+        for chave, valor in (('REFLECTANCE_MAXIMUM_BAND_3', 0.0), ('SUN_ELEVATION', 0.0), ('SUN_ELEVATION', -12.0)):
+            with self.subTest(chave=chave, valor=valor), self.assertRaises(ValueError):
+                SceneMetadata.from_mtl(dict(self.mtl, **{chave: valor}))
+        del self.mtl['SUN_ELEVATION']
+        with self.assertRaises(KeyError):
+            SceneMetadata.from_mtl(self.mtl)
+
+
+if __name__ == '__main__':
+    unittest.main()
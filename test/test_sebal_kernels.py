@@ -0,0 +1,53 @@
+# coding=utf-8
+"""SEBAL kernels test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import unittest
+
+import numpy as np
+
+from sebal_kernels import lai_emissividades
+
+
+def _lai_emissividades_referencia(savi, ndvi):
+    """Formulação original por máscaras e np.where encadeados."""
+    lai = np.zeros_like(savi, dtype=float)
+    lai[savi < 0.1] = 0.00001
+    mask = (savi >= 0.1) & (savi < 0.687)
+    lai[mask] = -np.log((0.69 - savi[mask]) / 0.59) / 0.91
+    lai[savi >= 0.687] = 6
+    eNB = np.where((lai < 3) & (ndvi > 0), 0.97 + 0.0033 * lai,
+                   np.where((lai >= 3) & (ndvi > 0), 0.98, np.nan))
+    e0 = np.where((lai < 3) & (ndvi > 0), 0.95 + 0.01 * lai,
+                  np.where((lai >= 3) & (ndvi > 0), 0.98, np.nan))
+    return (lai, np.where(np.isnan(eNB), 0.99, eNB),
+            np.where(np.isnan(e0), 0.985, e0))
+
+
+class SebalKernelsTest(unittest.TestCase):
+    """Test the vectorized SEBAL kernels."""
+
+    def test_lai_emissividades_equivalente(self):
+        """Test the single-pass LAI/emissivity matches the reference."""
+        rng = np.random.default_rng(42)
+        savi = rng.uniform(-1, 1, (64, 64))
+        ndvi = rng.uniform(-1, 1, (64, 64))
+        savi[0, :4] = [np.nan, 0.1, 0.687, 0.6869]
+        ndvi[1, :2] = [np.nan, 0.0]
+
+        obtido = lai_emissividades(savi, ndvi)
+        esperado = _lai_emissividades_referencia(savi, ndvi)
+        for valor, referencia in zip(obtido, esperado):
+            np.testing.assert_allclose(valor, referencia, rtol=1e-12)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SebalKernelsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
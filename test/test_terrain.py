@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Terrain slope/aspect test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import math
+import unittest
+
+import numpy as np
+from affine import Affine
+
+from terrain import Terreno, declividade_aspecto, terreno_para_mdt
+
+TRANSFORM = Affine(30, 0, 500000, 0, -30, 9000000)
+
+
+def _rampa(leste=0.0, norte=0.0, forma=(20, 30)):
+    """MDT plano inclinado com os gradientes dados (m/m)."""
+    linhas, colunas = np.indices(forma)
+    return 500 + leste * colunas * 30 + norte * (-linhas) * 30
+
+
+class TerrainTest(unittest.TestCase):
+    """Test slope, aspect and the solar incidence angle."""
+
+    def test_slope_aspect(self):
+        """A plane descending to the east, south or west has the expected slope and aspect."""
+        for mdt, aspecto_esperado in ((_rampa(leste=-0.1), 90), (_rampa(norte=0.1), 180), (_rampa(leste=0.1), 270)):
+            declividade, aspecto = declividade_aspecto(mdt, TRANSFORM)
+            np.testing.assert_allclose(declividade, math.atan(0.1))
+            np.testing.assert_allclose(np.degrees(aspecto), aspecto_esperado)
+
+    def test_flat_terrain_matches_zenith(self):
+        """On flat terrain the incidence angle is the solar zenith."""
+        terreno = Terreno.from_mdt(np.full((5, 5), 800.0), TRANSFORM)
+        cos_theta = terreno.cos_incidencia(110, 55)
+        np.testing.assert_allclose(cos_theta, math.cos(math.radians(35)), rtol=1e-6)
+
+    def test_slope_facing_sun(self):
+        """A slope facing the sun receives more than flat terrain, and one facing away less."""
+        elevacao = 40
+        plano = math.cos(math.radians(90 - elevacao))
+        voltado = Terreno.from_mdt(_rampa(leste=-0.3), TRANSFORM).cos_incidencia(90, elevacao)
+        oposto = Terreno.from_mdt(_rampa(leste=0.3), TRANSFORM).cos_incidencia(90, elevacao)
+        self.assertTrue(np.all(voltado > plano))
+        self.assertTrue(np.all(oposto < plano))
+
+    def test_nodata_is_flat(self):
+        """Pixels next to missing elevations fall back to flat terrain."""
+        mdt = _rampa(leste=-0.2)
+        mdt[10, 10] = -9999
+        declividade, _ = declividade_aspecto(mdt, TRANSFORM, nodata=-9999)
+        self.assertEqual(declividade[10, 11], 0)
+        self.assertAlmostEqual(declividade[0, 0], math.atan(0.2))
+
+    def test_cache_per_dem(self):
+        """The same DEM grid is reused and a different DEM is not."""
+        meta = {'transform': TRANSFORM, 'nodata': None}
+        mdt = _rampa(leste=0.1)
+        self.assertIs(terreno_para_mdt(mdt, meta), terreno_para_mdt(mdt.copy(), meta))
+        self.assertIsNot(terreno_para_mdt(mdt, meta), terreno_para_mdt(mdt + 1, meta))
+
+
+if __name__ == '__main__':
+    unittest.main()
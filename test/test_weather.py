@@ -0,0 +1,65 @@
+# coding=utf-8
+"""Weather provider test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from weather import WeatherProvider, load_series
+
+
+class WeatherProviderTest(unittest.TestCase):
+    """Test station CSV indexing and per-scene lookup."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmp = tempfile.mkdtemp()
+        self.horario = os.path.join(self.tmp, 'horario.csv')
+        self.diario = os.path.join(self.tmp, 'diario.csv')
+        with open(self.horario, 'w') as arquivo:
+            arquivo.write('data_hora;u2m;EToi\n'
+                          '2023-08-10 10:00;2,0;0,60\n'
+                          '2023-08-10 09:00;1,0;0,40\n')
+        with open(self.diario, 'w') as arquivo:
+            arquivo.write('data,ETo\n2023-08-09,5.0\n2023-08-10,5.2\n')
+        self.mtl = {'DATE_ACQUIRED': '2023-08-10', 'SCENE_CENTER_TIME': '12:30:00.0000000Z'}
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmp)
+
+    def test_scene_parameters(self):
+        """Test hourly values are interpolated at the local scene time."""
+        provedor = WeatherProvider(self.horario, self.diario, fuso_horario=-3)
+        parametros = provedor.scene_parameters(self.mtl)
+        self.assertAlmostEqual(parametros['u2m'], 1.5)
+        self.assertAlmostEqual(parametros['EToi'], 0.5)
+        self.assertAlmostEqual(parametros['ETo'], 5.2)
+
+    def test_missing_data(self):
+        """Test scenes outside the station records are rejected."""
+        provedor = WeatherProvider(self.horario, self.diario)
+        with self.assertRaises(ValueError):
+            provedor.scene_parameters(self.mtl)
+
+    def test_series_is_parsed_once(self):
+        """Test the station CSV is cached between lookups."""
+        self.assertIs(load_series(self.diario), load_series(self.diario))
+        serie = load_series(self.diario)
+        self.assertTrue(np.isnan(serie.value_at('ETo', np.datetime64('2023-08-11'), metodo='exato')))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(WeatherProviderTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
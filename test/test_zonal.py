@@ -0,0 +1,91 @@
+# coding=utf-8
+"""Zonal statistics test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import geopandas as gpd
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from pixel_store import PixelStore
+from zonal import ZonalStats
+
+
+class ZonalStatsTest(unittest.TestCase):
+    """Test per-feature statistics on the processing grid."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmp = tempfile.mkdtemp()
+        feicoes = gpd.GeoDataFrame({'talhao': ['A', 'B', 'vazio']},
+                                   geometry=[box(0, 0, 4, 10), box(4, 0, 10, 10), box(100, 100, 101, 101)],
+                                   crs='EPSG:32724')
+        self.zonal = ZonalStats(feicoes)
+        self.meta = {'crs': CRS.from_epsg(32724), 'transform': from_origin(0, 10, 1, 1), 'width': 10, 'height': 10}
+        self.valores = np.arange(100, dtype=np.float64).reshape(10, 10)
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmp)
+
+    def test_statistics(self):
+        """Statistics match a per-feature numpy computation."""
+        self.valores[0, 0] = np.nan
+        tabela = self.zonal.compute({'ETday': self.valores}, self.meta)
+        for indice, fatia in enumerate((np.s_[:, :4], np.s_[:, 4:])):
+            esperado = self.valores[fatia]
+            esperado = esperado[~np.isnan(esperado)]
+            self.assertEqual(tabela['ETday_n'][indice], esperado.size)
+            self.assertAlmostEqual(tabela['ETday_media'][indice], esperado.mean())
+            self.assertAlmostEqual(tabela['ETday_mediana'][indice], np.median(esperado))
+            self.assertAlmostEqual(tabela['ETday_min'][indice], esperado.min())
+            self.assertAlmostEqual(tabela['ETday_max'][indice], esperado.max())
+            self.assertAlmostEqual(tabela['ETday_desvio'][indice], esperado.std())
+
+    def test_feature_without_pixels(self):
+        """A feature outside the grid gets NaN statistics."""
+        tabela = self.zonal.compute({'NDVI': self.valores}, self.meta)
+        self.assertEqual(tabela['NDVI_n'][2], 0)
+        self.assertTrue(np.isnan(tabela['NDVI_media'][2]))
+        self.assertTrue(np.isnan(tabela['NDVI_mediana'][2]))
+
+    def test_compacted_values(self):
+        """Valid-pixel arrays give the same statistics as the full grid."""
+        valido = np.ones((10, 10), dtype=bool)
+        valido[:, 8:] = False
+        grade = np.where(valido, self.valores, np.nan)
+        esperado = self.zonal.compute({'ETday': grade}, self.meta)
+        tabela = self.zonal.compute({'ETday': self.valores[valido]}, self.meta, PixelStore.from_mask(valido))
+        for coluna, valores in esperado.items():
+            np.testing.assert_allclose(tabela[coluna], valores)
+
+    def test_labels_are_cached(self):
+        """Feature IDs are rasterized once per grid."""
+        self.assertIs(self.zonal.rotulos(self.meta), self.zonal.rotulos(self.meta))
+
+    def test_write_csv(self):
+        """The CSV has one row per feature with its attributes."""
+        caminho = os.path.join(self.tmp, 'zonal.csv')
+        self.zonal.write_csv(self.zonal.compute({'Rn': self.valores}, self.meta), caminho)
+        with open(caminho) as arquivo:
+            linhas = arquivo.read().splitlines()
+        self.assertEqual(len(linhas), 4)
+        self.assertTrue(linhas[0].startswith('fid,talhao,Rn_n,Rn_media'))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ZonalStatsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,160 @@
+import csv
+import os
+from datetime import datetime
+
+import numpy as np
+
+# Nomes aceitos para a coluna de data/hora nos CSVs das estações
+COLUNAS_TEMPO = ('data_hora', 'timestamp', 'datetime', 'data', 'date')
+
+_CACHE_SERIES = {}
+
+
+class WeatherSeries:
+    """
+    Série temporal de uma estação meteorológica indexada por data/hora.
+
+    O CSV é lido uma única vez; os instantes ficam em um array ordenado de
+    segundos e cada consulta é uma busca binária (np.searchsorted).
+    """
+
+    def __init__(self, tempos, colunas):
+        ordem = np.argsort(tempos, kind='stable')
+        self.tempos = tempos[ordem]
+        self.colunas = {nome: valores[ordem] for nome, valores in colunas.items()}
+
+    @classmethod
+    def from_csv(cls, caminho, coluna_tempo=None, formato_tempo=None, delimitador=None, decimal=None):
+        """
+        Lê o CSV da estação; colunas não numéricas são ignoradas.
+
+        `formato_tempo` (strftime) só é necessário quando a data/hora não
+        estiver em formato ISO (AAAA-MM-DD HH:MM[:SS]). Sem `decimal`, CSVs
+        separados por ';' são lidos com vírgula decimal.
+        """
+        with open(caminho, 'r', encoding='utf-8-sig', newline='') as arquivo:
+            amostra = arquivo.read(4096)
+            arquivo.seek(0)
+            if delimitador is None:
+                try:
+                    delimitador = csv.Sniffer().sniff(amostra, delimiters=',;\t').delimiter
+                except csv.Error:
+                    delimitador = ','
+            if decimal is None:
+                decimal = ',' if delimitador == ';' else '.'
+            leitor = csv.reader(arquivo, delimiter=delimitador)
+            cabecalho = [nome.strip() for nome in next(leitor)]
+            linhas = [linha for linha in leitor if linha]
+
+        if coluna_tempo is None:
+            minusculas = [nome.lower() for nome in cabecalho]
+            coluna_tempo = next((cabecalho[minusculas.index(nome)] for nome in COLUNAS_TEMPO if nome in minusculas), None)
+            if coluna_tempo is None:
+                raise ValueError(f"Coluna de data/hora não encontrada em {caminho}.")
+        indice_tempo = cabecalho.index(coluna_tempo)
+
+        textos = [linha[indice_tempo].strip() for linha in linhas]
+        if formato_tempo:
+            tempos = np.array([np.datetime64(datetime.strptime(texto, formato_tempo), 's') for texto in textos])
+        else:
+            tempos = np.array(textos, dtype='datetime64[s]')
+
+        colunas = {}
+        for indice, nome in enumerate(cabecalho):
+            if indice == indice_tempo:
+                continue
+            try:
+                colunas[nome] = np.array(
+                    [float(linha[indice].replace(decimal, '.')) if linha[indice].strip() else np.nan for linha in linhas],
+                    dtype=np.float64)
+            except (ValueError, IndexError):
+                continue
+        return cls(tempos.astype('datetime64[s]').astype(np.int64), colunas)
+
+    def value_at(self, coluna, instante, metodo='linear', tolerancia=None):
+        """
+        Valor da coluna no instante (datetime64), por busca binária.
+
+        `metodo` pode ser 'linear' (interpola entre os registros vizinhos),
+        'anterior' ou 'exato'. `tolerancia` (np.timedelta64) limita a
+        distância até o registro usado; fora dela o resultado é NaN.
+        """
+        valores = self.colunas[coluna]
+        t = np.datetime64(instante, 's').astype(np.int64)
+        n = self.tempos.size
+        i = np.searchsorted(self.tempos, t, side='right')
+        limite = None if tolerancia is None else np.timedelta64(tolerancia, 's').astype(np.int64)
+
+        if i > 0 and self.tempos[i - 1] == t:
+            return float(valores[i - 1])
+        if metodo == 'exato' or n == 0:
+            return float('nan')
+        if metodo == 'anterior':
+            if i == 0 or (limite is not None and t - self.tempos[i - 1] > limite):
+                return float('nan')
+            return float(valores[i - 1])
+        if i == 0 or i == n:
+            return float('nan')
+        t0, t1 = self.tempos[i - 1], self.tempos[i]
+        if limite is not None and (t - t0 > limite or t1 - t > limite):
+            return float('nan')
+        peso = (t - t0) / (t1 - t0)
+        return float(valores[i - 1] + peso * (valores[i] - valores[i - 1]))
+
+
+def load_series(caminho, **opcoes):
+    """
+    Lê (ou reaproveita do cache) a série de uma estação.
+
+    O cache é invalidado quando o arquivo é modificado.
+    """
+    chave = (os.path.abspath(caminho), os.path.getmtime(caminho), tuple(sorted(opcoes.items())))
+    serie = _CACHE_SERIES.get(chave)
+    if serie is None:
+        serie = WeatherSeries.from_csv(caminho, **opcoes)
+        _CACHE_SERIES[chave] = serie
+    return serie
+
+
+def scene_datetime(mtl_data):
+    """
+    Instante de aquisição (UTC) a partir de DATE_ACQUIRED e SCENE_CENTER_TIME.
+    """
+    data = mtl_data['DATE_ACQUIRED'].strip()
+    hora = mtl_data.get('SCENE_CENTER_TIME', '00:00:00').strip().strip('"').rstrip('Z')[:8]
+    return np.datetime64(f'{data}T{hora}', 's')
+
+
+class WeatherProvider:
+    """
+    Resolve u2m, EToi e ETo de cada cena a partir das séries das estações.
+
+    `horario` é o CSV com registros horários (vento a 2 m e ETo horária) e
+    `diario` o CSV com a ETo diária; podem ser o mesmo arquivo.
+    `fuso_horario` é o deslocamento, em horas, do horário local dos CSVs em
+    relação ao UTC do MTL (por exemplo, -3 para o horário de Brasília).
+    """
+
+    def __init__(self, horario, diario=None, fuso_horario=0, colunas=None, tolerancia_horas=3, **opcoes_csv):
+        self.horario = load_series(horario, **opcoes_csv)
+        self.diario = load_series(diario, **opcoes_csv) if diario else self.horario
+        self.fuso = np.timedelta64(int(round(fuso_horario * 3600)), 's')
+        self.colunas = {'u2m': 'u2m', 'EToi': 'EToi', 'ETo': 'ETo'}
+        self.colunas.update(colunas or {})
+        self.tolerancia = np.timedelta64(int(tolerancia_horas * 3600), 's')
+
+    def scene_parameters(self, mtl_data):
+        """
+        Retorna {'u2m', 'EToi', 'ETo'} para a cena descrita pelo MTL.
+        """
+        instante = scene_datetime(mtl_data) + self.fuso
+        dia = instante.astype('datetime64[D]')
+        parametros = {
+            'u2m': self.horario.value_at(self.colunas['u2m'], instante, tolerancia=self.tolerancia),
+            'EToi': self.horario.value_at(self.colunas['EToi'], instante, tolerancia=self.tolerancia),
+            'ETo': self.diario.value_at(self.colunas['ETo'], dia, metodo='anterior', tolerancia=np.timedelta64(1, 'D') - np.timedelta64(1, 's')),
+        }
+        faltando = [nome for nome, valor in parametros.items() if np.isnan(valor)]
+        if faltando:
+            raise ValueError(f"Sem dados meteorológicos para {instante} ({', '.join(faltando)}).")
+        return parametros
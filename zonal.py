@@ -0,0 +1,142 @@
+import csv
+import logging
+import os
+
+import geopandas as gpd
+import numpy as np
+from rasterio.features import rasterize
+
+# Produtos do run_processing disponíveis para as estatísticas zonais
+PRODUTOS_ZONAIS = ('NDVI', 'SAVI', 'LAI', 'Ts', 'aS', 'Rn', 'G', 'H', 'LET', 'ETi', 'ETof', 'ETday')
+PRODUTOS_PADRAO = ('ETday', 'Rn', 'NDVI')
+
+LOGGER = logging.getLogger('evapogis.zonal')
+
+
+class ZonalStats:
+    """
+    Estatísticas por feição do shapefile da AOI sobre a grade de processamento.
+
+    Os índices das feições são rasterizados uma única vez por grade; cada
+    produto é então resumido em uma passada vetorizada (np.bincount para
+    contagem, soma e soma dos quadrados e uma única ordenação para mínimo,
+    máximo e mediana), sem reabrir rasters nem percorrer polígonos.
+    Em feições sobrepostas, cada pixel é atribuído à última feição.
+    """
+
+    def __init__(self, feicoes):
+        self.feicoes = feicoes
+        self._rotulos = {}
+
+    @classmethod
+    def from_shapefile(cls, shapefile_path):
+        return cls(gpd.read_file(shapefile_path))
+
+    def rotulos(self, meta):
+        """
+        Raster com o índice da feição de cada pixel (-1 fora das feições).
+        """
+        chave = (meta['crs'].to_string() if meta['crs'] else None, tuple(meta['transform']), meta['width'], meta['height'])
+        rotulos = self._rotulos.get(chave)
+        if rotulos is None:
+            feicoes = self.feicoes
+            if meta['crs'] and feicoes.crs and feicoes.crs != meta['crs']:
+                feicoes = feicoes.to_crs(meta['crs'])
+            formas = ((geometria, indice) for indice, geometria in enumerate(feicoes.geometry)
+                      if geometria is not None and not geometria.is_empty)
+            rotulos = rasterize(formas, out_shape=(meta['height'], meta['width']), transform=meta['transform'],
+                                fill=-1, dtype='int32')
+            self._rotulos[chave] = rotulos
+        return rotulos
+
+    def compute(self, produtos, meta, store=None):
+        """
+        Calcula n, média, mediana, mínimo, máximo e desvio de cada produto por feição.
+
+        `produtos` é um dicionário {nome: array na grade de `meta`}; com
+        `store` (PixelStore), os arrays são os valores 1-D dos pixels válidos. Pixels NaN
+        são ignorados. Retorna {nome da coluna: array com um valor por feição}.
+        """
+        rotulos = self.rotulos(meta)
+        rotulos = rotulos.ravel() if store is None else store.compact(rotulos)
+        forma = (meta['height'], meta['width']) if store is None else rotulos.shape
+        n_feicoes = len(self.feicoes)
+        dentro = rotulos >= 0
+        tabela = {}
+        for nome, array in produtos.items():
+            valores = np.broadcast_to(np.asarray(array, dtype=np.float64), forma).ravel()
+            validos = dentro & ~np.isnan(valores)
+            grupo = rotulos[validos]
+            valores = valores[validos]
+
+            n = np.bincount(grupo, minlength=n_feicoes)
+            soma = np.bincount(grupo, weights=valores, minlength=n_feicoes)
+            soma_quadrados = np.bincount(grupo, weights=valores * valores, minlength=n_feicoes)
+            com_dados = n > 0
+            media = np.full(n_feicoes, np.nan)
+            np.divide(soma, n, out=media, where=com_dados)
+            variancia = np.full(n_feicoes, np.nan)
+            np.divide(soma_quadrados, n, out=variancia, where=com_dados)
+            variancia -= media * media
+
+            # Ordenação por (feição, valor): cada feição vira um trecho contíguo e ordenado
+            ordem = np.lexsort((valores, grupo))
+            ordenados = valores[ordem]
+            inicio = np.concatenate(([0], np.cumsum(n)[:-1]))
+            fim = inicio + n - 1
+            minimo = np.full(n_feicoes, np.nan)
+            maximo = np.full(n_feicoes, np.nan)
+            mediana = np.full(n_feicoes, np.nan)
+            minimo[com_dados] = ordenados[inicio[com_dados]]
+            maximo[com_dados] = ordenados[fim[com_dados]]
+            meio_baixo = inicio + (n - 1) // 2
+            meio_alto = inicio + n // 2
+            mediana[com_dados] = (ordenados[meio_baixo[com_dados]] + ordenados[meio_alto[com_dados]]) / 2
+
+            tabela[f'{nome}_n'] = n
+            tabela[f'{nome}_media'] = media
+            tabela[f'{nome}_mediana'] = mediana
+            tabela[f'{nome}_min'] = minimo
+            tabela[f'{nome}_max'] = maximo
+            tabela[f'{nome}_desvio'] = np.sqrt(np.maximum(variancia, 0))
+        return tabela
+
+    def _atributos(self):
+        return [coluna for coluna in self.feicoes.columns if coluna != self.feicoes.geometry.name]
+
+    def write_csv(self, tabela, caminho):
+        """
+        Grava a tabela com os atributos das feições, uma linha por feição.
+        """
+        atributos = self._atributos()
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(['fid'] + atributos + list(tabela))
+            for indice in range(len(self.feicoes)):
+                linha = [indice] + [self.feicoes[coluna].iloc[indice] for coluna in atributos]
+                escritor.writerow(linha + [valores[indice] for valores in tabela.values()])
+
+    def write_gpkg(self, tabela, caminho, camada='estatisticas_zonais'):
+        """
+        Grava as feições com as estatísticas como atributos em um GeoPackage.
+        """
+        saida = self.feicoes.copy()
+        for coluna, valores in tabela.items():
+            saida[coluna] = valores
+        saida.to_file(caminho, layer=camada, driver='GPKG')
+
+
+def write_zonal_stats(zonal, produtos, meta, output_dir, nome='estatisticas_zonais', store=None):
+    """
+    Calcula as estatísticas e grava <nome>.csv e <nome>.gpkg no diretório de saída.
+
+    Retorna o caminho do CSV.
+    """
+    tabela = zonal.compute(produtos, meta, store)
+    caminho_csv = os.path.join(output_dir, f'{nome}.csv')
+    zonal.write_csv(tabela, caminho_csv)
+    try:
+        zonal.write_gpkg(tabela, os.path.join(output_dir, f'{nome}.gpkg'))
+    except Exception as e:
+        LOGGER.error(f"Erro ao gravar o GeoPackage das estatísticas zonais: {e}")
+    return caminho_csv